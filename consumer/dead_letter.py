@@ -0,0 +1,118 @@
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.app.core.config import settings
+from src.app.core.logging import logger
+from src.app.core.metrics import CONSUMER_MESSAGES_DEAD_LETTERED, CONSUMER_MESSAGES_RETRIED
+from src.app.services.kafka_producer import MessageProducer, producer_manager
+
+# Record headers describing why and how often a record failed
+ATTEMPTS_HEADER = "x-attempts"
+NOT_BEFORE_HEADER = "x-not-before"
+ORIGINAL_TOPIC_HEADER = "x-original-topic"
+ORIGINAL_PARTITION_HEADER = "x-original-partition"
+ORIGINAL_OFFSET_HEADER = "x-original-offset"
+ERROR_HEADER = "x-error"
+ERROR_TYPE_HEADER = "x-error-type"
+FAILED_AT_HEADER = "x-failed-at"
+
+# Error text is truncated so a huge exception cannot bloat the record
+MAX_ERROR_LENGTH = 1000
+
+def record_headers(message) -> Dict[str, bytes]:
+    headers = getattr(message, "headers", None)
+    return dict(headers) if isinstance(headers, list) else {}
+
+def header_text(message, name: str) -> Optional[str]:
+    value = record_headers(message).get(name)
+    return value.decode("utf-8") if value is not None else None
+
+def attempts(message) -> int:
+    """How many times the record has already failed."""
+    return int(header_text(message, ATTEMPTS_HEADER) or 0)
+
+def not_before(message) -> float:
+    """Epoch time before which a retried record must not be processed."""
+    return float(header_text(message, NOT_BEFORE_HEADER) or 0)
+
+def original_topic(message) -> str:
+    return header_text(message, ORIGINAL_TOPIC_HEADER) or message.topic
+
+def retry_delay(attempt: int) -> float:
+    return min(
+        settings.CONSUMER_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1)),
+        settings.CONSUMER_RETRY_BACKOFF_MAX_SECONDS
+    )
+
+class FailureRouter:
+    """Moves records that could not be processed out of the way.
+
+    Transient failures go to the retry topic with an increasing ``x-not-before``
+    until ``max_attempts`` is reached; invalid records and records out of
+    attempts go to the dead-letter topic. Sends are only confirmed by
+    ``flush``, which callers must invoke before committing the source offsets.
+    """
+
+    def __init__(
+        self,
+        producer_getter: Callable[[], MessageProducer] = producer_manager.get,
+        retry_topic: Optional[str] = None,
+        dead_letter_topic: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.producer_getter = producer_getter
+        self.retry_topic = retry_topic or settings.KAFKA_RETRY_TOPIC
+        self.dead_letter_topic = dead_letter_topic or settings.KAFKA_DEAD_LETTER_TOPIC
+        self.max_attempts = max_attempts or settings.CONSUMER_MAX_ATTEMPTS
+        self._pending = []
+
+    def _headers(self, message, error: Exception, attempt: int) -> List[Tuple[str, bytes]]:
+        inherited = {
+            key: value for key, value in record_headers(message).items()
+            if not key.startswith("x-")
+        }
+        metadata = {
+            ATTEMPTS_HEADER: str(attempt),
+            ORIGINAL_TOPIC_HEADER: original_topic(message),
+            ORIGINAL_PARTITION_HEADER: header_text(message, ORIGINAL_PARTITION_HEADER) or str(message.partition),
+            ORIGINAL_OFFSET_HEADER: header_text(message, ORIGINAL_OFFSET_HEADER) or str(message.offset),
+            ERROR_HEADER: str(error)[:MAX_ERROR_LENGTH],
+            ERROR_TYPE_HEADER: type(error).__name__,
+            FAILED_AT_HEADER: datetime.now(timezone.utc).isoformat(),
+        }
+        inherited.update({key: value.encode("utf-8") for key, value in metadata.items()})
+        return list(inherited.items())
+
+    def _forward(self, topic: str, message, headers: List[Tuple[str, bytes]]):
+        future = self.producer_getter().send_raw(topic, message.value, key=message.key, headers=headers)
+        self._pending.append(future)
+
+    def retry(self, message, error: Exception) -> str:
+        """Schedule another attempt, or dead-letter the record when out of attempts."""
+        attempt = attempts(message) + 1
+        if attempt >= self.max_attempts:
+            return self.dead_letter(message, error, reason="exhausted")
+        headers = self._headers(message, error, attempt)
+        headers.append((NOT_BEFORE_HEADER, str(time.time() + retry_delay(attempt)).encode("utf-8")))
+        self._forward(self.retry_topic, message, headers)
+        CONSUMER_MESSAGES_RETRIED.inc()
+        logger.warning(f"Retrying record from {original_topic(message)} (attempt {attempt}/{self.max_attempts}): {error}")
+        return self.retry_topic
+
+    def dead_letter(self, message, error: Exception, reason: str = "invalid") -> str:
+        self._forward(self.dead_letter_topic, message, self._headers(message, error, attempts(message) + 1))
+        CONSUMER_MESSAGES_DEAD_LETTERED.labels(reason=reason).inc()
+        logger.error(f"Dead-lettered record from {original_topic(message)} ({reason}): {error}")
+        return self.dead_letter_topic
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until every routed record is acknowledged; raises if one was not."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        timeout = timeout if timeout is not None else settings.CONSUMER_FORWARD_TIMEOUT
+        self.producer_getter().flush(timeout=timeout)
+        for future in pending:
+            if future is not None:
+                future.get(timeout=timeout)
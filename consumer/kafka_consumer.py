@@ -1,19 +1,122 @@
-from kafka import KafkaConsumer
+from kafka import ConsumerRebalanceListener, KafkaConsumer
+from kafka.structs import OffsetAndMetadata
+from prometheus_client import multiprocess
 import json
+import multiprocessing
 import signal
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from sqlalchemy import bindparam, func, or_, update
 from sqlalchemy.orm import Session, sessionmaker
 from src.app.core.database import SessionLocal
-from src.app.models.document import Document
-from src.app.services.text_processor import TextProcessor
+from src.app.models.document import Document, hash_content
+from src.app.services.blobs import contents_of
+from src.app.services.cache import get_document_cache
+from src.app.services.search import catch_up_inverted_index, flush_inverted_index, index_documents
+from src.app.services.text_processor import BatchStats, TextProcessor
 from src.app.core.config import settings
 from src.app.core.logging import logger
-from src.app.core.metrics import PROCESSING_TIME, PROCESSING_SUCCESS, PROCESSING_FAILED
+from src.app.core.system_metrics import SystemMetricsCollector
+from consumer.dead_letter import FailureRouter, not_before
+from src.app.core.metrics import (
+    PROCESSING_TIME, PROCESSING_SUCCESS, PROCESSING_FAILED,
+    CONSUMER_BATCH_SIZE, CONSUMER_BATCH_DURATION, CONSUMER_PARTITION_LAG,
+    CONSUMER_MESSAGES_SKIPPED, DOCUMENTS_INDEXED, CONSUMER_RECORDS, CONSUMER_POLL_DURATION,
+    CONSUMER_DB_WRITE_DURATION, CONSUMER_REBALANCES, CONSUMER_ASSIGNED_PARTITIONS,
+    multiprocess_dir, start_metrics_server, timed
+)
+
+# Applies an event only if no newer version of the document was processed.
+# Events without a version (published before versioning) only apply to
+# documents that never saw a versioned event. A NULL description keeps the
+# current one, for events whose content was already described.
+APPLY_EVENT = (
+    update(Document.__table__)
+    .where(
+        Document.id == bindparam("b_id"),
+        or_(Document.processed_version.is_(None), Document.processed_version < bindparam("b_version"))
+    )
+    .values(
+        short_description=func.coalesce(bindparam("b_description"), Document.short_description),
+        description_hash=func.coalesce(bindparam("b_hash"), Document.description_hash),
+        processed_version=bindparam("b_version")
+    )
+)
+
+class DedupWindow:
+    """Latest applied version of the most recently processed documents.
+
+    Only an optimization in front of the conditional UPDATE: each consumer
+    process has its own window, the database stays the source of truth.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, doc_id, version) -> bool:
+        if version is None or self.size <= 0:
+            return False
+        with self._lock:
+            applied = self._versions.get(doc_id)
+        return applied is not None and version <= applied
+
+    def add(self, doc_id, version):
+        if version is None or self.size <= 0:
+            return
+        with self._lock:
+            if version > self._versions.get(doc_id, version - 1):
+                self._versions[doc_id] = version
+            self._versions.move_to_end(doc_id)
+            while len(self._versions) > self.size:
+                self._versions.popitem(last=False)
+
+def _supersedes(version, previous) -> bool:
+    # Unversioned events keep the old last-one-wins order
+    return version is None or previous is None or version > previous
+
+class PartitionRebalanceListener(ConsumerRebalanceListener):
+    """Keeps per-partition state in step with the group assignment.
+
+    Batches are fully applied and committed before the next poll, and
+    rebalances only happen inside poll, so no work is in flight when
+    partitions are revoked.
+    """
+
+    def __init__(self, consumer: "MessageConsumer"):
+        self.consumer = consumer
+
+    def on_partitions_revoked(self, revoked):
+        logger.info(f"Partitions revoked: {sorted(tp.partition for tp in revoked)}")
+        CONSUMER_REBALANCES.labels(event="revoked").inc()
+        for tp in revoked:
+            # Pausing does not survive reassignment; the new owner re-reads
+            # the delayed record from the committed offset
+            self.consumer.paused.pop(tp, None)
+            self.consumer.committed_offsets.pop(tp, None)
+            try:
+                # Zeroed first: in multiprocess mode the last value would
+                # otherwise stay in this process's file and win the max
+                CONSUMER_PARTITION_LAG.labels(topic=tp.topic, partition=str(tp.partition)).set(0)
+                CONSUMER_PARTITION_LAG.remove(tp.topic, str(tp.partition))
+            except KeyError:
+                pass
+
+    def on_partitions_assigned(self, assigned):
+        logger.info(f"Partitions assigned: {sorted(tp.partition for tp in assigned)}")
+        CONSUMER_REBALANCES.labels(event="assigned").inc()
+        CONSUMER_ASSIGNED_PARTITIONS.set(len(assigned))
+        # Reported on the next loop instead of after the next throttle interval
+        self.consumer.lag_updated_at = 0.0
 
 class MessageConsumer:
     def __init__(self):
         self.running = True
+        self.batch_mode = settings.KAFKA_CONSUMER_BATCH_MODE
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.stop)
         signal.signal(signal.SIGTERM, self.stop)
@@ -25,17 +128,34 @@ class MessageConsumer:
             try:
                 logger.info("Initializing Kafka consumer...")
                 self.consumer = KafkaConsumer(
-                    settings.KAFKA_TOPIC,
                     bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
                     auto_offset_reset='earliest',  # Start from earliest message if no offset
-                    group_id='document_processor',  # Consumer group ID
-                    # Add consumer configuration for better reliability
-                    enable_auto_commit=True,
-                    auto_commit_interval_ms=1000,
+                    group_id=settings.KAFKA_CONSUMER_GROUP,  # Consumer group ID
+                    # Add consumer configuration for better reliability.
+                    # Offsets are committed only after records were stored
+                    # or handed to the retry/dead-letter topics.
+                    enable_auto_commit=False,
+                    max_poll_records=settings.KAFKA_MAX_POLL_RECORDS,
                     session_timeout_ms=30000,
                     heartbeat_interval_ms=10000
                 )
+                self.consumer.subscribe(
+                    [settings.KAFKA_TOPIC, settings.KAFKA_RETRY_TOPIC],
+                    listener=PartitionRebalanceListener(self)
+                )
+                self.failures = FailureRouter()
+                self.dedup = DedupWindow(settings.CONSUMER_DEDUP_WINDOW)
+                # Retry partitions paused until their next record is due
+                self.paused = {}
+                # Offsets this member committed, for the lag metrics
+                self.committed_offsets = {}
+                self.index_flushed_at = time.monotonic()
+                self.lag_updated_at = 0.0
                 self.text_processor = TextProcessor()
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.KAFKA_CONSUMER_WORKERS,
+                    thread_name_prefix="partition-worker"
+                ) if settings.KAFKA_CONSUMER_WORKERS > 1 else None
                 self.Session = sessionmaker(autocommit=False, autoflush=False, bind=SessionLocal().bind)
                 logger.info(f"Connected to Kafka at {settings.KAFKA_BOOTSTRAP_SERVERS}")
                 break
@@ -54,15 +174,21 @@ class MessageConsumer:
     def consume(self):
         """Continuously consume messages"""
         logger.info("Starting to consume messages...")
+        system_metrics = SystemMetricsCollector() if settings.SYSTEM_METRICS_ENABLED else None
+        if system_metrics is not None:
+            system_metrics.start()
         try:
+            self.sync_search_index(catch_up=True)
             while self.running:
                 try:
-                    messages = self.consumer.poll(timeout_ms=1000)
+                    self.resume_due_partitions()
+                    with timed(CONSUMER_POLL_DURATION):
+                        messages = self.consumer.poll(timeout_ms=settings.KAFKA_POLL_TIMEOUT_MS)
                     if messages:
                         logger.debug(f"Received {sum(len(msgs) for msgs in messages.values())} messages")
-                        for topic_partition, msgs in messages.items():
-                            for message in msgs:
-                                self.process_message(message)
+                        self.handle_batch(messages)
+                    self.update_partition_lag()
+                    self.sync_search_index()
                 except Exception as e:
                     logger.error(f"Error polling messages: {e}")
                     time.sleep(1)  # Wait before retrying
@@ -70,44 +196,385 @@ class MessageConsumer:
             logger.info("Stopping consumer...")
         finally:
             logger.info("Closing consumer connection...")
+            self.sync_search_index(force=True)
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            if system_metrics is not None:
+                system_metrics.stop()
             self.consumer.close()
 
-    def process_message(self, message):
+    def sync_search_index(self, force: bool = False, catch_up: bool = False):
+        """Merge documents queued for the inverted index into its file.
+
+        Only used with SEARCH_BACKEND=inverted_index, at most every
+        INVERTED_INDEX_FLUSH_SECONDS since each merge rewrites the file. With
+        ``catch_up`` documents missed while no consumer ran are indexed first.
+        """
+        if settings.SEARCH_BACKEND != "inverted_index":
+            return
+        now = time.monotonic()
+        if not (force or catch_up) and now - self.index_flushed_at < settings.INVERTED_INDEX_FLUSH_SECONDS:
+            return
+        self.index_flushed_at = now
         session = self.Session()
         try:
-            data = json.loads(message.value.decode())
-            logger.debug(f"Processing message: {data}")
-            
-            if 'document_id' not in data or 'content' not in data:
-                logger.warning(f"Invalid message format: {data}")
-                PROCESSING_FAILED.inc()
-                return
-                
-            doc_id = data["document_id"]
-            content = data["content"]
-            
-            doc = session.query(Document).filter(Document.id == doc_id).first()
-            if doc:
-                doc.short_description = TextProcessor.generate_description(content)
-                session.commit()
-                PROCESSING_SUCCESS.inc()
-            else:
-                logger.warning(f"Document {doc_id} not found in database")
-                PROCESSING_FAILED.inc()
+            if catch_up:
+                logger.info(f"Caught up {catch_up_inverted_index(session)} documents in the search index")
+            flush_inverted_index(session)
         except Exception as e:
-            PROCESSING_FAILED.inc()
-            logger.error(f"Error processing message: {str(e)}")
             session.rollback()
+            logger.error(f"Error updating the search index: {e}")
         finally:
             session.close()
 
-def main():
+    def handle_batch(self, messages):
+        """Apply one poll batch, one task per partition, and commit what was handled.
+
+        Records of a document always land on the same partition and each
+        partition is applied by a single task, so per-document order is kept
+        while different partitions run concurrently. Records that fail are
+        handed to the retry or dead-letter topic, and offsets are committed
+        only once those sends are acknowledged. A partition whose failures
+        could not be handed off is rewound to the first offset of its batch
+        and redelivered by the next poll.
+        """
+        due = {}
+        for tp, msgs in messages.items():
+            records = self._due_records(tp, msgs)
+            if records:
+                due[tp] = records
+
+        if self.executor is None or len(due) <= 1:
+            results = {tp: self._apply_partition(tp, records) for tp, records in due.items()}
+        else:
+            futures = {tp: self.executor.submit(self._apply_partition, tp, records) for tp, records in due.items()}
+            results = {tp: future.result() for tp, future in futures.items()}
+        failed = [tp for tp, applied in results.items() if not applied]
+
+        try:
+            self.failures.flush()
+        except Exception as e:
+            logger.error(f"Could not hand off failed messages: {e}")
+            failed = list(due)
+
+        offsets = {
+            tp: OffsetAndMetadata(records[-1].offset + 1, None)
+            for tp, records in due.items() if tp not in failed
+        }
+        if offsets:
+            self.consumer.commit(offsets)
+            for tp, offset in offsets.items():
+                self.committed_offsets[tp] = offset.offset
+                CONSUMER_RECORDS.labels(topic=tp.topic).inc(len(due[tp]))
+        for tp in failed:
+            self.consumer.seek(tp, due[tp][0].offset)
+        if failed:
+            time.sleep(1)  # Wait before retrying
+
+    def _due_records(self, topic_partition, records):
+        """Return the records that may be processed now.
+
+        Retried records carry the time of their next attempt; the partition is
+        paused at the first record that is not due yet, so later records of
+        the retry partition wait behind it and other partitions keep flowing.
+        """
+        if topic_partition.topic != self.failures.retry_topic:
+            return records
+        now = time.time()
+        for i, record in enumerate(records):
+            ready_at = not_before(record)
+            if ready_at > now:
+                self.consumer.seek(topic_partition, record.offset)
+                self.consumer.pause(topic_partition)
+                self.paused[topic_partition] = ready_at
+                return records[:i]
+        return records
+
+    def resume_due_partitions(self):
+        if not self.paused:
+            return
+        now = time.time()
+        ready = [tp for tp, ready_at in self.paused.items() if ready_at <= now]
+        if ready:
+            self.consumer.resume(*ready)
+            for tp in ready:
+                del self.paused[tp]
+
+    def _apply_partition(self, topic_partition, records) -> bool:
+        """Process the records of one partition; returns False if they must be redelivered."""
+        try:
+            if self.batch_mode:
+                try:
+                    self.process_batch(records)
+                    return True
+                except Exception as e:
+                    # Find the failing records so the rest still goes through
+                    logger.error(f"Error processing batch of {len(records)} messages from "
+                                 f"partition {topic_partition.partition}, retrying one by one: {e}")
+            for message in records:
+                self.process_message(message)
+            return True
+        except Exception as e:
+            logger.error(f"Could not hand off failed messages from partition {topic_partition.partition}: {e}")
+            return False
+
+    def update_partition_lag(self, force: bool = False):
+        """Export how far the committed offset of each assigned partition is behind its end.
+
+        Records after the committed offset are not durably processed yet,
+        which makes this the lag to scale consumers on. Committed offsets are
+        the ones this member committed; until it has committed one, the
+        position, which starts at the group's committed offset, stands in.
+        End offsets come from the last fetch where known; the others are
+        asked from the brokers in one request, at most every
+        CONSUMER_LAG_INTERVAL_SECONDS, however many partitions are assigned.
+        """
+        now = time.monotonic()
+        if not force and now - self.lag_updated_at < settings.CONSUMER_LAG_INTERVAL_SECONDS:
+            return
+        self.lag_updated_at = now
+        assignment = self.consumer.assignment()
+        if not assignment:
+            return
+        end_offsets = {tp: self.consumer.highwater(tp) for tp in assignment}
+        unknown = [tp for tp, end in end_offsets.items() if end is None]
+        if unknown:
+            end_offsets.update(self.consumer.end_offsets(unknown))
+        for tp in assignment:
+            end = end_offsets.get(tp)
+            if end is None:
+                continue
+            committed = self.committed_offsets.get(tp)
+            if committed is None:
+                committed = self.consumer.position(tp)
+            lag = max(end - committed, 0)
+            CONSUMER_PARTITION_LAG.labels(topic=tp.topic, partition=str(tp.partition)).set(lag)
+
+    def process_batch(self, records) -> int:
+        """Update the descriptions and search index of all documents in ``records`` at once.
+
+        Loads the referenced documents with a single IN query and writes them
+        back with one conditional bulk UPDATE, one reindex of the changed
+        documents and one commit. Events whose version was already applied,
+        in this batch, the dedup window or the database, are skipped; so is
+        the description work when the document was already described from
+        the same content. Returns the number of documents whose description
+        was recomputed; database errors are raised so the caller can retry
+        the batch.
+        """
+        start = time.perf_counter()
+        CONSUMER_BATCH_SIZE.observe(len(records))
+        events = {}
+        invalid = []
+        duplicates = 0
+        for message in records:
+            try:
+                data = json.loads(message.value.decode())
+            except Exception as e:
+                invalid.append((message, e))
+                continue
+            # Large bodies are referenced by content_hash, see services/blobs.py
+            if 'document_id' not in data or ('content' not in data and not data.get('content_hash')):
+                invalid.append((message, ValueError(f"Invalid message format: {data}")))
+                continue
+            doc_id, version = data["document_id"], data.get("version")
+            previous = events.get(doc_id)
+            if self.dedup.seen(doc_id, version) or (
+                    previous is not None and not _supersedes(version, previous[0])):
+                duplicates += 1
+                continue
+            events[doc_id] = (version, data.get("content"), data.get("content_hash"))
+
+        if not events:
+            self._reject(invalid)
+            CONSUMER_MESSAGES_SKIPPED.labels(reason="duplicate").inc(duplicates)
+            CONSUMER_BATCH_DURATION.observe(time.perf_counter() - start)
+            return 0
+
+        session = self.Session()
+        try:
+            processed = {
+                doc_id: (processed_version, description_hash, indexed_version)
+                for doc_id, processed_version, description_hash, indexed_version in
+                session.query(Document.id, Document.processed_version, Document.description_hash,
+                              Document.indexed_version)
+                .filter(Document.id.in_(list(events)))
+            }
+            rows = []
+            pending = []
+            stale = []
+            reindex = []
+            unchanged = 0
+            for doc_id, (version, content, digest) in events.items():
+                if doc_id not in processed:
+                    continue
+                processed_version, description_hash, indexed_version = processed[doc_id]
+                # Documents are described on create but indexed only here
+                needs_index = indexed_version is None or version is None or version > indexed_version
+                if needs_index:
+                    reindex.append(doc_id)
+                if processed_version is not None and (version is None or version <= processed_version):
+                    if not needs_index:
+                        stale.append(doc_id)
+                    continue
+                digest = digest or hash_content(content)
+                if digest == description_hash:
+                    unchanged += 1
+                    if version is None:
+                        continue
+                    # Only the version moves on, so older events stay stale
+                    rows.append({"b_id": doc_id, "b_version": version, "b_description": None, "b_hash": None})
+                    continue
+                pending.append(({"b_id": doc_id, "b_version": version, "b_hash": digest}, content))
+            if pending:
+                # Describe every changed document of the batch in one call;
+                # referenced bodies are loaded with one query as well
+                contents = contents_of(session, [(content, row["b_hash"]) for row, content in pending])
+                with timed(PROCESSING_TIME):
+                    descriptions = TextProcessor.analyze_batch(
+                        contents, columns=BatchStats.DESCRIPTION_COLUMNS
+                    ).descriptions()
+                for (row, _), description in zip(pending, descriptions):
+                    row["b_description"] = description
+                    rows.append(row)
+            if rows:
+                with timed(CONSUMER_DB_WRITE_DURATION, operation="apply"):
+                    session.execute(APPLY_EVENT, rows)
+            # Indexes the current row, so reordered events cannot regress it
+            if reindex:
+                with timed(CONSUMER_DB_WRITE_DURATION, operation="index"):
+                    index_documents(session, reindex)
+            with timed(CONSUMER_DB_WRITE_DURATION, operation="commit"):
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+        # Rejected only now so a batch retried record by record rejects them once
+        self._reject(invalid)
+        # Only reaches other processes with the shared cache backend
+        cache = get_document_cache()
+        described = [row for row in rows if row["b_description"] is not None]
+        for row in described:
+            cache.invalidate(row["b_id"])
+        for row in rows:
+            self.dedup.add(row["b_id"], row["b_version"])
+        for doc_id in stale:
+            self.dedup.add(doc_id, processed[doc_id][0])
+        for doc_id in reindex:
+            self.dedup.add(doc_id, events[doc_id][0])
+        DOCUMENTS_INDEXED.inc(len(reindex))
+        for doc_id in events.keys() - processed.keys():
+            logger.warning(f"Document {doc_id} not found in database")
+        PROCESSING_SUCCESS.inc(len(described))
+        PROCESSING_FAILED.inc(len(events) - len(processed))
+        CONSUMER_MESSAGES_SKIPPED.labels(reason="duplicate").inc(duplicates)
+        CONSUMER_MESSAGES_SKIPPED.labels(reason="stale").inc(len(stale))
+        CONSUMER_MESSAGES_SKIPPED.labels(reason="unchanged").inc(unchanged)
+        CONSUMER_BATCH_DURATION.observe(time.perf_counter() - start)
+        return len(described)
+
+    def _reject(self, invalid):
+        for message, error in invalid:
+            logger.warning(f"Invalid message: {error}")
+            PROCESSING_FAILED.inc()
+            # Retrying cannot fix a malformed record
+            self.failures.dead_letter(message, error)
+
+    def process_message(self, message):
+        """Process a single record, handing it to the retry topic if that fails.
+
+        Raises only if the record could not be handed off either.
+        """
+        try:
+            self.process_batch([message])
+        except Exception as e:
+            PROCESSING_FAILED.inc()
+            logger.error(f"Error processing message: {str(e)}")
+            self.failures.retry(message, e)
+
+def serve_metrics():
+    if settings.CONSUMER_METRICS_PORT:
+        start_metrics_server(settings.CONSUMER_METRICS_PORT)
+        logger.info(f"Serving consumer metrics on port {settings.CONSUMER_METRICS_PORT}")
+
+def run_consumer(serve: bool = True):
     try:
+        if serve:
+            serve_metrics()
         consumer = MessageConsumer()
         consumer.consume()
     except Exception as e:
         logger.error(f"Fatal error in consumer: {e}")
         raise
 
+def run_member():
+    """A consumer process under ConsumerSupervisor, which serves the metrics."""
+    run_consumer(serve=False)
+
+class ConsumerSupervisor:
+    """Runs several consumer group members as processes and restarts them.
+
+    Each member gets its share of the partitions from the group coordinator,
+    which spreads text processing over cores; members beyond the partition
+    count stay idle as hot standbys.
+    """
+
+    def __init__(self, processes: int, target=run_member, restart_delay: float = 5.0):
+        self.processes = processes
+        self.target = target
+        self.restart_delay = restart_delay
+        self.running = True
+        self.members = []
+
+    def stop(self, signum, frame):
+        logger.info("Received stop signal. Stopping consumer processes...")
+        self.running = False
+
+    def _spawn(self, index: int):
+        process = multiprocessing.Process(target=self.target, name=f"consumer-{index}")
+        process.start()
+        return process
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        if multiprocess_dir():
+            serve_metrics()
+        else:
+            logger.warning("PROMETHEUS_MULTIPROC_DIR is not set, consumer metrics are not served "
+                           f"for {self.processes} processes")
+        self.members = [self._spawn(i) for i in range(self.processes)]
+        try:
+            while self.running:
+                for i, process in enumerate(self.members):
+                    if not process.is_alive():
+                        logger.error(f"Consumer process {process.name} exited with {process.exitcode}, restarting")
+                        self._reap(process)
+                        time.sleep(self.restart_delay)
+                        self.members[i] = self._spawn(i)
+                time.sleep(1)
+        finally:
+            for process in self.members:
+                if process.is_alive():
+                    process.terminate()  # Members shut down cleanly on SIGTERM
+            for process in self.members:
+                process.join()
+                self._reap(process)
+
+    @staticmethod
+    def _reap(process):
+        # Gauges of a dead member must not count towards the live totals
+        if multiprocess_dir():
+            multiprocess.mark_process_dead(process.pid, multiprocess_dir())
+
+def main():
+    if settings.KAFKA_CONSUMER_PROCESSES > 1:
+        ConsumerSupervisor(settings.KAFKA_CONSUMER_PROCESSES).run()
+    else:
+        run_consumer()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
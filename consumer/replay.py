@@ -0,0 +1,106 @@
+"""Re-publish dead-lettered records to the topic they originally came from.
+
+    python -m consumer.replay --dry-run
+    python -m consumer.replay --document-id 42
+    python -m consumer.replay --error-type OperationalError --limit 100
+
+Replayed records start over with a fresh attempt count. An unfiltered replay
+commits the replay group's position, so each dead-lettered record is replayed
+only once; filtered replays leave the position alone. Use --from-beginning to
+scan the whole topic again.
+"""
+import argparse
+import json
+from typing import Optional
+
+from kafka import KafkaConsumer
+
+from consumer.dead_letter import (
+    ATTEMPTS_HEADER, ERROR_HEADER, ERROR_TYPE_HEADER, NOT_BEFORE_HEADER,
+    header_text, original_topic, record_headers
+)
+from src.app.core.config import settings
+from src.app.core.logging import logger
+from src.app.services.kafka_producer import producer_manager
+
+def _document_id(message) -> Optional[int]:
+    try:
+        return json.loads(message.value.decode()).get("document_id")
+    except Exception:
+        return None
+
+def matches(message, document_id: Optional[int] = None, error_type: Optional[str] = None) -> bool:
+    if document_id is not None and _document_id(message) != document_id:
+        return False
+    if error_type is not None and header_text(message, ERROR_TYPE_HEADER) != error_type:
+        return False
+    return True
+
+def replay_headers(message):
+    """Keep the provenance headers but reset the retry state."""
+    return [
+        (key, value) for key, value in record_headers(message).items()
+        if key not in (ATTEMPTS_HEADER, NOT_BEFORE_HEADER)
+    ]
+
+def replay(consumer, producer, document_id: Optional[int] = None, error_type: Optional[str] = None,
+           limit: Optional[int] = None, dry_run: bool = False) -> int:
+    """Replay matching records from ``consumer``; returns how many matched."""
+    replayed = 0
+    for message in consumer:
+        if not matches(message, document_id, error_type):
+            continue
+        topic = original_topic(message)
+        if dry_run:
+            print(f"{message.partition}:{message.offset} -> {topic} "
+                  f"[{header_text(message, ERROR_TYPE_HEADER)}] {header_text(message, ERROR_HEADER)}")
+        else:
+            producer.send_raw(topic, message.value, key=message.key, headers=replay_headers(message))
+        replayed += 1
+        if limit is not None and replayed >= limit:
+            break
+    if not dry_run:
+        # Commit the replay position only once the records are safely re-published
+        producer.flush(timeout=settings.CONSUMER_FORWARD_TIMEOUT)
+        if document_id is None and error_type is None:
+            consumer.commit()
+    return replayed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--document-id", type=int, help="Only replay events of this document")
+    parser.add_argument("--error-type", help="Only replay records that failed with this exception type")
+    parser.add_argument("--limit", type=int, help="Stop after this many records")
+    parser.add_argument("--dry-run", action="store_true", help="List matching records without replaying them")
+    parser.add_argument("--from-beginning", action="store_true",
+                        help="Scan the whole dead-letter topic, ignoring the replay group's position")
+    parser.add_argument("--idle-timeout-ms", type=int, default=5000,
+                        help="Stop once no record arrived for this long")
+    args = parser.parse_args()
+
+    consumer = KafkaConsumer(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+        group_id=f"{settings.KAFKA_CONSUMER_GROUP}-replay",
+        auto_offset_reset="earliest",
+        enable_auto_commit=False,
+        consumer_timeout_ms=args.idle_timeout_ms
+    )
+    consumer.subscribe([settings.KAFKA_DEAD_LETTER_TOPIC])
+    if args.from_beginning:
+        consumer.poll(timeout_ms=1000)  # Join the group to get an assignment
+        consumer.seek_to_beginning()
+    try:
+        count = replay(
+            consumer, producer_manager.get(),
+            document_id=args.document_id, error_type=args.error_type,
+            limit=args.limit, dry_run=args.dry_run
+        )
+        action = "Matched" if args.dry_run else "Replayed"
+        logger.info(f"{action} {count} dead-lettered records")
+        print(f"{action} {count} records")
+    finally:
+        consumer.close()
+        producer_manager.close(timeout=settings.KAFKA_PRODUCER_CLOSE_TIMEOUT)
+
+if __name__ == "__main__":
+    main()
@@ -44,6 +44,12 @@ fi
 
 echo "Database schema is ready!"
 
+# Metrics files of a previous run would be added to this one's totals
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Start the API
-echo "Starting API server..."
-poetry run uvicorn src.app.main:app --host 0.0.0.0 --port 8000 
\ No newline at end of file
+echo "Starting API server with ${API_WORKERS:-1} workers..."
+poetry run uvicorn src.app.main:app --host 0.0.0.0 --port 8000 --workers "${API_WORKERS:-1}" 
\ No newline at end of file
@@ -12,6 +12,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.app.core.config import settings
 from src.app.models.document import Document  # Import our model
+from src.app.models.outbox import OutboxEvent
+from src.app.models.blob import ContentBlob
 from src.app.core.database import Base
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,59 @@
+"""add content-addressed blobs for large document bodies
+
+Revision ID: content_blobs
+Revises: document_search
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'content_blobs'
+down_revision = 'document_search'
+branch_labels = None
+depends_on = None
+
+def _restore_search_trigger() -> None:
+    # batch_alter_table recreates documents on SQLite, which drops its triggers
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents "
+            "BEGIN DELETE FROM documents_fts WHERE rowid = old.id; END"
+        )
+
+def upgrade() -> None:
+    op.create_table(
+        'content_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('encoding', sa.String(length=16), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('referenced_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        # Blobs are compressed already; TOAST should not try again
+        op.execute("ALTER TABLE content_blobs ALTER COLUMN data SET STORAGE EXTERNAL")
+    # Existing bodies stay inline; scripts/content_blobs.py compact moves them
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=True)
+    _restore_search_trigger()
+
+def downgrade() -> None:
+    from src.app.services.blobs import decompress
+
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT d.id, b.encoding, b.data FROM documents d "
+        "JOIN content_blobs b ON b.hash = d.content_hash WHERE d.content IS NULL"
+    )).all()
+    if rows:
+        bind.execute(
+            sa.text("UPDATE documents SET content = :content WHERE id = :id"),
+            [{"id": doc_id, "content": decompress(encoding, data).decode("utf-8")} for doc_id, encoding, data in rows]
+        )
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=False)
+    _restore_search_trigger()
+    op.drop_table('content_blobs')
@@ -0,0 +1,26 @@
+"""add document content hashes
+
+Revision ID: document_content_hash
+Revises: document_versions
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'document_content_hash'
+down_revision = 'document_versions'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documents', sa.Column('description_hash', sa.String(length=64), nullable=True))
+    if op.get_bind().dialect.name == 'postgresql':
+        # Rows left NULL elsewhere are simply reprocessed on their next event
+        op.execute("UPDATE documents SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')")
+
+def downgrade() -> None:
+    op.drop_column('documents', 'description_hash')
+    op.drop_column('documents', 'content_hash')
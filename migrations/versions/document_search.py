@@ -0,0 +1,50 @@
+"""add full-text search index
+
+Revision ID: document_search
+Revises: document_content_hash
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'document_search'
+down_revision = 'document_content_hash'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('indexed_version', sa.Integer(), nullable=True))
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("ALTER TABLE documents ADD COLUMN search_vector tsvector")
+        # Existing documents are indexed here; new ones by the consumer
+        op.execute(
+            "UPDATE documents SET "
+            "search_vector = setweight(to_tsvector('english', coalesce(title, '')), 'A') "
+            "|| setweight(to_tsvector('english', content), 'B'), "
+            "indexed_version = version"
+        )
+        op.execute("CREATE INDEX ix_documents_search_vector ON documents USING gin (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts "
+            "USING fts5(title, content, tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents "
+            "BEGIN DELETE FROM documents_fts WHERE rowid = old.id; END"
+        )
+        op.execute("INSERT INTO documents_fts (rowid, title, content) SELECT id, title, content FROM documents")
+        op.execute("UPDATE documents SET indexed_version = version")
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_documents_search_vector")
+        op.execute("ALTER TABLE documents DROP COLUMN search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS documents_fts_delete")
+        op.execute("DROP TABLE IF EXISTS documents_fts")
+    op.drop_column('documents', 'indexed_version')
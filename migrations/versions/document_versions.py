@@ -0,0 +1,23 @@
+"""add document version columns
+
+Revision ID: document_versions
+Revises: documents_keyset_index
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'document_versions'
+down_revision = 'documents_keyset_index'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('documents', sa.Column('processed_version', sa.Integer(), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('documents', 'processed_version')
+    op.drop_column('documents', 'version')
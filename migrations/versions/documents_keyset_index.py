@@ -0,0 +1,21 @@
+"""add documents keyset pagination index
+
+Revision ID: documents_keyset_index
+Revises: outbox_events
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'documents_keyset_index'
+down_revision = 'outbox_events'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index('ix_documents_created_at_id', 'documents', ['created_at', 'id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_created_at_id', table_name='documents')
@@ -0,0 +1,36 @@
+"""add outbox events table
+
+Revision ID: outbox_events
+Revises: initial
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'outbox_events'
+down_revision = 'initial'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('aggregate_id', sa.Integer(), nullable=False),
+        sa.Column('topic', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_events_aggregate_id_id', 'outbox_events', ['aggregate_id', 'id'])
+    op.create_index('ix_outbox_events_available_at', 'outbox_events', ['available_at'])
+
+def downgrade() -> None:
+    op.drop_index('ix_outbox_events_available_at', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_aggregate_id_id', table_name='outbox_events')
+    op.drop_table('outbox_events')
@@ -0,0 +1,92 @@
+"""Recompute short descriptions for documents in bulk.
+
+Walks the documents table in id order and describes each batch with one
+TextProcessor.analyze_batch call and one executemany UPDATE. By default
+only documents whose description is missing or was computed from other
+content are touched:
+
+    poetry run python scripts/backfill_descriptions.py --batch-size 5000 --processes 4
+    poetry run python scripts/backfill_descriptions.py --all
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def backfill(session_factory, batch_size: int, processes: int = None, everything: bool = False) -> int:
+    from concurrent.futures import ProcessPoolExecutor
+    from sqlalchemy import bindparam, or_, update
+
+    from src.app.models.document import Document, hash_content
+    from src.app.services.blobs import contents_of
+    from src.app.services.cache import get_document_cache
+    from src.app.services.text_processor import BatchStats, TextProcessor, worker_context
+
+    statement = (
+        update(Document.__table__)
+        .where(Document.id == bindparam("b_id"))
+        .values(
+            short_description=bindparam("b_description"),
+            content_hash=bindparam("b_hash"),
+            description_hash=bindparam("b_hash")
+        )
+    )
+    # One pool for the whole run; it is only used for large batches
+    executor = ProcessPoolExecutor(max_workers=processes, mp_context=worker_context()) if processes else None
+    cache = get_document_cache()
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            with session_factory() as session:
+                query = (
+                    session.query(Document.id, Document.content, Document.content_hash)
+                    .filter(Document.id > last_id)
+                )
+                if not everything:
+                    query = query.filter(or_(
+                        Document.description_hash.is_(None),
+                        Document.content_hash.is_(None),
+                        Document.description_hash != Document.content_hash
+                    ))
+                rows = query.order_by(Document.id).limit(batch_size).all()
+                if not rows:
+                    break
+                contents = contents_of(session, [(content, digest) for _, content, digest in rows])
+                descriptions = TextProcessor.analyze_batch(
+                    contents, columns=BatchStats.DESCRIPTION_COLUMNS, executor=executor
+                ).descriptions()
+                session.execute(statement, [
+                    {"b_id": doc_id, "b_description": description, "b_hash": hash_content(content)}
+                    for (doc_id, _, _), content, description in zip(rows, contents, descriptions)
+                ])
+                session.commit()
+            for doc_id, _, _ in rows:
+                cache.invalidate(doc_id)
+            updated += len(rows)
+            last_id = rows[-1][0]
+            print(f"Updated {updated} documents (last id {last_id})")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return updated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--processes", type=int, help="Analyze large batches in this many worker processes")
+    parser.add_argument("--all", action="store_true", help="Recompute every description, not only outdated ones")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.app.core.database import SessionLocal
+
+    start = time.perf_counter()
+    updated = backfill(SessionLocal, args.batch_size, args.processes, args.all)
+    elapsed = time.perf_counter() - start
+    print(f"Backfilled {updated} documents in {elapsed:.1f}s ({updated / max(elapsed, 1e-9):.0f} docs/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Compare single-item POST /documents/ against POST /documents/bulk.
+
+    poetry run python scripts/benchmark_bulk.py --documents 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_documents(count: int):
+    return [{"title": f"Doc {i}", "content": "bulk benchmark content " * 50} for i in range(count)]
+
+async def run(count: int):
+    from httpx import AsyncClient
+    from src.app.core.database import init_db
+    from src.app.main import app
+    from src.app.services.text_executor import get_text_executor
+
+    init_db()
+    # AsyncClient does not run the lifespan, which starts the analysis
+    # workers; otherwise the first bulk request would pay for it
+    executor = get_text_executor()
+    executor.start()
+    docs = make_documents(count)
+    async with AsyncClient(app=app, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        for doc in docs:
+            (await client.post("/api/v1/documents/", json=doc)).raise_for_status()
+        single = count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        (await client.post("/api/v1/documents/bulk", json=docs)).raise_for_status()
+        bulk = count / (time.perf_counter() - start)
+
+        ndjson = "\n".join(json.dumps(doc) for doc in docs)
+        start = time.perf_counter()
+        (await client.post("/api/v1/documents/bulk", content=ndjson,
+                           headers={"Content-Type": "application/x-ndjson"})).raise_for_status()
+        streamed = count / (time.perf_counter() - start)
+
+    executor.shutdown()
+
+    print(f"single: {single:10.1f} docs/s")
+    print(f"bulk:   {bulk:10.1f} docs/s ({bulk / single:.1f}x)")
+    print(f"ndjson: {streamed:10.1f} docs/s ({streamed / single:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--database-url", help="Benchmark an existing database instead of a temporary SQLite file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmp}/bench.db"
+        os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+        sys.path.insert(0, ROOT)
+        asyncio.run(run(args.documents))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare documents API throughput on the sync and async database paths.
+
+Each mode runs in its own interpreter because the session dependency is
+chosen from settings at import time:
+
+    poetry run python scripts/benchmark_db.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+async def run_load(requests: int, concurrency: int) -> float:
+    from httpx import AsyncClient
+    from src.app.core.database import init_db
+    from src.app.main import app
+
+    init_db()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                if i % 4 == 0:
+                    response = await client.post(
+                        "/api/v1/documents/",
+                        json={"title": f"Doc {i}", "content": "benchmark content " * 20}
+                    )
+                else:
+                    response = await client.get("/api/v1/documents/?limit=10")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+def run_worker(args):
+    rps = asyncio.run(run_load(args.requests, args.concurrency))
+    print(f"{rps:.1f}")
+
+def run_mode(mode: str, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=args.database_url or f"sqlite:///{tmp}/bench.db",
+            DATABASE_ASYNC="true" if mode == "async" else "false",
+            OUTBOX_RELAY_ENABLED="false",
+        )
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker",
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=env, cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--database-url", help="Benchmark an existing database instead of a temporary SQLite file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        sys.path.insert(0, ROOT)
+        run_worker(args)
+        return
+
+    results = {mode: run_mode(mode, args) for mode in ("sync", "async")}
+    for mode, rps in results.items():
+        print(f"{mode:>5}: {rps:8.1f} req/s")
+    print(f"async/sync: {results['async'] / results['sync']:.2f}x")
+
+if __name__ == "__main__":
+    main()
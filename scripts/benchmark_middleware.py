@@ -0,0 +1,96 @@
+"""Measure the per-request overhead of the metrics middleware.
+
+Drives a FastAPI app with one templated route directly through ASGI, so
+no server or network is involved, and compares no middleware, the
+BaseHTTPMiddleware version main.py used before and the ASGI
+MetricsMiddleware:
+
+    poetry run python scripts/benchmark_middleware.py --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def build_app(middleware=None):
+    from fastapi import FastAPI
+
+    app = FastAPI()
+
+    @app.get("/documents/{doc_id}")
+    async def read(doc_id: int):
+        return {"id": doc_id}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+def legacy_middleware():
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    from src.app.core.metrics import REQUEST_COUNT, REQUEST_DURATION
+
+    class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+        # What main.py did before: raw paths as labels, a task per request
+        async def dispatch(self, request, call_next):
+            start_time = time.time()
+            response = await call_next(request)
+            REQUEST_COUNT.labels(
+                method=request.method, endpoint=request.url.path, status=response.status_code
+            ).inc()
+            REQUEST_DURATION.labels(
+                method=request.method, endpoint=request.url.path
+            ).observe(time.time() - start_time)
+            return response
+
+    return LegacyMetricsMiddleware
+
+async def drive(app, requests: int) -> float:
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(requests):
+        messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+        async def receive():
+            return next(messages, {"type": "http.disconnect"})
+
+        path = f"/documents/{i}"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.app.api.middleware import MetricsMiddleware
+    from src.app.core.metrics import REQUEST_COUNT
+
+    variants = [
+        ("none", None),
+        ("BaseHTTPMiddleware", legacy_middleware()),
+        ("ASGI MetricsMiddleware", MetricsMiddleware),
+    ]
+    baseline = None
+    for name, middleware in variants:
+        app = build_app(middleware)
+        asyncio.run(drive(app, min(args.requests, 1000)))  # Warm up
+        per_request = asyncio.run(drive(app, args.requests))
+        baseline = per_request if baseline is None else baseline
+        series = len({sample.labels.get("endpoint") for sample in REQUEST_COUNT.collect()[0].samples})
+        print(f"{name:>24}: {per_request * 1e6:7.1f} us/request "
+              f"(+{(per_request - baseline) * 1e6:5.1f} us), {series} endpoint series so far")
+
+if __name__ == "__main__":
+    main()
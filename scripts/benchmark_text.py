@@ -0,0 +1,70 @@
+"""Compare the text statistics paths on documents of different sizes.
+
+Reports time per document and peak allocated memory for the original
+split()-based counting, the chunked process_text used for descriptions and
+the full single-pass analyzer (also fed as a stream of chunks):
+
+    poetry run python scripts/benchmark_text.py --sizes 1000 100000 5000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet.", "consectetur", "adipiscing", "elit!",
+         "sed", "do", "eiusmod", "tempor?", "incididunt", "ut", "labore\n", "et", "dolore"]
+
+def make_text(chars: int) -> str:
+    rng = random.Random(chars)
+    parts, length = [], 0
+    while length < chars:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)[:chars]
+
+def legacy_stats(text: str) -> dict:
+    # What TextProcessor.process_text did before: split() builds every word
+    return {"words": len(text.split()), "chars": len(text)}
+
+def measure(func, repeat: int):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000, 5_000_000],
+                        help="Document sizes in characters")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.app.services.text_processor import DEFAULT_CHUNK_SIZE, TextProcessor
+
+    print(f"{'size':>10} {'variant':<16} {'ms/doc':>10} {'peak KiB':>10}")
+    for size in args.sizes:
+        text = make_text(size)
+        repeat = max(1, 2_000_000 // max(size, 1))
+        variants = {
+            "legacy split": lambda: legacy_stats(text),
+            "process_text": lambda: TextProcessor.process_text(text),
+            "analyze": lambda: TextProcessor.analyze(text),
+            "analyze stream": lambda: TextProcessor.analyze(
+                text[i:i + DEFAULT_CHUNK_SIZE] for i in range(0, len(text), DEFAULT_CHUNK_SIZE)
+            ),
+        }
+        for name, func in variants.items():
+            seconds, peak = measure(func, repeat)
+            print(f"{size:>10} {name:<16} {seconds * 1000:>10.3f} {peak / 1024:>10.1f}")
+
+if __name__ == "__main__":
+    main()
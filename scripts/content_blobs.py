@@ -0,0 +1,39 @@
+"""Maintain the content-addressed blobs that hold large document bodies.
+
+compact moves large bodies stored inline (e.g. written before blobs were
+enabled) to the blob table; gc deletes blobs no document references any
+more once they are older than the grace period:
+
+    poetry run python scripts/content_blobs.py compact --batch-size 1000
+    poetry run python scripts/content_blobs.py gc --grace-seconds 3600
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    compact = commands.add_parser("compact", help="Move large inline bodies to the blob table")
+    compact.add_argument("--batch-size", type=int, default=1000)
+    gc = commands.add_parser("gc", help="Delete unreferenced blobs")
+    gc.add_argument("--grace-seconds", type=int, help="Defaults to CONTENT_BLOB_GC_GRACE_SECONDS")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.app.core.database import SessionLocal
+    from src.app.services.blobs import delete_orphaned_blobs, externalize_existing
+
+    start = time.perf_counter()
+    with SessionLocal() as session:
+        if args.command == "compact":
+            print(f"Moved {externalize_existing(session, args.batch_size)} document bodies to blobs", end="")
+        else:
+            print(f"Deleted {delete_orphaned_blobs(session, args.grace_seconds)} unreferenced blobs", end="")
+    print(f" in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
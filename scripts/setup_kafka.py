@@ -1,28 +1,56 @@
-from kafka.admin import KafkaAdminClient, NewTopic
+import argparse
+
+from kafka.admin import KafkaAdminClient, NewPartitions, NewTopic
 from kafka.errors import TopicAlreadyExistsError
 from src.app.core.config import settings
 
-def setup_kafka():
-    print("Setting up Kafka topic...")
+def ensure_partitions(admin_client, topic_name, num_partitions):
+    """Grow an existing topic to ``num_partitions``; Kafka cannot shrink topics."""
+    metadata = admin_client.describe_topics([topic_name])[0]
+    current = len(metadata.get('partitions', []))
+    if current >= num_partitions:
+        print(f"Topic {topic_name} already has {current} partitions")
+        return
+    admin_client.create_partitions({topic_name: NewPartitions(total_count=num_partitions)})
+    # Documents hash to a partition by id, so in-flight keys may move once
+    print(f"Increased partitions of {topic_name} from {current} to {num_partitions}")
+
+def setup_kafka(num_partitions=None, replication_factor=None):
+    num_partitions = num_partitions or settings.KAFKA_TOPIC_PARTITIONS
+    replication_factor = replication_factor or settings.KAFKA_TOPIC_REPLICATION_FACTOR
+    print("Setting up Kafka topics...")
     admin_client = KafkaAdminClient(
         bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS
     )
-    
-    topic = NewTopic(
-        name=settings.KAFKA_TOPIC,
-        num_partitions=1,
-        replication_factor=1
-    )
-    
+
+    # The retry topic is consumed like the main topic, so it gets as many
+    # partitions; the dead-letter topic is only read by the replay tool
+    topics = [
+        (settings.KAFKA_TOPIC, num_partitions),
+        (settings.KAFKA_RETRY_TOPIC, num_partitions),
+        (settings.KAFKA_DEAD_LETTER_TOPIC, 1),
+    ]
     try:
-        admin_client.create_topics([topic])
-        print(f"Created topic: {settings.KAFKA_TOPIC}")
-    except TopicAlreadyExistsError:
-        print(f"Topic {settings.KAFKA_TOPIC} already exists")
-    except Exception as e:
-        print(f"Error creating topic: {e}")
+        for name, partitions in topics:
+            topic = NewTopic(
+                name=name,
+                num_partitions=partitions,
+                replication_factor=replication_factor
+            )
+            try:
+                admin_client.create_topics([topic])
+                print(f"Created topic: {name} with {partitions} partitions")
+            except TopicAlreadyExistsError:
+                print(f"Topic {name} already exists")
+                ensure_partitions(admin_client, name, partitions)
+            except Exception as e:
+                print(f"Error creating topic {name}: {e}")
     finally:
         admin_client.close()
 
 if __name__ == "__main__":
-    setup_kafka() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create or grow the documents, retry and dead-letter topics")
+    parser.add_argument("--partitions", type=int, help="Defaults to KAFKA_TOPIC_PARTITIONS")
+    parser.add_argument("--replication-factor", type=int, help="Defaults to KAFKA_TOPIC_REPLICATION_FACTOR")
+    args = parser.parse_args()
+    setup_kafka(args.partitions, args.replication_factor)
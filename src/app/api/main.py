@@ -1,10 +1,12 @@
 from fastapi import FastAPI
 from .routes import documents
 from ..core.config import settings
+from ..lifespan import lifespan
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 app.include_router(documents.router, prefix=settings.API_V1_STR)
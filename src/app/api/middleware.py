@@ -0,0 +1,100 @@
+from time import perf_counter
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.metrics import (
+    REQUEST_COUNT,
+    REQUEST_DURATION,
+    REQUEST_RESPONSE_SIZE,
+    REQUESTS_IN_PROGRESS,
+    TRACE_ID,
+    exemplar,
+)
+
+# Methods outside this set share one label value, so arbitrary client
+# input cannot create new time series
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+UNMATCHED = "unmatched"
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled ``scope``, e.g. /api/v1/documents/{doc_id}.
+
+    The router stores the matched route in the scope it was given, so it is
+    available once the request was handled. Requests no route matched (404s,
+    mounted apps) are reported as one "unmatched" endpoint.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return UNMATCHED
+    return scope.get("root_path", "") + path
+
+def trace_id(scope: Scope) -> Optional[str]:
+    """Trace id from a W3C traceparent header, else the X-Request-ID header."""
+    request_id = None
+    for name, value in scope["headers"]:
+        if name == b"traceparent":
+            parts = value.split(b"-")
+            if len(parts) == 4 and len(parts[1]) == 32:
+                return parts[1].decode("latin-1")
+        elif name == b"x-request-id":
+            # Exemplar labels are limited to 128 characters in total
+            request_id = value[:64].decode("latin-1")
+    return request_id
+
+class MetricsMiddleware:
+    """Request count, latency, response size and in-flight requests per route.
+
+    A plain ASGI middleware rather than BaseHTTPMiddleware: the response is
+    passed through message by message, without an extra task or stream per
+    request, so streaming responses are not buffered. Labels use the route
+    template instead of the raw path, which keeps label cardinality bounded
+    by the number of routes. Slow requests attach their trace id to the
+    latency histogram as an exemplar.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        # Labelled children by label values; labels() takes a lock and
+        # builds a tuple on every call, which is most of the overhead
+        self._children = {}
+
+    def _child(self, metric, **labels):
+        key = (metric, *labels.values())
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = metric.labels(**labels)
+        return child
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        status_code = 500  # Reported when the app fails before responding
+        size = 0
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = self._child(REQUESTS_IN_PROGRESS, method=method)
+        in_progress.inc()
+        token = TRACE_ID.set(trace_id(scope))
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = perf_counter() - start
+            in_progress.dec()
+            endpoint = route_template(scope)
+            self._child(REQUEST_COUNT, method=method, endpoint=endpoint, status=str(status_code)).inc()
+            self._child(REQUEST_DURATION, method=method, endpoint=endpoint).observe(duration, exemplar(duration))
+            self._child(REQUEST_RESPONSE_SIZE, method=method, endpoint=endpoint).observe(size)
+            TRACE_ID.reset(token)
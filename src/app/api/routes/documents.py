@@ -1,62 +1,253 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from typing import AsyncIterator, List, Optional, Tuple, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import time
 from ...core.logging import logger
 
-from ...core.database import get_db
-from ...schemas.document import DocumentCreate, DocumentUpdate, DocumentResponse
-from ...services.document import DocumentService
-from ...services.kafka_producer import MessageProducer
+from ...core.config import settings
+from ...core.database import get_async_db, get_db
+from ...schemas.document import (
+    DOCUMENT_FIELDS,
+    SUMMARY_FIELDS,
+    BulkCreateResponse,
+    BulkItemResult,
+    DocumentCreate,
+    DocumentResponse,
+    DocumentSummary,
+    DocumentUpdate,
+    SearchResult,
+)
+from ...services.document import AsyncDocumentService
+from ...services.pagination import InvalidCursorError
+from ...services.search import SearchUnavailableError
+from ...services.text_executor import TextExecutorBusy
 from ...core.metrics import REQUEST_COUNT, REQUEST_DURATION, DOCUMENT_SIZE
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
-def get_document_service(db: Session = Depends(get_db)) -> DocumentService:
-    producer = MessageProducer()
-    return DocumentService(db, producer)
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Text analysis queue is full, retry later",
+        headers={"Retry-After": str(settings.TEXT_EXECUTOR_RETRY_AFTER_SECONDS)}
+    )
+
+def _get_sync_document_service(db: Session = Depends(get_db)) -> AsyncDocumentService:
+    return AsyncDocumentService(db)
+
+async def _get_async_document_service(db: AsyncSession = Depends(get_async_db)) -> AsyncDocumentService:
+    return AsyncDocumentService(db)
+
+# Chosen once at import: the async engine needs asyncpg/aiosqlite installed
+get_document_service = (
+    _get_async_document_service if settings.DATABASE_ASYNC else _get_sync_document_service
+)
 
 @router.post("/", response_model=DocumentResponse, status_code=status.HTTP_201_CREATED)
-async def create_document(request: Request, doc: DocumentCreate, service: DocumentService = Depends(get_document_service)):
+async def create_document(request: Request, doc: DocumentCreate, service: AsyncDocumentService = Depends(get_document_service)):
     try:
-        result = service.create(doc)
+        result = await service.create(doc)
         return result
+    except TextExecutorBusy:
+        raise _busy()
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()
+    )
+
+async def _ndjson_items(request: Request) -> AsyncIterator[bytes]:
+    """Yield NDJSON lines as they arrive, without buffering the whole body."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+async def _json_array_items(request: Request) -> AsyncIterator[dict]:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of documents")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of documents")
+    if len(body) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} documents per request")
+    for item in body:
+        yield item
+
+def _parse_bulk_item(item: Union[bytes, dict]) -> Tuple[Optional[DocumentCreate], Optional[str]]:
+    try:
+        if isinstance(item, bytes):
+            return DocumentCreate.model_validate_json(item), None
+        return DocumentCreate.model_validate(item), None
+    except ValidationError as e:
+        return None, _validation_error(e)
+
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_documents_bulk(
+    request: Request,
+    service: AsyncDocumentService = Depends(get_document_service)
+):
+    """Create many documents from a JSON array or a streamed NDJSON body.
+
+    Valid items are inserted in chunks of BULK_CHUNK_SIZE, each chunk in its
+    own transaction; invalid items are reported by index and skipped.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        items = _ndjson_items(request)
+    else:
+        items = _json_array_items(request)
+
+    results: List[BulkItemResult] = []
+    chunk: List[Tuple[int, DocumentCreate]] = []
+
+    async def flush_chunk():
+        try:
+            ids = await service.create_many([doc for _, doc in chunk])
+            results.extend(BulkItemResult(index=index, id=doc_id) for (index, _), doc_id in zip(chunk, ids))
+        except TextExecutorBusy:
+            results.extend(BulkItemResult(index=index, error=_busy().detail) for index, _ in chunk)
+        except Exception as e:
+            logger.error(f"Bulk chunk of {len(chunk)} documents failed: {e}")
+            results.extend(BulkItemResult(index=index, error="Internal Server Error") for index, _ in chunk)
+        chunk.clear()
+
+    index = 0
+    async for item in items:
+        if index >= settings.BULK_MAX_ITEMS:
+            # Streamed bodies can't be sized up front: stop reading and say so
+            results.append(BulkItemResult(index=index, error=f"Stopped after {settings.BULK_MAX_ITEMS} documents"))
+            break
+        doc, error = _parse_bulk_item(item)
+        if error:
+            results.append(BulkItemResult(index=index, error=error))
+        else:
+            chunk.append((index, doc))
+            if len(chunk) >= settings.BULK_CHUNK_SIZE:
+                await flush_chunk()
+        index += 1
+    if chunk:
+        await flush_chunk()
+
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.id is not None)
+    return BulkCreateResponse(created=created, failed=len(results) - created, items=results)
+
+@router.get("/search", response_model=List[SearchResult])
+async def search_documents(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=500),
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=settings.DOCUMENTS_MAX_PAGE_SIZE),
+    service: AsyncDocumentService = Depends(get_document_service)
+):
+    """Full-text search over titles and contents, best matches first.
+
+    Follow the X-Next-Cursor response header with ``?cursor=`` (and the
+    same ``q``) for the next page. Documents become searchable once the
+    consumer has indexed them.
+    """
+    try:
+        page = await service.search(q, cursor, limit)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except SearchUnavailableError:
+        raise HTTPException(status_code=501, detail="Search is not available on this database")
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    return page.items
+
 @router.get("/{doc_id}", response_model=DocumentResponse)
-def get_document(
+async def get_document(
     doc_id: int,
-    service: DocumentService = Depends(get_document_service)
+    service: AsyncDocumentService = Depends(get_document_service)
 ):
-    doc = service.get(doc_id)
+    doc = await service.get(doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     return doc
 
+def _parse_fields(fields: Optional[str], summary: bool) -> Optional[tuple]:
+    if fields:
+        requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [f for f in requested if f not in DOCUMENT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # The id is always returned so items can be fetched in full later
+        return ("id",) + tuple(f for f in requested if f != "id")
+    if summary:
+        return SUMMARY_FIELDS
+    return None
+
 @router.get("/", response_model=List[DocumentResponse])
-def list_documents(
-    skip: int = 0,
-    limit: int = 10,
-    service: DocumentService = Depends(get_document_service)
+async def list_documents(
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=settings.DOCUMENTS_MAX_PAGE_SIZE),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title"),
+    summary: bool = Query(False, description="Return every field except content"),
+    service: AsyncDocumentService = Depends(get_document_service)
 ):
-    return service.list(skip, limit)
+    """List documents ordered by creation time.
+
+    Pages are keyset based: follow the X-Next-Cursor / X-Prev-Cursor response
+    headers with ``?cursor=``. ``skip`` still works but costs O(skip).
+    With ``fields`` or ``summary`` only those columns are read from the
+    database and returned; fetch full bodies with GET /documents/{id}.
+    """
+    projection = _parse_fields(fields, summary)
+    headers = {}
+    if skip and not cursor:
+        items = await service.list(skip, limit, projection)
+    else:
+        try:
+            page = await service.list_page(cursor, limit, projection)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        items = page.items
+        if page.next_cursor:
+            headers["X-Next-Cursor"] = page.next_cursor
+        if page.prev_cursor:
+            headers["X-Prev-Cursor"] = page.prev_cursor
+
+    if projection is None:
+        response.headers.update(headers)
+        return items
+    # Serialize only the loaded columns; touching a deferred one would load it
+    body = [
+        DocumentSummary(**{name: getattr(doc, name) for name in projection}).model_dump(exclude_unset=True)
+        for doc in items
+    ]
+    return JSONResponse(content=jsonable_encoder(body), headers=headers)
 
 @router.put("/{doc_id}", response_model=DocumentResponse)
-def update_document(
+async def update_document(
     doc_id: int,
     doc: DocumentUpdate,
-    service: DocumentService = Depends(get_document_service)
+    service: AsyncDocumentService = Depends(get_document_service)
 ):
-    updated_doc = service.update(doc_id, doc)
+    updated_doc = await service.update(doc_id, doc)
     if not updated_doc:
         raise HTTPException(status_code=404, detail="Document not found")
     return updated_doc
 
 @router.delete("/{doc_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_document(
+async def remove_document(
     doc_id: int,
-    service: DocumentService = Depends(get_document_service)
+    service: AsyncDocumentService = Depends(get_document_service)
 ):
-    if not service.remove(doc_id):
-        raise HTTPException(status_code=404, detail="Document not found") 
\ No newline at end of file
+    if not await service.remove(doc_id):
+        raise HTTPException(status_code=404, detail="Document not found")
\ No newline at end of file
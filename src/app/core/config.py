@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,10 +9,152 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./app.db"  # Default to SQLite
+    # Serve the documents API through an AsyncEngine (asyncpg/aiosqlite)
+    DATABASE_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None  # Derived from DATABASE_URL if unset
+    # Connection pool, sized per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # Seconds; stay below server/proxy idle timeouts
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000  # Postgres only, 0 disables
+    # SQLite pragmas applied to every new connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    
+    # Document read cache: "memory" (per process LRU), "shared" (Redis at
+    # CACHE_REDIS_URL, or an in-process stand-in when unset) or "none"
+    DOCUMENT_CACHE_BACKEND: str = "memory"
+    DOCUMENT_CACHE_TTL_SECONDS: float = 30.0
+    DOCUMENT_CACHE_MAX_ENTRIES: int = 10000
+    DOCUMENT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_REDIS_URL: Optional[str] = None
+    
+    # Pagination
+    DOCUMENTS_MAX_PAGE_SIZE: int = 100
+
+    # Bodies of at least CONTENT_BLOB_MIN_CHARS are stored once per distinct
+    # content in the content_blobs table, compressed with "zstd" (needs the
+    # zstandard package, else zlib is used), "zlib" or "none"; events then
+    # reference them by hash instead of carrying the body
+    CONTENT_BLOBS_ENABLED: bool = True
+    CONTENT_BLOB_MIN_CHARS: int = 4096
+    CONTENT_BLOB_COMPRESSION: str = "zstd"
+    CONTENT_BLOB_COMPRESSION_LEVEL: int = 3
+    # Unreferenced blobs are removed by `scripts/content_blobs.py gc` after this long
+    CONTENT_BLOB_GC_GRACE_SECONDS: int = 3600
+
+    # Full-text search: Postgres text search configuration (stemming and
+    # stop words) and the number of words around each highlighted match
+    SEARCH_LANGUAGE: str = "english"
+    SEARCH_SNIPPET_WORDS: int = 16
+    # "database" (tsvector/FTS5) or "inverted_index": the in-process index
+    # in services/inverted_index.py, kept up to date by the consumer and
+    # memory-mapped by every API worker. Deletions publish no event, so
+    # deleted documents leave that index only when it catches up (consumer
+    # start, scripts/build_inverted_index.py); until then searches skip them
+    # but they still count towards the BM25 statistics
+    SEARCH_BACKEND: str = "database"
+    INVERTED_INDEX_PATH: str = "./documents.idx"
+    INVERTED_INDEX_FLUSH_SECONDS: float = 10.0
+
+    # Text analysis runs in a bounded pool ("process", "thread", or 0 workers
+    # for inline) so CPU-heavy work never blocks the event loop. Requests are
+    # rejected with 503 once TEXT_EXECUTOR_MAX_PENDING analyses are queued.
+    TEXT_EXECUTOR_KIND: str = "process"
+    TEXT_EXECUTOR_WORKERS: int = 2
+    TEXT_EXECUTOR_MAX_PENDING: int = 64
+    TEXT_EXECUTOR_RETRY_AFTER_SECONDS: int = 1
+    # Shorter texts are cheaper to describe than to ship to a worker
+    TEXT_EXECUTOR_INLINE_MAX_CHARS: int = 16384
+    
+    # Bulk ingest: rows per INSERT/transaction and items per request
+    BULK_CHUNK_SIZE: int = 500
+    BULK_MAX_ITEMS: int = 10000
     
     # Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = "localhost:9092"
     KAFKA_TOPIC: str = "documents"
+    KAFKA_TOPIC_PARTITIONS: int = 6
+    KAFKA_TOPIC_REPLICATION_FACTOR: int = 1
+    KAFKA_PRODUCER_CLOSE_TIMEOUT: float = 10.0  # Seconds to wait for flush on shutdown
+    # Producer tuning: "default" keeps kafka-python defaults, "throughput"
+    # enables batching and compression. Explicit values override the profile.
+    KAFKA_PRODUCER_PROFILE: str = "default"
+    KAFKA_LINGER_MS: Optional[int] = None
+    KAFKA_BATCH_SIZE: Optional[int] = None
+    KAFKA_COMPRESSION_TYPE: Optional[str] = None  # gzip, lz4 or zstd
+    KAFKA_ACKS: Optional[str] = None  # 0, 1 or all
+
+    # Transactional outbox: events are stored with the document and relayed
+    # to Kafka by a background task instead of being sent inside the request
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_RELAY_ENABLED: bool = True  # Run the relay task in this process
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 0.5
+    OUTBOX_SEND_TIMEOUT: float = 10.0
+    OUTBOX_RETRY_BACKOFF_SECONDS: float = 1.0
+    OUTBOX_RETRY_BACKOFF_MAX_SECONDS: float = 60.0
+
+    # Consumer: batch mode applies a whole poll in one query/UPDATE/commit and
+    # commits offsets only after the database commit succeeded
+    KAFKA_CONSUMER_GROUP: str = "document_processor"
+    KAFKA_CONSUMER_BATCH_MODE: bool = True
+    KAFKA_MAX_POLL_RECORDS: int = 500
+    KAFKA_POLL_TIMEOUT_MS: int = 1000
+    # Partitions of one poll are applied concurrently by this many threads;
+    # KAFKA_CONSUMER_PROCESSES > 1 runs that many group members under a supervisor
+    KAFKA_CONSUMER_WORKERS: int = 4
+    KAFKA_CONSUMER_PROCESSES: int = 1
+    # Failed records are re-published to the retry topic with exponential
+    # backoff and moved to the dead-letter topic after the last attempt
+    KAFKA_RETRY_TOPIC: str = "documents.retry"
+    KAFKA_DEAD_LETTER_TOPIC: str = "documents.dlq"
+    CONSUMER_MAX_ATTEMPTS: int = 5
+    CONSUMER_RETRY_BACKOFF_SECONDS: float = 1.0
+    CONSUMER_RETRY_BACKOFF_MAX_SECONDS: float = 300.0
+    CONSUMER_FORWARD_TIMEOUT: float = 10.0
+    # Documents whose latest applied version each consumer remembers, so
+    # redelivered and stale events are skipped without a database round trip
+    CONSUMER_DEDUP_WINDOW: int = 10000
+    CONSUMER_BATCH_SIZE_BUCKETS: List[float] = [1, 5, 10, 25, 50, 100, 250, 500, 1000]
+    CONSUMER_BATCH_LATENCY_BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+    # The consumer serves /metrics on this port (0 disables it); with several
+    # consumer processes the supervisor serves them all, which needs
+    # PROMETHEUS_MULTIPROC_DIR. Partition lag asks the brokers for end
+    # offsets at most every CONSUMER_LAG_INTERVAL_SECONDS.
+    CONSUMER_METRICS_PORT: int = 8000
+    CONSUMER_LAG_INTERVAL_SECONDS: float = 5.0
+
+    # Latency histogram buckets in seconds. They are densest around the
+    # SLOs (requests in 1-50 ms), so p50 and p99 can be told apart; adjust
+    # them together with the SLOs. Stages are the steps of one request.
+    REQUEST_LATENCY_BUCKETS: List[float] = [
+        0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.03, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+    ]
+    STAGE_LATENCY_BUCKETS: List[float] = [
+        0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+    ]
+    PROCESSING_LATENCY_BUCKETS: List[float] = [
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+    ]
+    # Observations at least this slow carry the request's trace id (from the
+    # traceparent or X-Request-ID header) as an exemplar, exposed to
+    # scrapers that ask for the OpenMetrics format
+    METRICS_EXEMPLAR_MIN_SECONDS: float = 0.05
+    # Directory shared by all worker processes for multiprocess metrics;
+    # required when running more than one worker (e.g. uvicorn --workers)
+    # and emptied before the workers start, see docker/init-api.sh
+    PROMETHEUS_MULTIPROC_DIR: Optional[str] = None
+    # Memory, CPU, file descriptors and threads are sampled this often by a
+    # background thread; GC pauses are recorded as they happen. The API also
+    # measures event loop lag with a timer every EVENT_LOOP_LAG_INTERVAL_SECONDS.
+    SYSTEM_METRICS_ENABLED: bool = True
+    SYSTEM_METRICS_INTERVAL_SECONDS: float = 5.0
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = 0.5
 
     class Config:
         case_sensitive = True
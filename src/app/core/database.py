@@ -1,16 +1,107 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import settings
+from .metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_WAIT
+
+class _TimedCheckoutMixin:
+    """Observes how long callers wait for a pooled connection."""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(engine=self.metrics_label).observe(time.perf_counter() - start)
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    metrics_label = "sync"
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(database_url: str, is_async: bool = False) -> dict:
+    """Build create_engine keyword arguments for the configured backend."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    options = {}
+    connect_args = {}
+
+    if not _is_memory_sqlite(url):
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+
+    if backend == "sqlite" and not is_async:
+        connect_args["check_same_thread"] = False
+    elif backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        # Enforced by the server so runaway queries free their connection
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": timeout}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def instrument_engine(engine: Engine, label: str = "sync") -> Engine:
+    """Attach SQLite pragmas and pool gauges to a (sync) Engine."""
+    if engine.dialect.name == "sqlite" and not _is_memory_sqlite(engine.url):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+    pool = engine.pool
+    checked_out = DB_POOL_CHECKED_OUT.labels(engine=label)
+    overflow = DB_POOL_OVERFLOW.labels(engine=label)
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+        if isinstance(pool, QueuePool):
+            overflow.set(max(pool.overflow(), 0))
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+        if isinstance(pool, QueuePool):
+            overflow.set(max(pool.overflow(), 0))
+
+    return engine
+
+def create_db_engine(database_url: str) -> Engine:
+    return instrument_engine(create_engine(database_url, **engine_options(database_url)))
+
+engine = create_db_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Async engine, created on first use so asyncpg/aiosqlite stay optional
+async_engine = None
+AsyncSessionLocal = None
+
 # Create tables at startup
 def init_db():
     Base.metadata.create_all(bind=engine)
@@ -20,4 +111,41 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def async_database_url(url: str) -> str:
+    """Map a sync database URL to its async driver (asyncpg, aiosqlite)."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    if AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_database_url(settings.DATABASE_URL)
+        async_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        instrument_engine(async_engine.sync_engine, label="async")
+        # Objects are serialized after the session is done with them, outside
+        # the greenlet, so they must not expire on commit
+        AsyncSessionLocal = async_sessionmaker(
+            bind=async_engine, autoflush=False, expire_on_commit=False
+        )
+    return AsyncSessionLocal
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+async def dispose_async_engine():
+    global async_engine, AsyncSessionLocal
+    if async_engine is not None:
+        await async_engine.dispose()
+    async_engine = None
+    AsyncSessionLocal = None
@@ -1,9 +1,27 @@
-from prometheus_client import Counter, Histogram, Info, Gauge, REGISTRY, CollectorRegistry
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from prometheus_client import (
+    Counter, Histogram, Gauge, REGISTRY, CollectorRegistry, multiprocess, start_http_server, values
+)
 import time
 
-# Clear default registry to avoid duplicate metrics
-for collector in list(REGISTRY._collector_to_names.keys()):
-    REGISTRY.unregister(collector)
+from .config import settings
+
+# Multiprocess mode: with several workers every process writes its samples
+# to mmap'd files in PROMETHEUS_MULTIPROC_DIR and /metrics aggregates all of
+# them on scrape. prometheus_client reads the variable when it is imported,
+# so a value that only came from .env is applied before any metric exists.
+if settings.PROMETHEUS_MULTIPROC_DIR and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = settings.PROMETHEUS_MULTIPROC_DIR
+    values.ValueClass = values.get_value_class()
+
+def multiprocess_dir() -> Optional[str]:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR") or None
+
+if multiprocess_dir():
+    os.makedirs(multiprocess_dir(), exist_ok=True)
 
 # API Metrics
 REQUEST_COUNT = Counter(
@@ -16,7 +34,28 @@ REQUEST_DURATION = Histogram(
     'api_request_duration_seconds',
     'Request duration in seconds',
     ['method', 'endpoint'],
-    buckets=[0.1, 0.5, 1.0, 2.0, 5.0]
+    buckets=settings.REQUEST_LATENCY_BUCKETS
+)
+
+REQUEST_RESPONSE_SIZE = Histogram(
+    'api_response_size_bytes',
+    'Response body size in bytes',
+    ['method', 'endpoint'],
+    buckets=[100, 1000, 10000, 100000, 1000000, 10000000]
+)
+
+REQUESTS_IN_PROGRESS = Gauge(
+    'api_requests_in_progress',
+    'Requests currently being handled',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+DOCUMENT_STAGE_DURATION = Histogram(
+    'document_stage_duration_seconds',
+    'Time spent in each stage of a document operation',
+    ['operation', 'stage'],
+    buckets=settings.STAGE_LATENCY_BUCKETS
 )
 
 DOCUMENT_SIZE = Histogram(
@@ -29,7 +68,7 @@ DOCUMENT_SIZE = Histogram(
 PROCESSING_TIME = Histogram(
     'document_processing_seconds',
     'Time spent processing documents',
-    buckets=[0.1, 0.5, 1.0, 2.0, 5.0]
+    buckets=settings.PROCESSING_LATENCY_BUCKETS
 )
 
 PROCESSING_SUCCESS = Counter(
@@ -42,15 +81,157 @@ PROCESSING_FAILED = Counter(
     'Number of failed document processing attempts'
 )
 
+CONSUMER_BATCH_SIZE = Histogram(
+    'consumer_batch_size',
+    'Number of records handled per poll batch',
+    buckets=settings.CONSUMER_BATCH_SIZE_BUCKETS
+)
+
+CONSUMER_BATCH_DURATION = Histogram(
+    'consumer_batch_duration_seconds',
+    'Time to apply one poll batch, including the database commit',
+    buckets=settings.CONSUMER_BATCH_LATENCY_BUCKETS
+)
+
+CONSUMER_PARTITION_LAG = Gauge(
+    'consumer_partition_lag',
+    'Records between the committed offset and the partition end offset',
+    ['topic', 'partition'],
+    multiprocess_mode='livemax'
+)
+
+CONSUMER_RECORDS = Counter(
+    'consumer_records_total',
+    'Records handled and committed; its rate is the consumer throughput',
+    ['topic']
+)
+
+CONSUMER_POLL_DURATION = Histogram(
+    'consumer_poll_duration_seconds',
+    'Time spent in one poll, including waiting for records',
+    buckets=settings.STAGE_LATENCY_BUCKETS
+)
+
+CONSUMER_DB_WRITE_DURATION = Histogram(
+    'consumer_db_write_duration_seconds',
+    'Time spent writing one batch to the database, per statement kind',
+    ['operation'],
+    buckets=settings.STAGE_LATENCY_BUCKETS
+)
+
+CONSUMER_REBALANCES = Counter(
+    'consumer_rebalances_total',
+    'Partition assignment changes seen by this consumer',
+    ['event']
+)
+
+CONSUMER_ASSIGNED_PARTITIONS = Gauge(
+    'consumer_assigned_partitions',
+    'Partitions currently assigned to the consumer',
+    multiprocess_mode='livesum'
+)
+
+CONSUMER_MESSAGES_RETRIED = Counter(
+    'consumer_messages_retried_total',
+    'Records re-published to the retry topic after a processing failure'
+)
+
+CONSUMER_MESSAGES_DEAD_LETTERED = Counter(
+    'consumer_messages_dead_lettered_total',
+    'Records moved to the dead-letter topic',
+    ['reason']
+)
+
+CONSUMER_MESSAGES_SKIPPED = Counter(
+    'consumer_messages_skipped_total',
+    'Events skipped as duplicate or stale, or whose content was already described',
+    ['reason']
+)
+
+DOCUMENTS_INDEXED = Counter(
+    'documents_indexed_total',
+    'Documents (re)indexed for full-text search by the consumer'
+)
+
+# Text Analysis Executor Metrics
+TEXT_EXECUTOR_PENDING = Gauge(
+    'text_executor_pending',
+    'Text analyses submitted to the executor and not finished yet',
+    multiprocess_mode='livesum'
+)
+
+TEXT_EXECUTOR_REJECTED = Counter(
+    'text_executor_rejected_total',
+    'Text analyses rejected because the executor queue was full'
+)
+
+TEXT_EXECUTOR_QUEUE_WAIT = Histogram(
+    'text_executor_queue_wait_seconds',
+    'Time text analyses waited for a free worker',
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+)
+
+TEXT_EXECUTOR_DURATION = Histogram(
+    'text_executor_duration_seconds',
+    'Time spent running text analyses',
+    ['mode'],
+    buckets=[0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0]
+)
+
+# Content Blob Metrics
+CONTENT_BLOBS_WRITTEN = Counter(
+    'content_blobs_written_total',
+    'Distinct document bodies written to the blob table',
+    ['encoding']
+)
+
+CONTENT_BLOBS_DEDUPLICATED = Counter(
+    'content_blobs_deduplicated_total',
+    'Document bodies that referenced an already stored blob'
+)
+
+CONTENT_BLOB_BYTES = Counter(
+    'content_blob_bytes_total',
+    'Bytes of document bodies written to the blob table, before and after compression',
+    ['stage']
+)
+
 # System Metrics
 MEMORY_USAGE = Gauge(
     'app_memory_usage_bytes',
-    'Memory usage in bytes'
+    'Memory usage in bytes',
+    multiprocess_mode='livesum'
 )
 
 CPU_USAGE = Gauge(
     'app_cpu_usage_percent',
-    'CPU usage percentage'
+    'CPU usage percentage',
+    multiprocess_mode='livesum'
+)
+
+OPEN_FDS = Gauge(
+    'app_open_fds',
+    'Open file descriptors',
+    multiprocess_mode='livesum'
+)
+
+THREADS = Gauge(
+    'app_threads',
+    'Python threads alive',
+    multiprocess_mode='livesum'
+)
+
+GC_PAUSE = Histogram(
+    'app_gc_pause_seconds',
+    'Time the garbage collector stopped the process, per generation',
+    ['generation'],
+    buckets=[0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5]
+)
+
+EVENT_LOOP_LAG = Histogram(
+    'app_event_loop_lag_seconds',
+    'How late the event loop ran a timer; long blocking calls show up here',
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
 )
 
 # Metrics
@@ -69,4 +250,169 @@ KAFKA_MESSAGES_FAILED = Counter(
     'Number of failed Kafka message sends'
 )
 
-APP_INFO = Info('document_processor', 'Document processor information') 
\ No newline at end of file
+KAFKA_PRODUCER_INSTANCES = Gauge(
+    'kafka_producer_instances',
+    'Number of live Kafka producer instances in this process',
+    multiprocess_mode='livesum'
+)
+
+KAFKA_PRODUCER_UP = Gauge(
+    'kafka_producer_up',
+    'Whether the shared Kafka producer is connected (1) or not (0)',
+    multiprocess_mode='livemin'
+)
+
+# Database Pool Metrics
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    'Connections currently checked out of the pool',
+    ['engine'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    'Connections opened beyond pool_size',
+    ['engine'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting for a pooled connection',
+    ['engine'],
+    buckets=[0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
+)
+
+# Cache Metrics
+CACHE_HITS = Counter(
+    'document_cache_hits_total',
+    'Document cache hits',
+    ['cache']
+)
+
+CACHE_MISSES = Counter(
+    'document_cache_misses_total',
+    'Document cache misses',
+    ['cache']
+)
+
+CACHE_EVICTIONS = Counter(
+    'document_cache_evictions_total',
+    'Documents evicted from the cache to respect its size limits',
+    ['cache']
+)
+
+CACHE_ENTRIES = Gauge(
+    'document_cache_entries',
+    'Documents currently cached',
+    ['cache'],
+    multiprocess_mode='livesum'
+)
+
+CACHE_BYTES = Gauge(
+    'document_cache_bytes',
+    'Approximate size of cached documents in bytes',
+    ['cache'],
+    multiprocess_mode='livesum'
+)
+
+# Outbox Metrics
+OUTBOX_PENDING = Gauge(
+    'outbox_pending_events',
+    'Number of outbox events waiting to be published',
+    multiprocess_mode='livemax'
+)
+
+OUTBOX_LAG_SECONDS = Gauge(
+    'outbox_lag_seconds',
+    'Age of the oldest unpublished outbox event in seconds',
+    multiprocess_mode='livemax'
+)
+
+OUTBOX_PUBLISHED = Counter(
+    'outbox_events_published_total',
+    'Number of outbox events acknowledged by Kafka'
+)
+
+OUTBOX_PUBLISH_FAILED = Counter(
+    'outbox_events_failed_total',
+    'Number of outbox publish attempts that failed and were rescheduled'
+)
+
+# A gauge rather than an Info metric, which multiprocess mode does not support
+APP_INFO = Gauge(
+    'document_processor_info',
+    'Document processor information',
+    ['version', 'environment'],
+    multiprocess_mode='max'
+)
+
+# Trace id of the request being handled, set by the metrics middleware
+TRACE_ID: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+
+def exemplar(duration: float) -> Optional[Dict[str, str]]:
+    """Exemplar labels for a slow observation, linking it to its trace."""
+    trace_id = TRACE_ID.get()
+    if trace_id is None or duration < settings.METRICS_EXEMPLAR_MIN_SECONDS:
+        return None
+    return {"trace_id": trace_id}
+
+@contextmanager
+def timed(histogram, **labels):
+    """Observe the duration of the block, with an exemplar if it was slow."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        (histogram.labels(**labels) if labels else histogram).observe(duration, exemplar(duration))
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def reap_dead_processes(path: str) -> int:
+    """Drop the live gauges of worker processes that exited without cleanup.
+
+    Counters and histograms of dead workers are kept, so totals never go
+    backwards; only gauges in live* modes belong to running processes.
+    """
+    pids = set()
+    for name in os.listdir(path):
+        if name.startswith("gauge_live") and name.endswith(".db"):
+            pid = name[:-len(".db")].rsplit("_", 1)[-1]
+            if pid.isdigit():
+                pids.add(int(pid))
+    dead = [pid for pid in pids if pid != os.getpid() and not _alive(pid)]
+    for pid in dead:
+        multiprocess.mark_process_dead(pid, path)
+    return len(dead)
+
+def mark_process_exited():
+    """Remove this process's live gauges on shutdown, in multiprocess mode."""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(os.getpid(), multiprocess_dir())
+
+def start_metrics_server(port: int):
+    """Serve the metrics over HTTP from a daemon thread, for processes without an API."""
+    start_http_server(port, registry=metrics_registry())
+
+def metrics_registry() -> CollectorRegistry:
+    """The registry /metrics exposes.
+
+    In multiprocess mode a fresh registry aggregates the files of every
+    worker on each scrape; otherwise this process's default registry.
+    """
+    path = multiprocess_dir()
+    if not path:
+        return REGISTRY
+    reap_dead_processes(path)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path)
+    return registry
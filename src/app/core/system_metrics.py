@@ -0,0 +1,135 @@
+import asyncio
+import gc
+import os
+import resource
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from .config import settings
+from .logging import logger
+from .metrics import CPU_USAGE, EVENT_LOOP_LAG, GC_PAUSE, MEMORY_USAGE, OPEN_FDS, THREADS
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_FD_DIRS = ("/proc/self/fd", "/dev/fd")
+
+def rss_bytes() -> int:
+    """Current resident set size; the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def open_fds() -> Optional[int]:
+    for path in _FD_DIRS:
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+class GCPauseRecorder:
+    """Times garbage collections through gc.callbacks.
+
+    The callback only appends to a deque: observing a histogram takes a lock,
+    and a collection triggered while the same thread holds that lock would
+    deadlock. Pauses are observed later by drain(), from the collector thread.
+    """
+
+    def __init__(self, maxlen: int = 10000):
+        self.pauses = deque(maxlen=maxlen)
+        self._started_at = None
+
+    def __call__(self, phase: str, info: dict):
+        if phase == "start":
+            self._started_at = time.perf_counter()
+        elif self._started_at is not None:
+            self.pauses.append((info["generation"], time.perf_counter() - self._started_at))
+            self._started_at = None
+
+    def install(self):
+        if self not in gc.callbacks:
+            gc.callbacks.append(self)
+
+    def uninstall(self):
+        if self in gc.callbacks:
+            gc.callbacks.remove(self)
+
+    def drain(self) -> int:
+        drained = 0
+        while self.pauses:
+            generation, pause = self.pauses.popleft()
+            GC_PAUSE.labels(generation=str(generation)).observe(pause)
+            drained += 1
+        return drained
+
+class SystemMetricsCollector:
+    """Samples process metrics every ``interval`` seconds on a daemon thread.
+
+    Reports RSS, CPU usage (percent of one core, all threads), open file
+    descriptors, Python threads and the GC pauses since the last sample.
+    Each sample reads a few /proc files, so the overhead is negligible.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval if interval is not None else settings.SYSTEM_METRICS_INTERVAL_SECONDS
+        self.gc_pauses = GCPauseRecorder()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+
+    def collect(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        elapsed = wall - self._last_wall
+        if elapsed > 0:
+            CPU_USAGE.set(100.0 * (cpu - self._last_cpu) / elapsed)
+        self._last_wall, self._last_cpu = wall, cpu
+        MEMORY_USAGE.set(rss_bytes())
+        fds = open_fds()
+        if fds is not None:
+            OPEN_FDS.set(fds)
+        THREADS.set(threading.active_count())
+        self.gc_pauses.drain()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                logger.error(f"Error collecting system metrics: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.gc_pauses.install()
+        self.collect()
+        self._thread = threading.Thread(target=self._run, name="system-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.gc_pauses.uninstall()
+
+async def monitor_event_loop(stop: asyncio.Event, interval: Optional[float] = None):
+    """Observe how late a timer of ``interval`` seconds fires until ``stop`` is set.
+
+    Anything that blocks the loop (CPU work, sync I/O, long GC pauses) delays
+    the timer by as long as it ran.
+    """
+    interval = interval if interval is not None else settings.EVENT_LOOP_LAG_INTERVAL_SECONDS
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        scheduled = loop.time() + interval
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+            break
+        except asyncio.TimeoutError:
+            pass
+        EVENT_LOOP_LAG.observe(max(loop.time() - scheduled, 0.0))
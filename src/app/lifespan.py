@@ -0,0 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from .core.config import settings
+from .core.database import dispose_async_engine
+from .core.logging import logger
+from .core.metrics import mark_process_exited
+from .core.system_metrics import SystemMetricsCollector, monitor_event_loop
+from .services.kafka_producer import producer_manager
+from .services.outbox import OutboxRelay
+from .services.text_executor import get_text_executor
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start shared resources once per process and release them on shutdown."""
+    logger.info("Starting application resources")
+    producer_manager.start()
+    # Start all text analysis workers now, before requests are served
+    get_text_executor().start()
+    stop = asyncio.Event()
+    relay_task = None
+    if settings.OUTBOX_ENABLED and settings.OUTBOX_RELAY_ENABLED:
+        relay_task = asyncio.create_task(OutboxRelay().run(stop))
+    system_metrics = loop_lag_task = None
+    if settings.SYSTEM_METRICS_ENABLED:
+        system_metrics = SystemMetricsCollector()
+        system_metrics.start()
+        loop_lag_task = asyncio.create_task(monitor_event_loop(stop))
+    try:
+        yield
+    finally:
+        logger.info("Shutting down application resources")
+        stop.set()
+        if relay_task is not None:
+            await relay_task
+        if system_metrics is not None:
+            await loop_lag_task
+            system_metrics.stop()
+        get_text_executor().shutdown()
+        producer_manager.close(timeout=settings.KAFKA_PRODUCER_CLOSE_TIMEOUT)
+        await dispose_async_engine()
+        mark_process_exited()
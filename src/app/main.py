@@ -1,52 +1,36 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import Response
-from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest, make_asgi_app
+from prometheus_client.exposition import choose_encoder
+from .api.middleware import MetricsMiddleware
 from .api.routes import documents
 from .core.database import init_db
 from .core.config import settings
-from .core.metrics import APP_INFO, REQUEST_COUNT, REQUEST_DURATION
-from starlette.middleware.base import BaseHTTPMiddleware
-import time
+from .core.metrics import APP_INFO, metrics_registry
+from .lifespan import lifespan
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        REQUEST_COUNT.labels(
-            method=request.method,
-            endpoint=request.url.path,
-            status=response.status_code
-        ).inc()
-        REQUEST_DURATION.labels(
-            method=request.method,
-            endpoint=request.url.path
-        ).observe(time.time() - start_time)
-        return response
-
 app.add_middleware(MetricsMiddleware)
 
-# Add prometheus metrics endpoint
-metrics_app = make_asgi_app()
-app.mount("/metrics", metrics_app)
-
 @app.get("/metrics", include_in_schema=False)
-async def metrics():
-    """Endpoint to expose Prometheus metrics"""
+async def metrics(request: Request):
+    """Endpoint to expose Prometheus metrics, of all workers in multiprocess mode"""
+    # Exemplars are only part of the OpenMetrics format, served on request
+    encoder, content_type = choose_encoder(request.headers.get("accept"))
     return Response(
-        content=generate_latest(REGISTRY),
-        media_type=CONTENT_TYPE_LATEST
+        content=encoder(metrics_registry()),
+        media_type=content_type
     )
 
 # Set application info
-APP_INFO.info({
-    'version': '1.0.0',
-    'environment': getattr(settings, 'ENVIRONMENT', 'development')
-})
+APP_INFO.labels(
+    version='1.0.0',
+    environment=getattr(settings, 'ENVIRONMENT', 'development')
+).set(1)
 
 # Initialize database
 init_db()
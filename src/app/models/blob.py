@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, LargeBinary, String, DateTime
+
+from ..core.database import Base
+
+class ContentBlob(Base):
+    """A document body stored once per distinct content, see services/blobs.py.
+
+    Keyed by the SHA-256 of the content (Document.content_hash), so every
+    document with the same body references the same row.
+    """
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    encoding = Column(String(16), nullable=False)  # "identity", "zstd" or "zlib"
+    size = Column(Integer, nullable=False)  # Length of the UTF-8 encoded body
+    data = Column(LargeBinary, nullable=False)
+    # Refreshed whenever a document starts referencing the blob, so garbage
+    # collection never races a new reference
+    referenced_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
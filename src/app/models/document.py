@@ -1,16 +1,61 @@
+import hashlib
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import DDL, Column, Integer, String, Text, DateTime, Index, event
 
 from ..core.database import Base
 
+def hash_content(content: str) -> str:
+    """Fingerprint used to detect whether a description must be recomputed."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
 class Document(Base):
     __tablename__ = "documents"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
-    content = Column(Text, nullable=False)
+    # NULL when the body lives in content_blobs under content_hash
+    content = Column(Text, nullable=True)
     short_description = Column(String, nullable=True)
+    # Incremented on every change; events carry it so the consumer can drop
+    # stale or repeated ones. processed_version is the last version applied.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    processed_version = Column(Integer, nullable=True)
+    # Hash of the current content and of the content short_description was
+    # computed from; equal hashes mean there is nothing to reprocess
+    content_hash = Column(String(64), nullable=True)
+    description_hash = Column(String(64), nullable=True)
+    # Version the full-text index was last built from, see services/search.py
+    indexed_version = Column(Integer, nullable=True)
     created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, nullable=False, 
                        default=lambda: datetime.now(timezone.utc),
-                       onupdate=lambda: datetime.now(timezone.utc)) 
\ No newline at end of file
+                       onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # Keyset pagination order, see services/pagination.py
+        Index("ix_documents_created_at_id", "created_at", "id"),
+    )
+
+# The full-text index lives outside the ORM: a tsvector column with a GIN
+# index on Postgres, an FTS5 table keyed by document id on SQLite. Deleted
+# documents leave the FTS5 table through a trigger; everything else is
+# indexed by the consumer. Mirrors migrations/versions/document_search.py.
+SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE documents ADD COLUMN search_vector tsvector",
+        "CREATE INDEX ix_documents_search_vector ON documents USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts "
+        "USING fts5(title, content, tokenize='porter unicode61')",
+        "CREATE TRIGGER IF NOT EXISTS documents_fts_delete AFTER DELETE ON documents "
+        "BEGIN DELETE FROM documents_fts WHERE rowid = old.id; END",
+    ],
+}
+
+for _dialect, _statements in SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Document.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(
+    Document.__table__, "after_drop", DDL("DROP TABLE IF EXISTS documents_fts").execute_if(dialect="sqlite")
+)
@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+
+from ..core.database import Base
+
+class OutboxEvent(Base):
+    """Kafka event written in the same transaction as the change it describes.
+
+    Rows are removed by the outbox relay once the broker acknowledges them.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    aggregate_id = Column(Integer, nullable=False)  # Document the event belongs to
+    topic = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    available_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_outbox_events_aggregate_id_id", "aggregate_id", "id"),
+        Index("ix_outbox_events_available_at", "available_at"),
+    )
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 class DocumentBase(BaseModel):
@@ -17,10 +17,47 @@ class DocumentUpdate(BaseModel):
 
 class Document(DocumentBase):
     id: int
+    version: int
     created_at: datetime
     updated_at: datetime
     
     model_config = ConfigDict(from_attributes=True)
 
 class DocumentResponse(Document):
-    pass 
\ No newline at end of file
+    pass
+
+# Fields a client may request with ``fields=`` on the list endpoint
+DOCUMENT_FIELDS = ("id", "title", "content", "short_description", "version", "created_at", "updated_at")
+SUMMARY_FIELDS = ("id", "title", "short_description", "created_at", "updated_at")
+
+class DocumentSummary(BaseModel):
+    """Projected list item; only the requested fields are serialized."""
+    id: int
+    title: Optional[str] = None
+    content: Optional[str] = None
+    short_description: Optional[str] = None
+    version: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class SearchResult(BaseModel):
+    """Search hit; ``highlight`` is a content excerpt with matches in <mark> tags."""
+    id: int
+    title: str
+    short_description: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    rank: float
+    highlight: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class BulkItemResult(BaseModel):
+    index: int  # Position of the item in the request
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    items: List[BulkItemResult]
@@ -0,0 +1,176 @@
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, exists, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..core.config import settings
+from ..core.logging import logger
+from ..core.metrics import CONTENT_BLOB_BYTES, CONTENT_BLOBS_DEDUPLICATED, CONTENT_BLOBS_WRITTEN
+from ..models.blob import ContentBlob
+from ..models.document import Document, hash_content
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency; blobs are compressed with zlib instead
+    zstandard = None
+
+class MissingContentError(LookupError):
+    """Raised when a document references a blob that does not exist."""
+
+def externalize(content: Optional[str]) -> bool:
+    """Whether ``content`` is stored in the blob table rather than inline."""
+    return (
+        settings.CONTENT_BLOBS_ENABLED
+        and content is not None
+        and len(content) >= settings.CONTENT_BLOB_MIN_CHARS
+    )
+
+def compress(body: bytes) -> Tuple[str, bytes]:
+    """Encode ``body`` with the configured codec; returns (encoding, data)."""
+    codec = settings.CONTENT_BLOB_COMPRESSION
+    if codec == "zstd" and zstandard is None:
+        codec = "zlib"
+    level = settings.CONTENT_BLOB_COMPRESSION_LEVEL
+    if codec == "zstd":
+        data = zstandard.ZstdCompressor(level=level).compress(body)
+    elif codec == "zlib":
+        data = zlib.compress(body, min(max(level, 1), 9))
+    else:
+        return "identity", body
+    # Already compressed media and the like are stored as they are
+    if len(data) >= len(body):
+        return "identity", body
+    return codec, data
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "identity":
+        return bytes(data)
+    if encoding == "zlib":
+        return zlib.decompress(data)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compressed content requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown content encoding: {encoding}")
+
+def _insert_missing(session: Session):
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(ContentBlob).on_conflict_do_nothing(index_elements=["hash"])
+    if dialect == "sqlite":
+        return sqlite.insert(ContentBlob).on_conflict_do_nothing(index_elements=["hash"])
+    return insert(ContentBlob)
+
+def store_contents(session: Session, contents: Iterable[str]) -> int:
+    """Make sure a blob exists for every content; returns how many were written.
+
+    Blobs that already exist are only marked as referenced, so duplicate
+    bodies are neither compressed nor written again.
+    """
+    bodies = {hash_content(content): content for content in contents}
+    if not bodies:
+        return 0
+    now = datetime.now(timezone.utc)
+    existing = set(session.scalars(
+        update(ContentBlob)
+        .where(ContentBlob.hash.in_(list(bodies)))
+        .values(referenced_at=now)
+        .returning(ContentBlob.hash)
+    ))
+    CONTENT_BLOBS_DEDUPLICATED.inc(len(existing))
+    rows = []
+    for digest, content in bodies.items():
+        if digest in existing:
+            continue
+        body = content.encode("utf-8")
+        encoding, data = compress(body)
+        rows.append({"hash": digest, "encoding": encoding, "size": len(body), "data": data, "referenced_at": now})
+        CONTENT_BLOBS_WRITTEN.labels(encoding=encoding).inc()
+        CONTENT_BLOB_BYTES.labels(stage="raw").inc(len(body))
+        CONTENT_BLOB_BYTES.labels(stage="stored").inc(len(data))
+    if rows:
+        session.execute(_insert_missing(session), rows)
+    return len(rows)
+
+def load_contents(session: Session, hashes: Iterable[str]) -> Dict[str, str]:
+    """Bodies of the given blobs, by hash, with one IN query."""
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+    rows = session.query(ContentBlob.hash, ContentBlob.encoding, ContentBlob.data).filter(ContentBlob.hash.in_(hashes))
+    contents = {digest: decompress(encoding, data).decode("utf-8") for digest, encoding, data in rows}
+    missing = set(hashes) - contents.keys()
+    if missing:
+        raise MissingContentError(f"Missing content blobs: {', '.join(sorted(missing))}")
+    return contents
+
+def contents_of(session: Session, rows: Sequence[Tuple[Optional[str], Optional[str]]]) -> List[str]:
+    """Resolve (content, content_hash) pairs to bodies, loading external ones at once."""
+    external = load_contents(session, [digest for content, digest in rows if content is None and digest])
+    return [content if content is not None else external.get(digest, "") for content, digest in rows]
+
+def resolve_documents(session: Session, docs: Iterable[Document]) -> None:
+    """Fill in the content of documents whose body lives in the blob table.
+
+    Only documents whose content column was loaded are touched, and the
+    value is set as loaded state, so it is never written back inline.
+    """
+    pending = [
+        doc for doc in docs
+        if "content" in doc.__dict__ and doc.__dict__["content"] is None and doc.__dict__.get("content_hash")
+    ]
+    if not pending:
+        return
+    contents = load_contents(session, [doc.content_hash for doc in pending])
+    for doc in pending:
+        set_committed_value(doc, "content", contents[doc.content_hash])
+
+def delete_orphaned_blobs(session: Session, grace_seconds: Optional[int] = None) -> int:
+    """Delete blobs no document references that were not referenced recently."""
+    if grace_seconds is None:
+        grace_seconds = settings.CONTENT_BLOB_GC_GRACE_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    result = session.execute(
+        delete(ContentBlob)
+        .where(ContentBlob.referenced_at < cutoff)
+        .where(~exists().where(Document.content_hash == ContentBlob.hash))
+    )
+    session.commit()
+    if result.rowcount:
+        logger.info(f"Deleted {result.rowcount} unreferenced content blobs")
+    return result.rowcount
+
+EXTERNALIZE = (
+    update(Document.__table__)
+    .where(Document.id == bindparam("b_id"))
+    .values(content=None, content_hash=bindparam("b_hash"))
+)
+
+def externalize_existing(session: Session, batch_size: int = 1000) -> int:
+    """Move large inline bodies written before blobs were enabled to the blob table."""
+    moved = 0
+    last_id = 0
+    while True:
+        rows = (
+            session.query(Document.id, Document.content)
+            .filter(Document.id > last_id, Document.content.isnot(None))
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return moved
+        last_id = rows[-1].id
+        large = [(doc_id, content) for doc_id, content in rows if externalize(content)]
+        if not large:
+            continue
+        store_contents(session, [content for _, content in large])
+        session.execute(EXTERNALIZE, [
+            {"b_id": doc_id, "b_hash": hash_content(content)} for doc_id, content in large
+        ])
+        session.commit()
+        moved += len(large)
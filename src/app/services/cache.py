@@ -0,0 +1,213 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import settings
+from ..core.logging import logger
+from ..core.metrics import CACHE_BYTES, CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+class DocumentCache:
+    """Read-through cache of document rows, keyed by document id.
+
+    Values are plain dicts of column values so they can outlive the session
+    that loaded them.
+    """
+    name = "none"
+
+    def get(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        return None
+
+    def set(self, doc_id: int, row: Dict[str, Any]):
+        pass
+
+    def invalidate(self, doc_id: int):
+        pass
+
+    def clear(self):
+        pass
+
+def _row_size(row: Dict[str, Any]) -> int:
+    # Rough in-memory footprint: text payload plus per-field overhead
+    return sum(len(v) if isinstance(v, str) else 8 for v in row.values()) + 64 * len(row)
+
+class LocalDocumentCache(DocumentCache):
+    """In-process LRU cache with a TTL and limits on entries and bytes.
+
+    Each worker has its own copy, so changes made by another process are
+    only visible once the entry expires; use the shared backend when that
+    window is too long.
+    """
+    name = "local"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[int, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, doc_id: int):
+        _, size, _ = self._entries.pop(doc_id)
+        self._bytes -= size
+
+    def _update_gauges(self):
+        CACHE_ENTRIES.labels(cache=self.name).set(len(self._entries))
+        CACHE_BYTES.labels(cache=self.name).set(self._bytes)
+
+    def get(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(doc_id)
+                self._update_gauges()
+                entry = None
+            if entry is None:
+                CACHE_MISSES.labels(cache=self.name).inc()
+                return None
+            self._entries.move_to_end(doc_id)
+        CACHE_HITS.labels(cache=self.name).inc()
+        return dict(entry[2])
+
+    def set(self, doc_id: int, row: Dict[str, Any]):
+        size = _row_size(row)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if doc_id in self._entries:
+                self._remove(doc_id)
+            self._entries[doc_id] = (time.monotonic() + self.ttl, size, dict(row))
+            self._bytes += size
+            evicted = 0
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+            self._update_gauges()
+        if evicted:
+            CACHE_EVICTIONS.labels(cache=self.name).inc(evicted)
+
+    def invalidate(self, doc_id: int):
+        with self._lock:
+            if doc_id in self._entries:
+                self._remove(doc_id)
+                self._update_gauges()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._update_gauges()
+
+class InMemorySharedClient:
+    """Local stand-in for the Redis commands used by SharedDocumentCache."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+class SharedDocumentCache(DocumentCache):
+    """Cache shared by all API workers and the consumer (Redis or stand-in).
+
+    Eviction is left to the server (e.g. Redis maxmemory-policy allkeys-lru);
+    entries also expire after the TTL.
+    """
+    name = "shared"
+
+    def __init__(self, client, ttl: float, prefix: str = "document:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, doc_id: int) -> str:
+        return f"{self.prefix}{doc_id}"
+
+    def get(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.client.get(self._key(doc_id))
+        except Exception as e:
+            logger.error(f"Shared cache read failed: {e}")
+            raw = None
+        if raw is None:
+            CACHE_MISSES.labels(cache=self.name).inc()
+            return None
+        CACHE_HITS.labels(cache=self.name).inc()
+        return json.loads(raw)
+
+    def set(self, doc_id: int, row: Dict[str, Any]):
+        try:
+            self.client.set(self._key(doc_id), json.dumps(row, default=_json_default).encode('utf-8'), ex=self.ttl)
+        except Exception as e:
+            logger.error(f"Shared cache write failed: {e}")
+
+    def invalidate(self, doc_id: int):
+        try:
+            self.client.delete(self._key(doc_id))
+        except Exception as e:
+            logger.error(f"Shared cache invalidation failed for document {doc_id}: {e}")
+
+    def clear(self):
+        self.client.flushdb()
+
+def build_document_cache() -> DocumentCache:
+    backend = settings.DOCUMENT_CACHE_BACKEND
+    if backend == "memory":
+        return LocalDocumentCache(
+            max_entries=settings.DOCUMENT_CACHE_MAX_ENTRIES,
+            max_bytes=settings.DOCUMENT_CACHE_MAX_BYTES,
+            ttl=settings.DOCUMENT_CACHE_TTL_SECONDS
+        )
+    if backend == "shared":
+        if settings.CACHE_REDIS_URL:
+            import redis  # Optional dependency, only needed for the shared backend
+            client = redis.Redis.from_url(settings.CACHE_REDIS_URL)
+        else:
+            logger.warning("CACHE_REDIS_URL is not set, using in-process stand-in for the shared cache")
+            client = InMemorySharedClient()
+        return SharedDocumentCache(client, ttl=settings.DOCUMENT_CACHE_TTL_SECONDS)
+    if backend == "none":
+        return DocumentCache()
+    raise ValueError(f"Unknown document cache backend: {backend}")
+
+_document_cache: Optional[DocumentCache] = None
+_document_cache_lock = threading.Lock()
+
+def get_document_cache() -> DocumentCache:
+    """Return the process-wide document cache, building it on first use."""
+    global _document_cache
+    if _document_cache is None:
+        with _document_cache_lock:
+            if _document_cache is None:
+                _document_cache = build_document_cache()
+    return _document_cache
@@ -1,68 +1,322 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from ..models.document import Document
+from datetime import datetime
+from typing import Any, Dict, Optional, List, Sequence, Union
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.concurrency import run_in_threadpool
+from ..models.document import Document, hash_content
 from ..schemas.document import DocumentCreate, DocumentUpdate
-from ..services.kafka_producer import MessageProducer
+from ..services.kafka_producer import MessageProducer, producer_manager
+from ..services.blobs import externalize, resolve_documents, store_contents
+from ..services.cache import DocumentCache, get_document_cache
+from ..services.outbox import enqueue_event, enqueue_events
+from ..services.pagination import Page, keyset_page
+from ..services.search import search_documents
+from ..core.config import settings
 from ..core.logging import logger
-from src.app.core.metrics import DOCUMENTS_PROCESSED, KAFKA_MESSAGES_SENT
-from src.app.services.text_processor import TextProcessor
+from src.app.core.metrics import DOCUMENT_STAGE_DURATION, DOCUMENTS_PROCESSED, timed
+from src.app.services.text_executor import get_text_executor
+from src.app.services.text_processor import BatchStats, TextProcessor
+
+def _cache_row(doc: Document) -> Dict[str, Any]:
+    return {column.key: getattr(doc, column.key) for column in Document.__table__.columns}
+
+def _from_cache_row(row: Dict[str, Any]) -> Document:
+    # Shared backends return datetimes as ISO strings
+    for key in ("created_at", "updated_at"):
+        if isinstance(row.get(key), str):
+            row[key] = datetime.fromisoformat(row[key])
+    return Document(**row)
 
 class DocumentService:
-    def __init__(self, db: Session, producer: MessageProducer):
+    def __init__(self, db: Session, producer: Optional[MessageProducer] = None,
+                 cache: Optional[DocumentCache] = None):
         self.db = db
-        self.producer = producer
+        self._producer = producer
+        self.cache = cache if cache is not None else get_document_cache()
         self._test_mode = False  # Flag for test mode
     
+    @property
+    def producer(self) -> MessageProducer:
+        # Resolved lazily: with the outbox enabled requests never need Kafka
+        if self._producer is None:
+            self._producer = producer_manager.get()
+        return self._producer
+    
     def get_document(self, doc_id: int) -> Optional[Document]:
         """Get document by ID"""
         return self.db.query(Document).filter(Document.id == doc_id).first()
     
-    def create(self, doc: DocumentCreate) -> Document:
+    def create(self, doc: DocumentCreate, description: Optional[str] = None) -> Document:
+        """Insert a document; ``description`` may be precomputed off the request thread."""
         try:
             logger.info(f"Creating new document with title: {doc.title}")
             DOCUMENTS_PROCESSED.inc()
             db_doc = Document(**doc.model_dump())
-            db_doc.short_description = TextProcessor.generate_description(doc.content)
-            self.db.add(db_doc)
-            self.db.commit()
-            self.db.refresh(db_doc)
-            
-            message = {
-                "document_id": db_doc.id,
-                "content": db_doc.content
-            }
+            if description is None:
+                with timed(DOCUMENT_STAGE_DURATION, operation="create", stage="describe"):
+                    description = TextProcessor.generate_description(doc.content)
+            db_doc.short_description = description
+            # Described inline, so the consumer can skip this version
+            db_doc.content_hash = db_doc.description_hash = hash_content(doc.content)
+            db_doc.version = db_doc.processed_version = 1
+            with timed(DOCUMENT_STAGE_DURATION, operation="create", stage="insert"):
+                self._store_content(db_doc)
+                self.db.add(db_doc)
+                self.db.flush()  # Assigns the id used by the event
             
-            self.producer.send_message(message)
-            KAFKA_MESSAGES_SENT.inc()
+            self._publish(self._event(db_doc), operation="create")
+            with timed(DOCUMENT_STAGE_DURATION, operation="create", stage="refresh"):
+                self.db.refresh(db_doc)
+            self._restore_content(db_doc, doc.content)
             return db_doc
         except Exception as e:
             logger.error(f"Error creating document: {str(e)}")
             raise
     
+    def create_many(self, docs: Sequence[DocumentCreate],
+                    descriptions: Optional[Sequence[str]] = None) -> List[int]:
+        """Insert a chunk of documents in one transaction; returns ids in input order.
+
+        Documents and their events are written with executemany batches
+        (multi-row INSERTs) instead of an INSERT, commit and refresh per row.
+        """
+        if not docs:
+            return []
+        if descriptions is None:
+            descriptions = TextProcessor.analyze_batch(
+                [doc.content for doc in docs], columns=BatchStats.DESCRIPTION_COLUMNS
+            ).descriptions()
+        rows = []
+        external = []
+        for doc, description in zip(docs, descriptions):
+            digest = hash_content(doc.content)
+            row = dict(
+                doc.model_dump(),
+                short_description=description,
+                content_hash=digest,
+                description_hash=digest,
+                version=1,
+                processed_version=1
+            )
+            if externalize(doc.content):
+                external.append(doc.content)
+                row["content"] = None
+            rows.append(row)
+        try:
+            store_contents(self.db, external)
+            ids = list(self.db.scalars(
+                insert(Document).returning(Document.id, sort_by_parameter_order=True),
+                rows
+            ))
+            self._publish_many([
+                self._message(doc_id, row["content"], row["content_hash"], 1)
+                for doc_id, row in zip(ids, rows)
+            ])
+        except Exception as e:
+            logger.error(f"Error creating {len(rows)} documents in bulk: {str(e)}")
+            self.db.rollback()
+            raise
+        DOCUMENTS_PROCESSED.inc(len(ids))
+        return ids
+    
+    @staticmethod
+    def _message(doc_id: int, content: Optional[str], content_hash: str, version: int) -> dict:
+        message = {"document_id": doc_id, "content_hash": content_hash, "version": version}
+        # Bodies stored as blobs are referenced by content_hash only, which
+        # keeps large events small; the consumer loads them from the database
+        if content is not None:
+            message["content"] = content
+        return message
+    
+    @classmethod
+    def _event(cls, db_doc: Document) -> dict:
+        return cls._message(db_doc.id, db_doc.content, db_doc.content_hash, db_doc.version)
+    
+    def _store_content(self, db_doc: Document):
+        """Move a large body to the blob table; the row keeps only content_hash."""
+        if externalize(db_doc.content):
+            store_contents(self.db, [db_doc.content])
+            db_doc.content = None
+    
+    @staticmethod
+    def _restore_content(db_doc: Document, content: Optional[str]):
+        # The body is known, so it is not read back from the blob table
+        if content is not None and db_doc.content is None:
+            set_committed_value(db_doc, "content", content)
+    
+    def _publish_many(self, messages: List[dict]):
+        if settings.OUTBOX_ENABLED:
+            enqueue_events(self.db, messages)
+            self.db.commit()
+        else:
+            self.db.commit()
+            self.producer.send_many(messages)
+    
+    def _publish(self, message: dict, operation: str):
+        """Commit the pending changes together with the event for ``message``.
+
+        The enqueue and commit stages are timed separately for ``operation``.
+        """
+        if settings.OUTBOX_ENABLED:
+            # Written in the same transaction; the outbox relay sends it to Kafka
+            with timed(DOCUMENT_STAGE_DURATION, operation=operation, stage="enqueue"):
+                enqueue_event(self.db, message)
+            with timed(DOCUMENT_STAGE_DURATION, operation=operation, stage="commit"):
+                self.db.commit()
+        else:
+            with timed(DOCUMENT_STAGE_DURATION, operation=operation, stage="commit"):
+                self.db.commit()
+            # Delivery is counted by the producer once the broker acknowledges it
+            with timed(DOCUMENT_STAGE_DURATION, operation=operation, stage="enqueue"):
+                self.producer.send_message(message)
+    
     def get(self, doc_id: int) -> Optional[Document]:
+        """Read-through cached lookup.
+
+        Cache hits return a detached Document that is not tracked by the
+        session; use _load for rows that are going to be modified.
+        """
+        row = self.cache.get(doc_id)
+        if row is not None:
+            return _from_cache_row(row)
+        db_doc = self._load(doc_id)
+        if db_doc is not None:
+            resolve_documents(self.db, [db_doc])
+            self.cache.set(doc_id, _cache_row(db_doc))
+        return db_doc
+    
+    def _load(self, doc_id: int) -> Optional[Document]:
         return self.db.query(Document).filter(Document.id == doc_id).first()
     
-    def list(self, skip: int = 0, limit: int = 10) -> List[Document]:
-        return self.db.query(Document).offset(skip).limit(limit).all()
+    def _list_query(self, fields: Optional[Sequence[str]] = None):
+        query = self.db.query(Document)
+        if fields:
+            # Only the requested columns are selected; id and created_at are
+            # always needed for ordering and cursors
+            columns = {"id", "created_at", *fields}
+            if "content" in columns:
+                columns.add("content_hash")  # Locates bodies stored as blobs
+            query = query.options(load_only(*(getattr(Document, name) for name in sorted(columns))))
+        return query
+    
+    def list(self, skip: int = 0, limit: int = 10, fields: Optional[Sequence[str]] = None) -> List[Document]:
+        """Offset pagination, kept for existing clients; prefer list_page."""
+        docs = (
+            self._list_query(fields)
+            .order_by(Document.created_at, Document.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        resolve_documents(self.db, docs)
+        return docs
+    
+    def list_page(self, cursor: Optional[str] = None, limit: int = 10,
+                  fields: Optional[Sequence[str]] = None) -> Page:
+        """Keyset pagination on (created_at, id) with opaque cursors."""
+        page = keyset_page(self._list_query(fields), Document.created_at, Document.id, cursor, limit)
+        resolve_documents(self.db, page.items)
+        return page
+    
+    def search(self, q: str, cursor: Optional[str] = None, limit: int = 10) -> Page:
+        """Full-text search over titles and contents, best matches first."""
+        return search_documents(self.db, q, cursor, limit)
     
     def update(self, doc_id: int, doc: DocumentUpdate) -> Optional[Document]:
-        db_doc = self.get(doc_id)
+        db_doc = self._load(doc_id)
         if not db_doc:
             return None
             
         update_data = doc.model_dump(exclude_unset=True)
+        content = update_data.get("content")
+        content_changed = False
+        # Titles are searchable, so renaming needs an event as well
+        title_changed = update_data.get("title") not in (None, db_doc.title)
+        if update_data.get("content") is not None:
+            digest = hash_content(update_data["content"])
+            content_changed = digest != db_doc.content_hash
+            db_doc.content_hash = digest
+            if not content_changed:
+                # Nothing to write; a body stored as a blob stays one
+                del update_data["content"]
         for field, value in update_data.items():
             setattr(db_doc, field, value)
-            
-        self.db.commit()
+        if content_changed:
+            self._store_content(db_doc)
+        # Incremented in SQL so concurrent updates never reuse a version
+        db_doc.version = Document.version + 1
+        self.db.flush()
+        
+        if content_changed or title_changed:
+            # The consumer reindexes the document and recomputes the
+            # description if the content changed
+            self._publish(self._event(db_doc), operation="update")
+        else:
+            self.db.commit()
+        self.cache.invalidate(doc_id)
         self.db.refresh(db_doc)
+        self._restore_content(db_doc, content)
+        resolve_documents(self.db, [db_doc])
         return db_doc
     
     def remove(self, doc_id: int) -> bool:
-        db_doc = self.get(doc_id)
+        db_doc = self._load(doc_id)
         if not db_doc:
             return False
             
         self.db.delete(db_doc)
         self.db.commit()
-        return True 
\ No newline at end of file
+        self.cache.invalidate(doc_id)
+        return True
+
+
+class AsyncDocumentService:
+    """Awaitable facade over DocumentService for async route handlers.
+
+    With an AsyncSession the sync service runs through ``run_sync`` on the
+    async driver (asyncpg/aiosqlite), so database I/O never blocks the event
+    loop. With a plain Session it is moved to the threadpool instead.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession], producer: Optional[MessageProducer] = None):
+        self.db = db
+        self.producer = producer
+
+    async def _run(self, method: str, *args, **kwargs):
+        def call(session: Session):
+            return getattr(DocumentService(session, self.producer), method)(*args, **kwargs)
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(call)
+        return await run_in_threadpool(call, self.db)
+
+    async def create(self, doc: DocumentCreate) -> Document:
+        # Described in the text executor first, so the CPU work neither blocks
+        # the event loop nor holds a database connection
+        with timed(DOCUMENT_STAGE_DURATION, operation="create", stage="describe"):
+            description = await get_text_executor().describe(doc.content)
+        return await self._run("create", doc, description)
+
+    async def create_many(self, docs: Sequence[DocumentCreate]) -> List[int]:
+        descriptions = await get_text_executor().describe_many([doc.content for doc in docs])
+        return await self._run("create_many", docs, descriptions)
+
+    async def get(self, doc_id: int) -> Optional[Document]:
+        return await self._run("get", doc_id)
+
+    async def list(self, skip: int = 0, limit: int = 10, fields: Optional[Sequence[str]] = None) -> List[Document]:
+        return await self._run("list", skip, limit, fields)
+
+    async def list_page(self, cursor: Optional[str] = None, limit: int = 10,
+                        fields: Optional[Sequence[str]] = None) -> Page:
+        return await self._run("list_page", cursor, limit, fields)
+
+    async def search(self, q: str, cursor: Optional[str] = None, limit: int = 10) -> Page:
+        return await self._run("search", q, cursor, limit)
+
+    async def update(self, doc_id: int, doc: DocumentUpdate) -> Optional[Document]:
+        return await self._run("update", doc_id, doc)
+
+    async def remove(self, doc_id: int) -> bool:
+        return await self._run("remove", doc_id)
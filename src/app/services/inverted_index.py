@@ -0,0 +1,446 @@
+import fcntl
+import heapq
+from bisect import bisect_left
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from ..core.logging import logger
+from .text_processor import TextProcessor
+
+# Okapi BM25 with the usual parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAGIC = b"DIDX"
+FORMAT_VERSION = 2
+# magic, format version, little endian flag, documents, terms, total document length
+_HEADER = struct.Struct("<4sHHIIQ")
+# Posting arrays use the narrowest of these that fits their largest value
+_TYPECODES = "BHIQ"
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _typecode(values) -> int:
+    largest = max(values, default=0)
+    for index, code in enumerate(_TYPECODES):
+        if largest < 1 << (8 * array(code).itemsize):
+            return index
+    raise OverflowError(largest)
+
+class IndexSnapshot:
+    """Read-only, memory-mapped index file.
+
+    Layout, after the header and each section 8-byte aligned: document ids,
+    versions and lengths (sorted by id), per-document offsets into the
+    document terms, per-term offsets into the term and postings blobs,
+    first document ids, document frequencies, posting widths and term ids,
+    the sorted UTF-8 terms, the document terms and the postings. A term's
+    postings are two arrays: the gaps between its document ids, starting
+    from the first id, then their term frequencies, each in the narrowest
+    array type that fits, so dense lists take a byte per document.
+    Term ids stay the same across merges; the document terms list the ids
+    of each document's terms, so a writer knows which posting lists a
+    replaced or deleted document is in.
+    Every process maps the same pages, so opening a snapshot costs no
+    parsing or copying.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, little, docs, terms, total_length = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a document index (format {FORMAT_VERSION})")
+        if bool(little) != (sys.byteorder == "little"):
+            raise ValueError(f"{path} was written on a machine with a different byte order")
+        self.doc_count = docs
+        self.term_count = terms
+        self.total_length = total_length
+
+        offset = _HEADER.size
+
+        def take(code: str, count: int) -> memoryview:
+            nonlocal offset
+            end = offset + count * array(code).itemsize
+            part = view[offset:end].cast(code)
+            offset = _align(end)
+            return part
+
+        self.doc_ids = take("q", docs)
+        self.versions = take("q", docs)
+        self.lengths = take("I", docs)
+        self.doc_term_offsets = take("Q", docs + 1)
+        self.term_offsets = take("Q", terms + 1)
+        self.postings_offsets = take("Q", terms + 1)
+        self.first_ids = take("q", terms)
+        self.doc_freqs = take("I", terms)
+        self.widths = take("B", terms)
+        self.term_ids = take("I", terms)
+        self.term_blob = take("B", self.term_offsets[-1])
+        self.doc_terms = take("I", self.doc_term_offsets[-1])
+        self.postings = view[offset:offset + self.postings_offsets[-1]]
+
+    def close(self):
+        # Views must be released before the map can be closed; if postings
+        # handed out by postings_of are still alive, the map is closed once
+        # they are collected
+        for name in ("doc_ids", "versions", "lengths", "doc_term_offsets", "term_offsets", "postings_offsets",
+                     "first_ids", "doc_freqs", "widths", "term_ids", "term_blob", "doc_terms", "postings"):
+            getattr(self, name).release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def term(self, index: int) -> bytes:
+        return self.term_blob[self.term_offsets[index]:self.term_offsets[index + 1]].tobytes()
+
+    def find(self, term: str) -> int:
+        """Index of ``term``, or -1; terms are sorted by their UTF-8 bytes."""
+        key = term.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.term_count and self.term(low) == key else -1
+
+    def postings_of(self, index: int) -> Tuple[Iterator[int], memoryview]:
+        """Document ids and term frequencies of the term at ``index``."""
+        start, end = self.postings_offsets[index], self.postings_offsets[index + 1]
+        width = self.widths[index]
+        id_code, frequency_code = _TYPECODES[width >> 4], _TYPECODES[width & 0x0F]
+        split = start + (self.doc_freqs[index] - 1) * array(id_code).itemsize
+        gaps = self.postings[start:split].cast(id_code)
+        return accumulate(gaps, initial=self.first_ids[index]), self.postings[split:end].cast(frequency_code)
+
+    def terms_of(self, doc_id: int) -> memoryview:
+        """Ids of the terms of an indexed document."""
+        position = bisect_left(self.doc_ids, doc_id)
+        return self.doc_terms[self.doc_term_offsets[position]:self.doc_term_offsets[position + 1]]
+
+    def raw_postings(self, index: int) -> Tuple[int, int, int, memoryview]:
+        """First id, document frequency, width byte and encoded postings, for copying."""
+        start, end = self.postings_offsets[index], self.postings_offsets[index + 1]
+        return self.first_ids[index], self.doc_freqs[index], self.widths[index], self.postings[start:end]
+
+def _encode_postings(doc_ids: List[int], frequencies: List[int]) -> Tuple[int, int, int, bytes]:
+    gaps = [b - a for a, b in zip(doc_ids, doc_ids[1:])]
+    id_code, frequency_code = _typecode(gaps), _typecode(frequencies)
+    data = array(_TYPECODES[id_code], gaps).tobytes() + array(_TYPECODES[frequency_code], frequencies).tobytes()
+    return doc_ids[0], len(doc_ids), id_code << 4 | frequency_code, data
+
+def _write_snapshot(path: str, docs: Dict[int, Tuple[int, int]],
+                    postings: Iterable[Tuple[bytes, int, int, int, int, bytes]],
+                    terms_of: Callable[[int], Sequence[int]]):
+    """Write an index file atomically.
+
+    ``docs`` maps ids to (version, length); ``postings`` yields (term, term
+    id, first id, document frequency, width byte, encoded postings) in term
+    order; ``terms_of`` returns the term ids of a document as an "I" array
+    or memoryview.
+    """
+    term_offsets = array("Q", [0])
+    postings_offsets = array("Q", [0])
+    first_ids = array("q")
+    doc_freqs = array("I")
+    widths = array("B")
+    term_ids = array("I")
+    terms = bytearray()
+    blob = bytearray()
+    for term, term_id, first_id, df, width, data in postings:
+        terms += term
+        blob += data
+        term_offsets.append(len(terms))
+        postings_offsets.append(len(blob))
+        first_ids.append(first_id)
+        doc_freqs.append(df)
+        widths.append(width)
+        term_ids.append(term_id)
+
+    doc_ids = sorted(docs)
+    doc_terms = [terms_of(doc_id) for doc_id in doc_ids]
+    sections = [
+        array("q", doc_ids),
+        array("q", (docs[doc_id][0] for doc_id in doc_ids)),
+        array("I", (docs[doc_id][1] for doc_id in doc_ids)),
+        array("Q", accumulate((len(ids) for ids in doc_terms), initial=0)),
+        term_offsets,
+        postings_offsets,
+        first_ids,
+        doc_freqs,
+        widths,
+        term_ids,
+        terms,
+        b"".join(doc_terms),
+        blob,
+    ]
+    total_length = sum(length for _, length in docs.values())
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, sys.byteorder == "little",
+                             len(doc_ids), len(doc_freqs), total_length))
+        for section in sections:
+            f.write(section)
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+        f.flush()
+        os.fsync(f.fileno())
+    # Readers keep their mapping of the old file until they reopen
+    os.replace(temporary, path)
+
+@contextmanager
+def _locked(path: str):
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+class IndexWriter:
+    """Buffers document changes and merges them into the index file.
+
+    ``flush`` rewrites the file under an exclusive lock from the snapshot
+    on disk plus the buffered changes, so several consumer processes can
+    share one index. Changes older than the indexed version of a document
+    are dropped, which makes redelivered events harmless. Only the posting
+    lists of the changed documents' new and previous terms are decoded;
+    the others are copied as they are.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # Buffered changes by document id; no terms mark a deletion
+        self._pending: Dict[int, Tuple[Optional[int], Optional[Counter]]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def update(self, doc_id: int, version: Optional[int], content: str):
+        terms = Counter(TextProcessor.tokenize(content))
+        with self._lock:
+            current = self._pending.get(doc_id)
+            if current is None or version is None or current[0] is None or version > current[0]:
+                self._pending[doc_id] = (version, terms)
+
+    def delete(self, doc_id: int):
+        """Remove a document with the next flush, whatever version is indexed."""
+        with self._lock:
+            self._pending[doc_id] = (None, None)
+
+    def flush(self) -> Dict[int, int]:
+        """Merge buffered changes into the file.
+
+        Returns the version now indexed for every buffered document, which
+        may be newer than the buffered one if another writer got there first;
+        deleted documents are left out.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return {}
+        try:
+            with _locked(self.path):
+                indexed, changed = self._merge(pending)
+        except Exception:
+            with self._lock:
+                for doc_id, change in pending.items():
+                    self._pending.setdefault(doc_id, change)  # Newer changes win
+            raise
+        logger.info(f"Merged {changed} documents into the search index at {self.path}")
+        return indexed
+
+    def _merge(self, pending: Dict[int, Tuple[Optional[int], Optional[Counter]]]) -> Tuple[Dict[int, int], int]:
+        snapshot = IndexSnapshot(self.path) if os.path.exists(self.path) else None
+        try:
+            docs: Dict[int, Tuple[int, int]] = {}
+            if snapshot is not None:
+                docs = dict(zip(snapshot.doc_ids, zip(snapshot.versions, snapshot.lengths)))
+            updates = {}
+            replaced = set()
+            for doc_id in sorted(pending):
+                version, terms = pending[doc_id]
+                current = docs.get(doc_id)
+                if terms is None:
+                    if current is not None:
+                        del docs[doc_id]
+                        replaced.add(doc_id)
+                    continue
+                if current is not None:
+                    if version is not None and version <= current[0]:
+                        continue  # Already indexed from this or a newer version
+                    replaced.add(doc_id)
+                docs[doc_id] = (version or 0, sum(terms.values()))
+                updates[doc_id] = terms
+            indexed = {doc_id: docs[doc_id][0] for doc_id, (_, terms) in pending.items() if terms is not None}
+            if not updates and not replaced:
+                return indexed, 0
+
+            # Postings of the changed documents, in id order per term
+            added: Dict[bytes, Tuple[List[int], List[int]]] = {}
+            for doc_id, terms in updates.items():
+                for term, tf in terms.items():
+                    ids, frequencies = added.setdefault(term.encode("utf-8"), ([], []))
+                    ids.append(doc_id)
+                    frequencies.append(tf)
+            old_terms: Dict[bytes, int] = {}
+            # Indexes of the terms the replaced and deleted documents had
+            stale = set()
+            next_id = 0
+            if snapshot is not None:
+                old_terms = {snapshot.term(index): index for index in range(snapshot.term_count)}
+                if replaced:
+                    index_of = {term_id: index for index, term_id in enumerate(snapshot.term_ids)}
+                    for doc_id in replaced:
+                        stale.update(index_of[term_id] for term_id in snapshot.terms_of(doc_id))
+                next_id = max(snapshot.term_ids, default=-1) + 1
+            term_ids = {}
+            for term in sorted(added):
+                index = old_terms.get(term)
+                if index is None:
+                    term_ids[term] = next_id
+                    next_id += 1
+                else:
+                    term_ids[term] = snapshot.term_ids[index]
+
+            def merged():
+                for term in sorted(old_terms.keys() | added.keys()):
+                    index = old_terms.get(term)
+                    new = added.get(term)
+                    if new is None and index not in stale:
+                        yield (term, snapshot.term_ids[index], *snapshot.raw_postings(index))
+                        continue
+                    ids, frequencies = [], []
+                    if index is not None:
+                        old_ids, old_frequencies = snapshot.postings_of(index)
+                        ids, frequencies = list(old_ids), old_frequencies.tolist()
+                        if index in stale:
+                            kept = [(i, tf) for i, tf in zip(ids, frequencies) if i not in replaced]
+                            ids, frequencies = [i for i, _ in kept], [tf for _, tf in kept]
+                    if new is not None:
+                        if ids and new[0][0] < ids[-1]:
+                            pairs = sorted(zip(ids + new[0], frequencies + new[1]))
+                            ids, frequencies = [i for i, _ in pairs], [tf for _, tf in pairs]
+                        else:
+                            ids, frequencies = ids + new[0], frequencies + new[1]
+                    if ids:
+                        term_id = term_ids[term] if new is not None else snapshot.term_ids[index]
+                        yield (term, term_id, *_encode_postings(ids, frequencies))
+
+            def terms_of(doc_id: int):
+                terms = updates.get(doc_id)
+                if terms is None:
+                    return snapshot.terms_of(doc_id)
+                return array("I", sorted(term_ids[term.encode("utf-8")] for term in terms))
+
+            _write_snapshot(self.path, docs, merged(), terms_of)
+            return indexed, len(updates) + len(replaced - updates.keys())
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+
+class InvertedIndex:
+    """BM25 search over the index file, reopened whenever a writer replaced it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._identity = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Optional[IndexSnapshot]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity != self._identity:
+            with self._lock:
+                if identity != self._identity:
+                    # The previous snapshot is left to the garbage collector,
+                    # a concurrent search may still be reading it
+                    self._snapshot = IndexSnapshot(self.path)
+                    self._identity = identity
+        return self._snapshot
+
+    def doc_ids(self) -> List[int]:
+        snapshot = self._current()
+        return snapshot.doc_ids.tolist() if snapshot is not None else []
+
+    def search(self, q: str, limit: int = 10, after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        """Up to ``limit`` (doc id, score) pairs containing every term of ``q``.
+
+        Ordered by score then id, descending; ``after`` is the (score, id)
+        of the last hit of the previous page.
+        """
+        snapshot = self._current()
+        terms = set(TextProcessor.tokenize(q))
+        if snapshot is None or not snapshot.doc_count or not terms:
+            return []
+        indexes = [snapshot.find(term) for term in terms]
+        if min(indexes) < 0:
+            return []
+
+        count = snapshot.doc_count
+        average_length = snapshot.total_length / count or 1.0
+        doc_ids, lengths = snapshot.doc_ids, snapshot.lengths
+        scores: Dict[int, float] = {}
+        matched: Counter = Counter()
+        # Rarest term first, so later terms only touch candidate documents
+        for rank, index in enumerate(sorted(indexes, key=lambda i: snapshot.doc_freqs[i])):
+            df = snapshot.doc_freqs[index]
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            ids, frequencies = snapshot.postings_of(index)
+            for doc_id, tf in zip(ids, frequencies):
+                if rank and doc_id not in scores:
+                    continue
+                length = lengths[bisect_left(doc_ids, doc_id)]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                matched[doc_id] += 1
+
+        hits = (
+            (score, doc_id) for doc_id, score in scores.items()
+            if matched[doc_id] == len(indexes)
+        )
+        if after is not None:
+            hits = (hit for hit in hits if hit < after)
+        return [(doc_id, score) for score, doc_id in heapq.nlargest(limit, hits)]
+
+_inverted_index: Optional[InvertedIndex] = None
+_index_writer: Optional[IndexWriter] = None
+_singleton_lock = threading.Lock()
+
+def get_inverted_index() -> InvertedIndex:
+    """Return the process-wide reader of INVERTED_INDEX_PATH."""
+    global _inverted_index
+    if _inverted_index is None:
+        with _singleton_lock:
+            if _inverted_index is None:
+                _inverted_index = InvertedIndex(settings.INVERTED_INDEX_PATH)
+    return _inverted_index
+
+def get_index_writer() -> IndexWriter:
+    """Return the process-wide writer of INVERTED_INDEX_PATH."""
+    global _index_writer
+    if _index_writer is None:
+        with _singleton_lock:
+            if _index_writer is None:
+                _index_writer = IndexWriter(settings.INVERTED_INDEX_PATH)
+    return _index_writer
@@ -1,24 +1,215 @@
-from kafka import KafkaProducer
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from kafka import KafkaProducer, codec
 import json
 from ..core.config import settings
 from ..core.logging import logger
-from ..core.metrics import KAFKA_MESSAGES_SENT, KAFKA_MESSAGES_FAILED
+from ..core.metrics import (
+    KAFKA_MESSAGES_SENT,
+    KAFKA_MESSAGES_FAILED,
+    KAFKA_PRODUCER_INSTANCES,
+    KAFKA_PRODUCER_UP,
+)
+
+# Settings applied per KAFKA_PRODUCER_PROFILE before explicit overrides.
+# "compression_type": "auto" picks the best codec whose library is installed.
+PRODUCER_PROFILES = {
+    "default": {},
+    "throughput": {
+        "linger_ms": 20,
+        "batch_size": 64 * 1024,
+        "compression_type": "auto",
+        "acks": 1,
+    },
+}
+
+_COMPRESSION_CHECKS = {
+    "lz4": codec.has_lz4,
+    "zstd": codec.has_zstd,
+    "gzip": codec.has_gzip,
+}
+
+def _resolve_compression(compression_type: Optional[str]) -> Optional[str]:
+    if compression_type is None or compression_type == "none":
+        return None
+    if compression_type == "auto":
+        for name, available in _COMPRESSION_CHECKS.items():
+            if available():
+                return name
+        return None
+    if compression_type not in _COMPRESSION_CHECKS:
+        raise ValueError(f"Unsupported Kafka compression type: {compression_type}")
+    if not _COMPRESSION_CHECKS[compression_type]():
+        raise ValueError(f"Compression library for {compression_type} is not installed")
+    return compression_type
+
+def _parse_acks(acks) -> Union[int, str]:
+    if acks in ("all", -1, "-1"):
+        return "all"
+    return int(acks)
+
+def producer_config() -> Dict[str, Any]:
+    """Build KafkaProducer keyword arguments from the current settings."""
+    if settings.KAFKA_PRODUCER_PROFILE not in PRODUCER_PROFILES:
+        raise ValueError(f"Unknown Kafka producer profile: {settings.KAFKA_PRODUCER_PROFILE}")
+    config = dict(PRODUCER_PROFILES[settings.KAFKA_PRODUCER_PROFILE])
+    overrides = {
+        "linger_ms": settings.KAFKA_LINGER_MS,
+        "batch_size": settings.KAFKA_BATCH_SIZE,
+        "compression_type": settings.KAFKA_COMPRESSION_TYPE,
+        "acks": settings.KAFKA_ACKS,
+    }
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    if "compression_type" in config:
+        config["compression_type"] = _resolve_compression(config["compression_type"])
+    if "acks" in config:
+        config["acks"] = _parse_acks(config["acks"])
+    return config
 
 class MessageProducer:
     def __init__(self):
-        logger.info(f"Initializing Kafka producer with bootstrap servers: {settings.KAFKA_BOOTSTRAP_SERVERS}")
+        config = producer_config()
+        logger.info(f"Initializing Kafka producer with bootstrap servers: {settings.KAFKA_BOOTSTRAP_SERVERS}, config: {config}")
         self.producer = KafkaProducer(
             bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+            **config
         )
         logger.info("Kafka producer initialized successfully")
 
-    def send_message(self, message: dict):
+    @staticmethod
+    def _key_for(message: dict) -> Optional[bytes]:
+        # Keying by document keeps all events of one document on one partition
+        document_id = message.get("document_id")
+        return str(document_id).encode('utf-8') if document_id is not None else None
+
+    @staticmethod
+    def _on_delivered(metadata):
+        KAFKA_MESSAGES_SENT.inc()
+
+    @staticmethod
+    def _on_failed(exc):
+        logger.error(f"Kafka delivery failed: {exc}")
+        KAFKA_MESSAGES_FAILED.inc()
+
+    def send_message(self, message: dict, topic: Optional[str] = None):
+        """Enqueue a message; success is counted when the broker acknowledges it.
+
+        Returns the kafka-python future so callers can wait for delivery.
+        """
+        topic = topic or settings.KAFKA_TOPIC
+        logger.debug(f"Sending message to topic {topic}: {message}")
+        message_bytes = json.dumps(message, separators=(',', ':')).encode('utf-8')
+        return self.send_raw(topic, message_bytes, key=self._key_for(message))
+
+    def send_raw(self, topic: str, value: bytes, key: Optional[bytes] = None,
+                 headers: Optional[List[Tuple[str, bytes]]] = None):
+        """Enqueue already serialized bytes, e.g. when forwarding a consumed record."""
         try:
-            logger.debug(f"Sending message to topic {settings.KAFKA_TOPIC}: {message}")
-            message_bytes = json.dumps(message).encode('utf-8')
-            self.producer.send(settings.KAFKA_TOPIC, message_bytes)
-            KAFKA_MESSAGES_SENT.inc()
+            future = self.producer.send(topic, value, key=key, headers=headers)
+            future.add_callback(self._on_delivered)
+            future.add_errback(self._on_failed)
+            return future
         except Exception as e:
             logger.error(f"Error sending message to Kafka: {e}")
             KAFKA_MESSAGES_FAILED.inc()
-            raise 
\ No newline at end of file
+            raise
+
+    def send_many(self, messages: Iterable[dict], flush: bool = False) -> List:
+        """Enqueue many messages so the producer can batch them.
+
+        Messages that fail to enqueue are counted and logged but do not stop
+        the rest of the batch; their slot in the returned list is None.
+        """
+        futures = []
+        for message in messages:
+            try:
+                futures.append(self.send_message(message))
+            except Exception:
+                futures.append(None)
+        if flush:
+            self.flush()
+        return futures
+
+    def is_connected(self) -> bool:
+        """Check whether the underlying client reached a bootstrap broker."""
+        try:
+            return bool(self.producer.bootstrap_connected())
+        except Exception:
+            return False
+
+    def flush(self, timeout: Optional[float] = None):
+        self.producer.flush(timeout=timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        self.producer.close(timeout=timeout)
+
+
+class ProducerManager:
+    """Owns the process-wide MessageProducer.
+
+    The producer is started once (normally from the application lifespan),
+    shared by every request and flushed/closed on shutdown. If Kafka is not
+    reachable at startup the producer is created lazily on first use.
+    """
+
+    def __init__(self, factory: Callable[[], MessageProducer] = MessageProducer):
+        self.factory = factory
+        self._producer: Optional[MessageProducer] = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._producer is not None
+
+    def start(self) -> Optional[MessageProducer]:
+        """Create the shared producer, logging instead of raising on failure."""
+        try:
+            return self.get()
+        except Exception as e:
+            logger.error(f"Kafka producer unavailable at startup, will retry on first use: {e}")
+            KAFKA_PRODUCER_UP.set(0)
+            return None
+
+    def get(self) -> MessageProducer:
+        producer = self._producer
+        if producer is not None:
+            return producer
+        with self._lock:
+            if self._producer is None:
+                self._producer = self.factory()
+                KAFKA_PRODUCER_INSTANCES.inc()
+                KAFKA_PRODUCER_UP.set(1)
+            return self._producer
+
+    def is_healthy(self) -> bool:
+        producer = self._producer
+        healthy = producer is not None and producer.is_connected()
+        KAFKA_PRODUCER_UP.set(1 if healthy else 0)
+        return healthy
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush pending messages and close the shared producer."""
+        with self._lock:
+            producer, self._producer = self._producer, None
+        if producer is None:
+            return
+        try:
+            producer.flush(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Error flushing Kafka producer: {e}")
+        finally:
+            try:
+                producer.close(timeout=timeout)
+            except Exception as e:
+                logger.error(f"Error closing Kafka producer: {e}")
+            KAFKA_PRODUCER_INSTANCES.dec()
+            KAFKA_PRODUCER_UP.set(0)
+            logger.info("Kafka producer closed")
+
+
+producer_manager = ProducerManager()
+
+def get_producer() -> MessageProducer:
+    """FastAPI dependency returning the shared producer."""
+    return producer_manager.get()
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy import exists, func, insert
+from sqlalchemy.orm import Session, aliased
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.logging import logger
+from ..core.metrics import OUTBOX_LAG_SECONDS, OUTBOX_PENDING, OUTBOX_PUBLISHED, OUTBOX_PUBLISH_FAILED
+from ..models.outbox import OutboxEvent
+from .kafka_producer import MessageProducer, producer_manager
+
+def enqueue_event(db: Session, message: dict, topic: Optional[str] = None) -> OutboxEvent:
+    """Add an event to the outbox; it is published only if the transaction commits."""
+    event = OutboxEvent(
+        aggregate_id=message["document_id"],
+        topic=topic or settings.KAFKA_TOPIC,
+        payload=json.dumps(message, separators=(',', ':'))
+    )
+    db.add(event)
+    return event
+
+def enqueue_events(db: Session, messages: List[dict], topic: Optional[str] = None):
+    """Bulk variant of enqueue_event using a single executemany INSERT."""
+    if not messages:
+        return
+    topic = topic or settings.KAFKA_TOPIC
+    db.execute(insert(OutboxEvent), [
+        {
+            "aggregate_id": message["document_id"],
+            "topic": topic,
+            "payload": json.dumps(message, separators=(',', ':')),
+        }
+        for message in messages
+    ])
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes; everything in the outbox is stored in UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+class OutboxRelay:
+    """Drains the outbox table to Kafka in batches.
+
+    Only the oldest pending event of each document is eligible in a round, so
+    events of one document are delivered in order even across retries. Failed
+    events are retried with capped exponential backoff and never dropped.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        producer_getter: Callable[[], MessageProducer] = producer_manager.get,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.producer_getter = producer_getter
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval if poll_interval is not None else settings.OUTBOX_POLL_INTERVAL
+
+    def _pending_query(self, session: Session, now: datetime):
+        earlier = aliased(OutboxEvent)
+        is_head = ~exists().where(
+            earlier.aggregate_id == OutboxEvent.aggregate_id,
+            earlier.id < OutboxEvent.id
+        )
+        query = (
+            session.query(OutboxEvent)
+            .filter(is_head, OutboxEvent.available_at <= now)
+            .order_by(OutboxEvent.id)
+            .limit(self.batch_size)
+        )
+        if session.get_bind().dialect.name != "sqlite":
+            # Lets several API workers relay concurrently without double sends
+            query = query.with_for_update(skip_locked=True)
+        return query
+
+    def _schedule_retry(self, event: OutboxEvent, error: Exception, now: datetime):
+        event.attempts += 1
+        event.last_error = str(error)
+        delay = min(
+            settings.OUTBOX_RETRY_BACKOFF_SECONDS * (2 ** (event.attempts - 1)),
+            settings.OUTBOX_RETRY_BACKOFF_MAX_SECONDS
+        )
+        event.available_at = now + timedelta(seconds=delay)
+        OUTBOX_PUBLISH_FAILED.inc()
+        logger.error(f"Outbox event {event.id} for document {event.aggregate_id} failed "
+                     f"(attempt {event.attempts}), retrying in {delay:.1f}s: {error}")
+
+    def _update_lag_metrics(self, session: Session, now: datetime):
+        pending, oldest = session.query(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)).one()
+        OUTBOX_PENDING.set(pending)
+        OUTBOX_LAG_SECONDS.set((now - _as_utc(oldest)).total_seconds() if oldest else 0)
+
+    def relay_once(self) -> int:
+        """Publish one batch of pending events; returns how many were published."""
+        session = self.session_factory()
+        now = datetime.now(timezone.utc)
+        try:
+            events = self._pending_query(session, now).all()
+            published = []
+            if events:
+                producer = self.producer_getter()
+                in_flight = []
+                for event in events:
+                    try:
+                        future = producer.send_message(json.loads(event.payload), topic=event.topic)
+                        in_flight.append((event, future))
+                    except Exception as e:
+                        self._schedule_retry(event, e, now)
+                producer.flush(timeout=settings.OUTBOX_SEND_TIMEOUT)
+                for event, future in in_flight:
+                    try:
+                        if future is not None:
+                            future.get(timeout=settings.OUTBOX_SEND_TIMEOUT)
+                        published.append(event.id)
+                    except Exception as e:
+                        self._schedule_retry(event, e, now)
+                if published:
+                    session.query(OutboxEvent).filter(OutboxEvent.id.in_(published)).delete(synchronize_session=False)
+                session.commit()
+                OUTBOX_PUBLISHED.inc(len(published))
+            return len(published)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            # Also after a failed round: the backlog grows most while Kafka is down
+            try:
+                self._update_lag_metrics(session, now)
+            except Exception as e:
+                logger.error(f"Error updating outbox metrics: {e}")
+            session.close()
+
+    async def run(self, stop: asyncio.Event):
+        """Relay until ``stop`` is set, sleeping only when the outbox is drained."""
+        logger.info("Starting outbox relay")
+        while not stop.is_set():
+            try:
+                published = await asyncio.to_thread(self.relay_once)
+            except Exception as e:
+                logger.error(f"Error relaying outbox events: {e}")
+                published = 0
+            if published < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Outbox relay stopped")
@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip("=")
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    if not isinstance(values, list):
+        raise TypeError(type(values))
+    return values
+
+def encode_cursor(created_at: datetime, doc_id: int, direction: str = "next") -> str:
+    return _encode([created_at.isoformat(), doc_id, direction])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        created_at, doc_id, direction = _decode(cursor)
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(created_at), int(doc_id), direction
+    except (binascii.Error, TypeError, ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+def encode_rank_cursor(rank: float, doc_id: int) -> str:
+    """Cursor after a search hit; results are ordered by (rank, id) descending."""
+    # repr() of a float round-trips exactly, so the boundary row is excluded
+    return _encode([rank, doc_id])
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, doc_id = _decode(cursor)
+        return float(rank), int(doc_id)
+    except (binascii.Error, TypeError, ValueError, UnicodeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+def keyset_page(query: Query, created_col, id_col, cursor: Optional[str], limit: int) -> Page:
+    """Fetch one page ordered by (created_at, id) without OFFSET.
+
+    Every page is a bounded index range scan, so page N costs the same as
+    page 1 and results stay stable while rows are inserted.
+    """
+    direction = "next"
+    if cursor:
+        created_at, doc_id, direction = decode_cursor(cursor)
+        if direction == "next":
+            query = query.filter(or_(
+                created_col > created_at,
+                and_(created_col == created_at, id_col > doc_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < doc_id)
+            ))
+
+    if direction == "next":
+        query = query.order_by(created_col.asc(), id_col.asc())
+    else:
+        query = query.order_by(created_col.desc(), id_col.desc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse()
+    if not rows:
+        return Page()
+
+    first, last = rows[0], rows[-1]
+    if direction == "next":
+        has_next, has_prev = has_more, cursor is not None
+    else:
+        has_next, has_prev = True, has_more
+    return Page(
+        items=rows,
+        next_cursor=encode_cursor(last.created_at, last.id, "next") if has_next else None,
+        prev_cursor=encode_cursor(first.created_at, first.id, "prev") if has_prev else None,
+    )
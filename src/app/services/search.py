@@ -0,0 +1,327 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import DateTime, bindparam, or_, text, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.document import Document
+from .blobs import contents_of
+from .inverted_index import get_index_writer, get_inverted_index
+from .pagination import Page, decode_rank_cursor, encode_rank_cursor
+from .text_processor import TextProcessor
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+_TERM = re.compile(r"\w+")
+
+class SearchUnavailableError(RuntimeError):
+    """Raised when the database has no full-text search backend."""
+
+@dataclass
+class SearchHit:
+    id: int
+    title: str
+    short_description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    rank: float
+    highlight: Optional[str]
+
+def _ids_param(statement: str):
+    return text(statement).bindparams(bindparam("ids", expanding=True))
+
+class PostgresSearch:
+    """tsvector column with a GIN index; titles weigh more than content."""
+
+    INDEX = _ids_param(
+        "UPDATE documents SET "
+        "search_vector = setweight(to_tsvector(CAST(:config AS regconfig), coalesce(title, '')), 'A') "
+        "|| setweight(to_tsvector(CAST(:config AS regconfig), content), 'B'), "
+        "indexed_version = version "
+        "WHERE id IN :ids AND content IS NOT NULL"
+    )
+    # Bodies stored as blobs are decompressed here and passed in per row
+    INDEX_EXTERNAL = text(
+        "UPDATE documents SET "
+        "search_vector = setweight(to_tsvector(CAST(:config AS regconfig), coalesce(title, '')), 'A') "
+        "|| setweight(to_tsvector(CAST(:config AS regconfig), CAST(:content AS text)), 'B'), "
+        "indexed_version = version "
+        "WHERE id = :id"
+    )
+    # Headlines are only built for the rows of the page; those of blob
+    # stored bodies are built in Python
+    SEARCH = text(
+        "SELECT d.id, d.title, d.short_description, d.created_at, d.updated_at, hits.rank, "
+        "ts_headline(CAST(:config AS regconfig), d.content, hits.query, :headline) AS highlight, "
+        "CASE WHEN d.content IS NULL THEN d.content_hash END AS content_hash "
+        "FROM ("
+        "  SELECT id, ts_rank_cd(search_vector, query)::float8 AS rank, query "
+        "  FROM documents, websearch_to_tsquery(CAST(:config AS regconfig), :q) AS query "
+        "  WHERE search_vector @@ query"
+        ") AS hits JOIN documents d ON d.id = hits.id "
+        "WHERE CAST(:after_rank AS float8) IS NULL OR hits.rank < :after_rank "
+        "OR (hits.rank = :after_rank AND hits.id < :after_id) "
+        "ORDER BY hits.rank DESC, hits.id DESC LIMIT :limit"
+    ).columns(created_at=DateTime, updated_at=DateTime)
+
+    def index(self, session: Session, ids: List[int]):
+        session.execute(self.INDEX, {"config": settings.SEARCH_LANGUAGE, "ids": ids})
+        external = (
+            session.query(Document.id, Document.content, Document.content_hash)
+            .filter(Document.id.in_(ids), Document.content.is_(None))
+            .all()
+        )
+        if external:
+            contents = contents_of(session, [(content, digest) for _, content, digest in external])
+            session.execute(self.INDEX_EXTERNAL, [
+                {"config": settings.SEARCH_LANGUAGE, "id": row.id, "content": content}
+                for row, content in zip(external, contents)
+            ])
+
+    def search(self, session: Session, q: str, after: Optional[Tuple[float, int]], limit: int):
+        after_rank, after_id = after or (None, None)
+        rows = session.execute(self.SEARCH, {
+            "config": settings.SEARCH_LANGUAGE,
+            "q": q,
+            "headline": (
+                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+                f"MaxWords={settings.SEARCH_SNIPPET_WORDS}, MinWords=5, MaxFragments=2"
+            ),
+            "after_rank": after_rank,
+            "after_id": after_id,
+            "limit": limit,
+        }).all()
+        external = [row for row in rows if row.content_hash is not None]
+        highlights = {}
+        if external:
+            terms = TextProcessor.tokenize(q)
+            contents = contents_of(session, [(None, row.content_hash) for row in external])
+            highlights = {
+                row.id: _highlight(content, terms, settings.SEARCH_SNIPPET_WORDS)
+                for row, content in zip(external, contents)
+            }
+        return [
+            SearchHit(
+                id=row.id, title=row.title, short_description=row.short_description,
+                created_at=row.created_at, updated_at=row.updated_at, rank=row.rank,
+                highlight=highlights.get(row.id, row.highlight)
+            )
+            for row in rows
+        ]
+
+class SqliteSearch:
+    """FTS5 table keyed by document id, for local development and tests."""
+
+    DELETE = _ids_param("DELETE FROM documents_fts WHERE rowid IN :ids")
+    # Rows are passed in rather than selected, as bodies may be stored as blobs
+    INSERT = text("INSERT INTO documents_fts (rowid, title, content) VALUES (:id, :title, :content)")
+    MARK_INDEXED = _ids_param("UPDATE documents SET indexed_version = version WHERE id IN :ids")
+    # bm25() is lower for better matches; it is negated so both backends
+    # rank descending. Titles weigh ten times as much as content.
+    SEARCH = text(
+        "SELECT d.id, d.title, d.short_description, d.created_at, d.updated_at, hits.rank, hits.highlight "
+        "FROM ("
+        "  SELECT rowid AS id, -bm25(documents_fts, 10.0, 1.0) AS rank, "
+        "  snippet(documents_fts, 1, :start, :stop, '…', :words) AS highlight "
+        "  FROM documents_fts WHERE documents_fts MATCH :q"
+        ") AS hits JOIN documents d ON d.id = hits.id "
+        "WHERE :after_rank IS NULL OR hits.rank < :after_rank "
+        "OR (hits.rank = :after_rank AND hits.id < :after_id) "
+        "ORDER BY hits.rank DESC, hits.id DESC LIMIT :limit"
+    ).columns(created_at=DateTime, updated_at=DateTime)
+
+    def index(self, session: Session, ids: List[int]):
+        rows = (
+            session.query(Document.id, Document.title, Document.content, Document.content_hash)
+            .filter(Document.id.in_(ids))
+            .all()
+        )
+        contents = contents_of(session, [(row.content, row.content_hash) for row in rows])
+        session.execute(self.DELETE, {"ids": ids})
+        if rows:
+            session.execute(self.INSERT, [
+                {"id": row.id, "title": row.title, "content": content} for row, content in zip(rows, contents)
+            ])
+        session.execute(self.MARK_INDEXED, {"ids": ids})
+
+    @staticmethod
+    def match_query(q: str) -> Optional[str]:
+        # Every term must match; quoting keeps FTS5 operators and syntax
+        # errors out of user input
+        terms = _TERM.findall(q)
+        return " ".join(f'"{term}"' for term in terms) if terms else None
+
+    def search(self, session: Session, q: str, after: Optional[Tuple[float, int]], limit: int):
+        match = self.match_query(q)
+        if match is None:
+            return []
+        after_rank, after_id = after or (None, None)
+        rows = session.execute(self.SEARCH, {
+            "q": match,
+            "start": HIGHLIGHT_START,
+            "stop": HIGHLIGHT_STOP,
+            "words": settings.SEARCH_SNIPPET_WORDS,
+            "after_rank": after_rank,
+            "after_id": after_id,
+            "limit": limit,
+        })
+        return [SearchHit(**row._mapping) for row in rows]
+
+def _highlight(content: str, terms: List[str], words: int) -> Optional[str]:
+    """About ``words`` words around the first match, matches wrapped in marks."""
+    if not terms:
+        return None
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\b", re.IGNORECASE)
+    match = pattern.search(content)
+    if match is None:
+        return None
+    before = content[max(0, match.start() - 20 * words):match.start()].split()
+    before = before[len(before) - words // 2:] if words > 1 else []
+    after = content[match.start():match.start() + 40 * words].split()[:words - len(before)]
+    return pattern.sub(lambda m: f"{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}", " ".join(before + after))
+
+# Recorded only once the index file contains the version, see flush_inverted_index
+MARK_INDEXED_VERSION = (
+    update(Document.__table__)
+    .where(
+        Document.id == bindparam("b_id"),
+        or_(Document.indexed_version.is_(None), Document.indexed_version < bindparam("b_version"))
+    )
+    .values(indexed_version=bindparam("b_version"))
+)
+
+class InvertedIndexSearch:
+    """The in-process inverted index ranks; rows and excerpts come from the database."""
+
+    def index(self, session: Session, ids: List[int]):
+        # The current row is read back, like the SQL backends index it; it
+        # reaches the file with the next flush_inverted_index
+        rows = (
+            session.query(Document.id, Document.version, Document.content, Document.content_hash)
+            .filter(Document.id.in_(ids))
+            .all()
+        )
+        contents = contents_of(session, [(row.content, row.content_hash) for row in rows])
+        writer = get_index_writer()
+        for row, content in zip(rows, contents):
+            writer.update(row.id, row.version, content)
+
+    def search(self, session: Session, q: str, after: Optional[Tuple[float, int]], limit: int):
+        terms = TextProcessor.tokenize(q)
+        index = get_inverted_index()
+        hits = []
+        while len(hits) < limit:
+            ranked = index.search(q, limit - len(hits), after)
+            if not ranked:
+                break
+            found = session.query(
+                Document.id, Document.title, Document.short_description,
+                Document.created_at, Document.updated_at, Document.content, Document.content_hash
+            ).filter(Document.id.in_([doc_id for doc_id, _ in ranked])).all()
+            contents = contents_of(session, [(row.content, row.content_hash) for row in found])
+            rows = {row.id: (row, content) for row, content in zip(found, contents)}
+            # Documents deleted since they were indexed are skipped
+            for doc_id, score in ranked:
+                if doc_id in rows:
+                    row, content = rows[doc_id]
+                    hits.append(SearchHit(
+                        id=row.id, title=row.title, short_description=row.short_description,
+                        created_at=row.created_at, updated_at=row.updated_at, rank=score,
+                        highlight=_highlight(content, terms, settings.SEARCH_SNIPPET_WORDS)
+                    ))
+            after = (ranked[-1][1], ranked[-1][0])
+        return hits
+
+_BACKENDS = {"postgresql": PostgresSearch(), "sqlite": SqliteSearch()}
+_INVERTED_INDEX = InvertedIndexSearch()
+
+def get_search_backend(session: Session):
+    if settings.SEARCH_BACKEND == "inverted_index":
+        return _INVERTED_INDEX
+    dialect = session.get_bind().dialect.name
+    try:
+        return _BACKENDS[dialect]
+    except KeyError:
+        raise SearchUnavailableError(f"Full-text search is not supported on {dialect}") from None
+
+def index_documents(session: Session, ids: Iterable[int]):
+    """(Re)index the current title and content of ``ids`` in the session's transaction."""
+    ids = sorted(set(ids))
+    if ids:
+        get_search_backend(session).index(session, ids)
+
+def flush_inverted_index(session: Session) -> int:
+    """Merge queued documents into the index file, then record them as indexed.
+
+    Documents queued but lost before a flush (e.g. by a crash) still have an
+    older indexed_version, so catch_up_inverted_index finds them again.
+    """
+    indexed = get_index_writer().flush()
+    if indexed:
+        session.execute(MARK_INDEXED_VERSION, [
+            {"b_id": doc_id, "b_version": version} for doc_id, version in indexed.items()
+        ])
+        session.commit()
+    return len(indexed)
+
+def prune_inverted_index(session: Session, batch_size: int = 10000) -> int:
+    """Remove documents that were deleted from the database from the index file."""
+    writer = get_index_writer()
+    doc_ids = get_inverted_index().doc_ids()
+    deleted = 0
+    for start in range(0, len(doc_ids), batch_size):
+        batch = doc_ids[start:start + batch_size]
+        existing = {doc_id for doc_id, in session.query(Document.id).filter(Document.id.in_(batch))}
+        for doc_id in batch:
+            if doc_id not in existing:
+                writer.delete(doc_id)
+                deleted += 1
+    if deleted:
+        flush_inverted_index(session)
+    return deleted
+
+def catch_up_inverted_index(session: Session, batch_size: int = 10000) -> int:
+    """Index every document whose indexed version is behind its version.
+
+    Documents deleted since they were indexed are removed first.
+    """
+    prune_inverted_index(session, batch_size)
+    writer = get_index_writer()
+    total = 0
+    last_id = 0
+    while True:
+        rows = (
+            session.query(Document.id, Document.version, Document.content, Document.content_hash)
+            .filter(Document.id > last_id, or_(
+                Document.indexed_version.is_(None), Document.indexed_version < Document.version
+            ))
+            .order_by(Document.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return total
+        contents = contents_of(session, [(row.content, row.content_hash) for row in rows])
+        for row, content in zip(rows, contents):
+            writer.update(row.id, row.version, content)
+        last_id = rows[-1].id
+        total += flush_inverted_index(session)
+
+def search_documents(session: Session, q: str, cursor: Optional[str] = None, limit: int = 10) -> Page:
+    """Best matches first, paginated by (rank, id) cursors.
+
+    Only documents the consumer has indexed are found, so a new document
+    shows up shortly after it was created.
+    """
+    after = decode_rank_cursor(cursor) if cursor else None
+    hits = get_search_backend(session).search(session, q, after, limit + 1)
+    items = hits[:limit]
+    next_cursor = None
+    if len(hits) > limit:
+        last = items[-1]
+        next_cursor = encode_rank_cursor(last.rank, last.id)
+    return Page(items=items, next_cursor=next_cursor)
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from ..core.logging import logger
+from ..core.metrics import (
+    TEXT_EXECUTOR_DURATION,
+    TEXT_EXECUTOR_PENDING,
+    TEXT_EXECUTOR_QUEUE_WAIT,
+    TEXT_EXECUTOR_REJECTED,
+)
+from .text_processor import BatchStats, TextProcessor, worker_context
+
+class TextExecutorBusy(Exception):
+    """Raised when the text analysis queue is full; maps to 503."""
+
+def describe_many(texts: Sequence[str]) -> List[str]:
+    return TextProcessor.analyze_batch(texts, columns=BatchStats.DESCRIPTION_COLUMNS).descriptions()
+
+def _timed(func: Callable, args: tuple, submitted_at: float) -> Tuple[Any, float, float]:
+    # Runs in the worker; wall clock time is comparable across processes
+    started_at = time.time()
+    result = func(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+class TextExecutor:
+    """Bounded pool for CPU-bound text analysis called from async code.
+
+    At most ``max_pending`` analyses may be queued or running; further ones
+    fail fast with TextExecutorBusy instead of piling up latency. Texts
+    shorter than ``inline_max_chars`` are analyzed on the calling thread,
+    where they cost less than the round trip to a worker process.
+    """
+
+    def __init__(self, kind: str = "process", max_workers: int = 2, max_pending: int = 64,
+                 inline_max_chars: int = 0):
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown text executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.inline_max_chars = inline_max_chars
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self, warm_up: bool = True) -> Optional[Executor]:
+        """Create the worker pool; None when analysis runs inline.
+
+        Process pools start their workers lazily, on the first submits.
+        With ``warm_up`` every worker process is started here, so no request
+        pays for it.
+        """
+        if self.max_workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=worker_context())
+                    if warm_up:
+                        # One no-op per worker; each submit starts a process while none is idle
+                        wait([self._executor.submit(os.getpid) for _ in range(self.max_workers)])
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+                logger.info(f"Started text analysis {self.kind} pool with {self.max_workers} workers")
+            return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                TEXT_EXECUTOR_REJECTED.inc()
+                raise TextExecutorBusy(f"{self._pending} text analyses already pending")
+            self._pending += 1
+            TEXT_EXECUTOR_PENDING.set(self._pending)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            TEXT_EXECUTOR_PENDING.set(self._pending)
+
+    async def run(self, func: Callable, *args, size: Optional[int] = None):
+        """Run ``func(*args)`` in the pool, or inline for small inputs.
+
+        ``func`` must be a picklable module-level function for process pools.
+        """
+        if self.max_workers <= 0 or (size is not None and size <= self.inline_max_chars):
+            started_at = time.perf_counter()
+            result = func(*args)
+            TEXT_EXECUTOR_DURATION.labels(mode="inline").observe(time.perf_counter() - started_at)
+            return result
+
+        # Not warmed up here: that would block the event loop until all
+        # workers are running, while a lazy start only delays this call
+        executor = self.start(warm_up=False)
+        self._acquire()
+        try:
+            try:
+                future = executor.submit(_timed, func, args, time.time())
+            except BaseException:
+                self._release()
+                raise
+            # Released once the work is done, not when the caller stops
+            # waiting: a cancelled request leaves its analysis running
+            future.add_done_callback(lambda _: self._release())
+            result, waited, took = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for the next call
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        TEXT_EXECUTOR_QUEUE_WAIT.observe(max(waited, 0.0))
+        TEXT_EXECUTOR_DURATION.labels(mode=self.kind).observe(took)
+        return result
+
+    async def describe(self, text: str) -> str:
+        return await self.run(TextProcessor.generate_description, text, size=len(text))
+
+    async def describe_many(self, texts: Sequence[str]) -> List[str]:
+        return await self.run(describe_many, list(texts), size=sum(len(text) for text in texts))
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+            logger.info("Text analysis pool stopped")
+
+_text_executor: Optional[TextExecutor] = None
+_text_executor_lock = threading.Lock()
+
+def get_text_executor() -> TextExecutor:
+    """Return the process-wide text executor, configured from settings on first use."""
+    global _text_executor
+    if _text_executor is None:
+        with _text_executor_lock:
+            if _text_executor is None:
+                _text_executor = TextExecutor(
+                    kind=settings.TEXT_EXECUTOR_KIND,
+                    max_workers=settings.TEXT_EXECUTOR_WORKERS,
+                    max_pending=settings.TEXT_EXECUTOR_MAX_PENDING,
+                    inline_max_chars=settings.TEXT_EXECUTOR_INLINE_MAX_CHARS
+                )
+    return _text_executor
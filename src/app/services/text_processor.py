@@ -1,3 +1,222 @@
+import multiprocessing
+import os
+import re
+from array import array
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Text is analyzed in slices of this many characters, so temporary
+# allocations stay bounded no matter how large the document is
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Batches smaller than this are not worth shipping to worker processes
+PARALLEL_MIN_BATCH = 2000
+
+DESCRIPTION_TEMPLATE = "Document contains {words} words and {chars} characters"
+
+_TERM = re.compile(r"\w+")
+_SENTENCE_CHARS = ".!?"
+_SENTENCE_RUN = re.compile(r"\.+")
+_TO_PERIOD = str.maketrans("!?", "..")
+# Non-word ASCII characters become spaces, so ASCII text can be tokenized
+# with str.split instead of the (much slower) regex
+_ASCII_NON_TERM = str.maketrans({
+    chr(c): " " for c in range(128) if not (chr(c).isalnum() or chr(c) == "_")
+})
+
+def worker_context():
+    """Multiprocessing context for text analysis worker pools.
+
+    Workers are started from a fork server (or spawned where there is
+    none) rather than forked: the app and consumer run threads (Kafka, DB
+    pools, metrics), and forking a multi-threaded process can copy locks
+    held by another thread into the child.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+def _is_term_char(char: str) -> bool:
+    # Same characters as \w
+    return char.isalnum() or char == "_"
+
+def _split_terms(text: str) -> List[str]:
+    # ``text`` is already lowercased
+    if text.isascii():
+        return text.translate(_ASCII_NON_TERM).split()
+    return _TERM.findall(text)
+
+def _count_sentence_ends(text: str) -> int:
+    # Runs of . ! ? end a sentence; str.count is far cheaper than a regex
+    # scan and runs longer than one character are rare
+    periods = text.translate(_TO_PERIOD)
+    if ".." in periods:
+        return len(_SENTENCE_RUN.findall(periods))
+    return periods.count(".")
+
+def _has_open_sentence(text: str) -> Optional[bool]:
+    """Whether text after the last sentence ending has content (None: no ending)."""
+    last_end = max(text.rfind(c) for c in _SENTENCE_CHARS)
+    if last_end < 0:
+        return None
+    tail = text[last_end + 1:]
+    return bool(tail) and not tail.isspace()
+
+@dataclass
+class TextStats:
+    words: int = 0
+    chars: int = 0
+    lines: int = 0
+    sentences: int = 0
+    unique_terms: int = 0
+    top_terms: List[Tuple[str, int]] = field(default_factory=list)
+
+class TextAnalyzer:
+    """Computes TextStats in one pass over text fed in chunks.
+
+    Words are whitespace separated like ``str.split``; terms are lowercased
+    ``\\w+`` runs. Tokens and sentence endings that straddle a chunk
+    boundary are counted once. Term counting is the expensive part and can
+    be switched off when only the basic counts are needed.
+    """
+
+    def __init__(self, top_n: int = 10, terms: bool = True):
+        self.top_n = top_n
+        self.terms = Counter() if terms else None
+        self._stats = TextStats()
+        self._last_char = ""
+        self._partial_term = ""
+        self._open_sentence = False
+
+    def feed(self, chunk: str):
+        if not chunk:
+            return
+        stats = self._stats
+        stats.chars += len(chunk)
+        stats.lines += chunk.count("\n")
+
+        words = len(chunk.split())
+        if words and self._last_char and not self._last_char.isspace() and not chunk[0].isspace():
+            words -= 1  # Continues the word that ended the previous chunk
+        stats.words += words
+
+        ends = _count_sentence_ends(chunk)
+        if ends and self._last_char and self._last_char in _SENTENCE_CHARS and chunk[0] in _SENTENCE_CHARS:
+            ends -= 1  # e.g. "..." split across chunks
+        stats.sentences += ends
+        open_sentence = _has_open_sentence(chunk)
+        if open_sentence is not None:
+            self._open_sentence = open_sentence
+        elif not chunk.isspace():
+            self._open_sentence = True
+
+        if self.terms is not None:
+            self._count_terms(chunk)
+        self._last_char = chunk[-1]
+
+    def _count_terms(self, chunk: str):
+        text = self._partial_term + chunk.lower()
+        # Hold back a term that may continue in the next chunk
+        end = len(text)
+        while end and _is_term_char(text[end - 1]):
+            end -= 1
+        self._partial_term = text[end:]
+        self.terms.update(_split_terms(text[:end]))
+
+    def finish(self) -> TextStats:
+        stats = self._stats
+        if self._last_char and self._last_char != "\n":
+            stats.lines += 1  # Last line without a trailing newline
+        if self._open_sentence:
+            stats.sentences += 1  # Text after the last sentence ending
+        if self.terms is not None:
+            if self._partial_term:
+                self.terms[self._partial_term] += 1
+                self._partial_term = ""
+            stats.unique_terms = len(self.terms)
+            stats.top_terms = self.terms.most_common(self.top_n)
+        return stats
+
+def _chunks(text: str, size: int) -> Iterable[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+def _count_words(text: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """len(text.split()) without building a list of every word of a large text."""
+    if len(text) <= chunk_size:
+        return len(text.split())
+    words = 0
+    previous = " "
+    for chunk in _chunks(text, chunk_size):
+        words += len(chunk.split())
+        if not previous.isspace() and not chunk[0].isspace():
+            words -= 1  # Word split across the chunk boundary
+        previous = chunk[-1]
+    return words
+
+@dataclass
+class BatchStats:
+    """Statistics of many documents as one array per statistic.
+
+    Row ``i`` describes ``texts[i]`` of the analyzed batch; columns that
+    were not requested are left empty. Arrays are ``array('q')`` so no
+    third-party dependency is needed; ``to_numpy`` converts them without
+    copying element by element.
+    """
+    words: array = field(default_factory=lambda: array("q"))
+    chars: array = field(default_factory=lambda: array("q"))
+    lines: array = field(default_factory=lambda: array("q"))
+    sentences: array = field(default_factory=lambda: array("q"))
+    unique_terms: array = field(default_factory=lambda: array("q"))
+
+    COLUMNS = ("words", "chars", "lines", "sentences", "unique_terms")
+    # What descriptions() needs
+    DESCRIPTION_COLUMNS = ("words", "chars")
+
+    def __len__(self) -> int:
+        return len(self.chars)
+
+    def extend(self, other: "BatchStats"):
+        for name in self.COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+    def descriptions(self) -> List[str]:
+        return [
+            DESCRIPTION_TEMPLATE.format(words=words, chars=chars)
+            for words, chars in zip(self.words, self.chars)
+        ]
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        import numpy  # Optional dependency, only needed for this conversion
+        return {name: numpy.frombuffer(getattr(self, name), dtype=numpy.int64) for name in self.COLUMNS}
+
+def _analyze_slice(texts: Sequence[str], columns: Tuple[str, ...]) -> BatchStats:
+    # One tight loop over the batch; builtins are bound to locals because
+    # this runs once per document
+    stats = BatchStats()
+    want_words, want_lines, want_sentences, want_terms = (
+        name in columns for name in ("words", "lines", "sentences", "unique_terms")
+    )
+    words, chars, lines, sentences, unique = (
+        stats.words.append, stats.chars.append, stats.lines.append,
+        stats.sentences.append, stats.unique_terms.append
+    )
+    for text in texts:
+        length = len(text)
+        chars(length)
+        if want_words:
+            words(len(text.split()) if length <= DEFAULT_CHUNK_SIZE else _count_words(text))
+        if want_lines:
+            lines(text.count("\n") + (1 if length and text[-1] != "\n" else 0))
+        if want_sentences:
+            open_sentence = _has_open_sentence(text)
+            if open_sentence is None:
+                open_sentence = bool(length) and not text.isspace()
+            sentences(_count_sentence_ends(text) + open_sentence)
+        if want_terms:
+            unique(TextProcessor.analyze(text).unique_terms)
+    return stats
+
 class TextProcessor:
     @staticmethod
     def count_words(text: str) -> int:
@@ -13,14 +232,70 @@ class TextProcessor:
             text = text.get('content', '')
         return len(text)
 
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Lowercased terms of text, the same ones ``analyze`` counts."""
+        if isinstance(text, dict):
+            text = text.get('content', '')
+        return _split_terms(text.lower())
+
+    @staticmethod
+    def analyze(source: Union[str, Iterable[str]], top_n: int = 10, terms: bool = True,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> TextStats:
+        """Single-pass statistics for a string or an iterable of string chunks.
+
+        Pass chunks (e.g. from a file read in blocks) to analyze documents
+        that should not be held in memory at once.
+        """
+        if isinstance(source, dict):
+            source = source.get('content', '')
+        analyzer = TextAnalyzer(top_n=top_n, terms=terms)
+        chunks = _chunks(source, chunk_size) if isinstance(source, str) else source
+        for chunk in chunks:
+            analyzer.feed(chunk)
+        return analyzer.finish()
+
+    @staticmethod
+    def analyze_batch(texts: Sequence[str], columns: Sequence[str] = ("words", "chars", "lines", "sentences"),
+                      processes: Optional[int] = None, executor: Optional[Executor] = None) -> BatchStats:
+        """Columnar statistics for a batch of documents.
+
+        Per-document results equal ``analyze``. Only the requested columns
+        are computed; ``unique_terms`` is by far the most expensive one, and
+        BatchStats.DESCRIPTION_COLUMNS is all descriptions() needs. Batches
+        of at least PARALLEL_MIN_BATCH documents are split across worker
+        processes when ``processes`` or an ``executor`` is given.
+        """
+        unknown = set(columns) - set(BatchStats.COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown text statistics: {', '.join(sorted(unknown))}")
+        columns = tuple(columns)
+        texts = [text.get('content', '') if isinstance(text, dict) else text for text in texts]
+        if len(texts) < PARALLEL_MIN_BATCH or (not processes and executor is None):
+            return _analyze_slice(texts, columns)
+
+        workers = processes or os.cpu_count() or 1
+        size = -(-len(texts) // workers)
+        slices = [texts[i:i + size] for i in range(0, len(texts), size)]
+        if executor is None:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=worker_context()) as pool:
+                parts = list(pool.map(_analyze_slice, slices, [columns] * len(slices)))
+        else:
+            parts = list(executor.map(_analyze_slice, slices, [columns] * len(slices)))
+        stats = BatchStats()
+        for part in parts:
+            stats.extend(part)
+        return stats
+
     @staticmethod
     def process_text(text: str) -> dict:
         """Process text and return statistics."""
         if isinstance(text, dict):
             text = text.get('content', '')
+        # Only the counts the description needs; use analyze for the rest
         return {
-            'words': TextProcessor.count_words(text),
-            'chars': TextProcessor.count_chars(text)
+            'words': _count_words(text),
+            'chars': len(text)
         }
 
     @staticmethod
@@ -29,4 +304,4 @@ class TextProcessor:
         if isinstance(text, dict):
             text = text.get('content', '')
         stats = TextProcessor.process_text(text)
-        return f"Document contains {stats['words']} words and {stats['chars']} characters" 
\ No newline at end of file
+        return DESCRIPTION_TEMPLATE.format(words=stats['words'], chars=stats['chars'])
@@ -87,22 +87,32 @@ async def async_client(db_session):
 class MockProducer:
     def __init__(self):
         self.messages = []
+        self.raw_messages = []
         
-    def send_message(self, message):
+    def send_message(self, message, topic=None):
         self.messages.append(message)
 
+    def send_raw(self, topic, value, key=None, headers=None):
+        self.raw_messages.append({"topic": topic, "value": value, "key": key, "headers": headers})
+
+    def is_connected(self):
+        return True
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
 @pytest.fixture
 def mock_kafka_producer():
     return MockProducer()
 
 @pytest.fixture(autouse=True)
 def mock_kafka_producer_dependency(monkeypatch, mock_kafka_producer):
-    """Override Kafka producer in routes"""
-    def mock_producer():
-        return mock_kafka_producer
-    
-    from src.app.api.routes import documents
-    monkeypatch.setattr(documents, "MessageProducer", mock_producer)
+    """Replace the shared Kafka producer with the in-memory stand-in"""
+    from src.app.services.kafka_producer import producer_manager
+    monkeypatch.setattr(producer_manager, "_producer", mock_kafka_producer)
 
 @pytest.fixture
 def document_service(db_session, mock_kafka_producer):
@@ -124,6 +134,13 @@ def event_loop():
     yield loop
     loop.close()
 
+@pytest.fixture(autouse=True)
+def clear_document_cache():
+    """Document ids are reused after rollback, so cached rows must not leak"""
+    from src.app.services.cache import get_document_cache
+    get_document_cache().clear()
+    yield
+
 @pytest.fixture(autouse=True)
 def clean_db(engine):
     """Clean database between tests"""
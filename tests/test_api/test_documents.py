@@ -86,4 +86,99 @@ def test_delete_document(client, sample_document):
     
     # Verify it's gone
     get_response = client.get(f"/api/v1/documents/{doc_id}")
-    assert get_response.status_code == 404 
\ No newline at end of file
+    assert get_response.status_code == 404
+
+def test_list_documents_cursor_headers(client):
+    for i in range(3):
+        client.post("/api/v1/documents/", json={"title": f"Doc {i}", "content": "text"})
+
+    response = client.get("/api/v1/documents/?limit=2")
+    assert [d["title"] for d in response.json()] == ["Doc 0", "Doc 1"]
+    next_cursor = response.headers["X-Next-Cursor"]
+    assert "X-Prev-Cursor" not in response.headers
+
+    response = client.get(f"/api/v1/documents/?limit=2&cursor={next_cursor}")
+    assert [d["title"] for d in response.json()] == ["Doc 2"]
+    assert "X-Next-Cursor" not in response.headers
+    assert "X-Prev-Cursor" in response.headers
+
+def test_list_documents_invalid_cursor(client):
+    response = client.get("/api/v1/documents/?cursor=bogus")
+    assert response.status_code == 400
+
+def test_list_documents_limit_is_capped(client):
+    response = client.get("/api/v1/documents/?limit=100000")
+    assert response.status_code == 422
+
+def test_list_documents_with_fields(client, sample_document):
+    client.post("/api/v1/documents/", json=sample_document)
+
+    response = client.get("/api/v1/documents/?fields=title")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "title": sample_document["title"]}]
+
+def test_list_documents_summary_omits_content(client, sample_document):
+    for _ in range(3):
+        client.post("/api/v1/documents/", json=sample_document)
+
+    response = client.get("/api/v1/documents/?summary=true&limit=2")
+    data = response.json()
+    assert len(data) == 2
+    assert all("content" not in doc for doc in data)
+    assert all(doc["short_description"] for doc in data)
+    assert "X-Next-Cursor" in response.headers
+
+def test_list_documents_unknown_field(client):
+    response = client.get("/api/v1/documents/?fields=id,password")
+    assert response.status_code == 400
+
+def test_bulk_create_json_array(client, db_session):
+    from src.app.models.document import Document
+    from src.app.models.outbox import OutboxEvent
+    items = [{"title": f"Bulk {i}", "content": "bulk content"} for i in range(5)]
+    items.insert(2, {"title": "", "content": "invalid"})
+
+    response = client.post("/api/v1/documents/bulk", json=items)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 5
+    assert data["failed"] == 1
+    assert [item["index"] for item in data["items"]] == list(range(6))
+    assert data["items"][2]["id"] is None
+    assert "title" in data["items"][2]["error"]
+
+    created_ids = [item["id"] for item in data["items"] if item["id"]]
+    docs = db_session.query(Document).filter(Document.id.in_(created_ids)).all()
+    assert len(docs) == 5
+    assert all(doc.short_description == "Document contains 2 words and 12 characters" for doc in docs)
+    assert db_session.query(OutboxEvent).count() == 5
+
+def test_bulk_create_ndjson(client, monkeypatch):
+    monkeypatch.setattr("src.app.api.routes.documents.settings.BULK_CHUNK_SIZE", 2)
+    lines = [
+        '{"title": "One", "content": "a"}',
+        'not json',
+        '{"title": "Two", "content": "b"}',
+        '{"title": "Three", "content": "c"}',
+    ]
+    response = client.post(
+        "/api/v1/documents/bulk",
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    data = response.json()
+    assert data["created"] == 3
+    assert data["failed"] == 1
+    assert data["items"][1]["error"]
+    titles = [client.get(f"/api/v1/documents/{item['id']}").json()["title"]
+              for item in data["items"] if item["id"]]
+    assert titles == ["One", "Two", "Three"]
+
+def test_bulk_create_rejects_non_array(client):
+    response = client.post("/api/v1/documents/bulk", json={"title": "x"})
+    assert response.status_code == 400
+
+def test_bulk_create_limits_items(client, monkeypatch):
+    monkeypatch.setattr("src.app.api.routes.documents.settings.BULK_MAX_ITEMS", 2)
+    response = client.post("/api/v1/documents/bulk", json=[{"title": "x", "content": ""}] * 3)
+    assert response.status_code == 413
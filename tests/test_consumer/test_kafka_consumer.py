@@ -4,6 +4,7 @@ import json
 from datetime import datetime
 from src.app.core.metrics import PROCESSING_SUCCESS, PROCESSING_FAILED
 from consumer.kafka_consumer import MessageConsumer
+from src.app.core.config import settings
 
 @pytest.fixture
 def mock_kafka_consumer():
@@ -117,4 +118,304 @@ def test_process_invalid_message_empty(consumer):
 @patch('consumer.kafka_consumer.signal')
 def test_stop_handler(mock_signal, consumer):
     consumer.stop(None, None)
-    assert consumer.running is False 
\ No newline at end of file
+    assert consumer.running is False
+
+def _record(offset, payload, topic="documents", partition=0, headers=None):
+    message = Mock()
+    message.topic = topic
+    message.partition = partition
+    message.offset = offset
+    message.key = None
+    message.headers = headers or []
+    message.value = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return message
+
+def test_process_batch_updates_documents_in_one_commit(consumer, db_session):
+    from src.app.models.document import Document
+    from src.app.services.text_processor import TextProcessor
+    db_session.add_all([
+        Document(id=1, title="One", content="First"),
+        Document(id=2, title="Two", content="Second"),
+    ])
+    db_session.commit()
+
+    records = [
+        _record(0, {"document_id": 1, "content": "Old content"}),
+        _record(1, {"document_id": 2, "content": "Second content."}),
+        _record(2, {"document_id": 1, "content": "Newest content."}),
+        _record(3, {"document_id": 99, "content": "Missing document"}),
+        _record(4, {"content": "No id"}),
+    ]
+    initial_success = PROCESSING_SUCCESS._value.get()
+    initial_failed = PROCESSING_FAILED._value.get()
+
+    with patch.object(db_session, 'commit', wraps=db_session.commit) as commit:
+        assert consumer.process_batch(records) == 2
+    assert commit.call_count == 1
+
+    db_session.expire_all()
+    assert db_session.get(Document, 1).short_description == TextProcessor.generate_description("Newest content.")
+    assert db_session.get(Document, 2).short_description == TextProcessor.generate_description("Second content.")
+    assert PROCESSING_SUCCESS._value.get() == initial_success + 2
+    assert PROCESSING_FAILED._value.get() == initial_failed + 2
+
+def test_handle_batch_commits_offsets_after_db_commit(consumer, db_session):
+    from src.app.models.document import Document
+    db_session.add(Document(id=1, title="One", content="First"))
+    db_session.commit()
+    partition = Mock()
+
+    consumer.handle_batch({partition: [_record(7, {"document_id": 1, "content": "Text"})]})
+
+    consumer._consumer.commit.assert_called_once()
+    consumer._consumer.seek.assert_not_called()
+
+@patch('consumer.kafka_consumer.time.sleep')
+def test_handle_batch_sends_failures_to_retry_topic(mock_sleep, consumer, mock_kafka_producer):
+    from kafka.structs import TopicPartition
+    from consumer.dead_letter import attempts, not_before
+    partition = TopicPartition("documents", 0)
+    records = [_record(7, {"document_id": 1, "content": "Text"}),
+               _record(8, {"document_id": 2, "content": "Text"})]
+
+    with patch.object(consumer, 'Session', side_effect=Exception("database is down")):
+        consumer.handle_batch({partition: records})
+
+    retried = mock_kafka_producer.raw_messages
+    assert [m["topic"] for m in retried] == [settings.KAFKA_RETRY_TOPIC] * 2
+    headers = dict(retried[0]["headers"])
+    assert headers["x-error"] == b"database is down"
+    assert headers["x-original-offset"] == b"7"
+    assert attempts(_record(0, b"", headers=retried[0]["headers"])) == 1
+    assert not_before(_record(0, b"", headers=retried[0]["headers"])) > 0
+    assert consumer._consumer.commit.call_args[0][0][partition].offset == 9
+    consumer._consumer.seek.assert_not_called()
+
+@patch('consumer.kafka_consumer.time.sleep')
+def test_handle_batch_rewinds_when_handoff_fails(mock_sleep, consumer):
+    partition = Mock()
+    records = [_record(7, {"document_id": 1, "content": "Text"}),
+               _record(8, {"document_id": 2, "content": "Text"})]
+
+    with patch.object(consumer, 'Session', side_effect=Exception("database is down")), \
+         patch.object(consumer.failures, 'retry', side_effect=Exception("kafka is down")):
+        consumer.handle_batch({partition: records})
+
+    consumer._consumer.commit.assert_not_called()
+    consumer._consumer.seek.assert_called_once_with(partition, 7)
+
+def test_exhausted_and_invalid_records_are_dead_lettered(consumer, mock_kafka_producer):
+    exhausted = _record(3, {"document_id": 1, "content": "Text"}, topic=settings.KAFKA_RETRY_TOPIC,
+                        headers=[("x-attempts", str(settings.CONSUMER_MAX_ATTEMPTS - 1).encode()),
+                                 ("x-original-topic", b"documents")])
+    with patch.object(consumer, 'Session', side_effect=Exception("database is down")):
+        consumer.process_message(exhausted)
+    consumer.process_message(_record(4, b"invalid json"))
+
+    dead = mock_kafka_producer.raw_messages
+    assert [m["topic"] for m in dead] == [settings.KAFKA_DEAD_LETTER_TOPIC] * 2
+    assert dict(dead[0]["headers"])["x-original-topic"] == b"documents"
+    assert dict(dead[1]["headers"])["x-error-type"] == b"JSONDecodeError"
+
+def test_retry_partition_paused_until_record_is_due(consumer):
+    import time
+    from kafka.structs import TopicPartition
+    tp = TopicPartition(settings.KAFKA_RETRY_TOPIC, 0)
+    due = _record(1, {"document_id": 1, "content": "a"}, topic=tp.topic,
+                  headers=[("x-not-before", str(time.time() - 1).encode())])
+    later = _record(2, {"document_id": 2, "content": "b"}, topic=tp.topic,
+                    headers=[("x-not-before", str(time.time() + 60).encode())])
+
+    with patch.object(consumer, 'process_batch') as process_batch:
+        consumer.handle_batch({tp: [due, later]})
+
+    process_batch.assert_called_once_with([due])
+    assert consumer._consumer.commit.call_args[0][0][tp].offset == 2
+    consumer._consumer.seek.assert_called_once_with(tp, 2)
+    consumer._consumer.pause.assert_called_once_with(tp)
+    consumer.resume_due_partitions()
+    consumer._consumer.resume.assert_not_called()
+
+@patch('consumer.kafka_consumer.time.sleep')
+def test_handle_batch_commits_partitions_independently(mock_sleep, consumer):
+    from kafka.structs import TopicPartition
+    ok, bad = TopicPartition("documents", 0), TopicPartition("documents", 1)
+    messages = {
+        ok: [_record(3, {"document_id": 1, "content": "a"}), _record(4, {"document_id": 1, "content": "b"})],
+        bad: [_record(10, {"document_id": 2, "content": "c"})],
+    }
+
+    def apply(records):
+        if any(record.offset == 10 for record in records):
+            raise Exception("deadlock detected")
+        return len(records)
+
+    with patch.object(consumer, 'process_batch', side_effect=apply), \
+         patch.object(consumer.failures, 'retry', side_effect=Exception("kafka is down")):
+        consumer.handle_batch(messages)
+
+    committed = consumer._consumer.commit.call_args[0][0]
+    assert list(committed) == [ok]
+    assert committed[ok].offset == 5
+    consumer._consumer.seek.assert_called_once_with(bad, 10)
+
+def test_partition_lag_follows_assignment(consumer):
+    from kafka.structs import TopicPartition
+    from consumer.kafka_consumer import PartitionRebalanceListener
+    from src.app.core.metrics import CONSUMER_PARTITION_LAG
+    tp = TopicPartition("documents", 2)
+    consumer._consumer.assignment.return_value = {tp}
+    consumer._consumer.highwater.return_value = 120
+    consumer._consumer.position.return_value = 100
+
+    # Nothing committed by this member yet: measured from the position
+    consumer.update_partition_lag()
+    assert CONSUMER_PARTITION_LAG.labels(topic="documents", partition="2")._value.get() == 20
+
+    # Then from the offset it committed, without asking the brokers
+    consumer._consumer.position.return_value = 110
+    consumer.handle_batch({tp: [Mock(offset=89, value=b"{}")]})
+    assert consumer.committed_offsets == {tp: 90}
+    consumer.update_partition_lag(force=True)
+    assert CONSUMER_PARTITION_LAG.labels(topic="documents", partition="2")._value.get() == 30
+    consumer._consumer.committed.assert_not_called()
+
+    # Throttled, then end offsets are asked for where no fetch reported one
+    consumer._consumer.highwater.return_value = None
+    consumer._consumer.end_offsets.return_value = {tp: 125}
+    consumer.update_partition_lag()
+    assert CONSUMER_PARTITION_LAG.labels(topic="documents", partition="2")._value.get() == 30
+    consumer.update_partition_lag(force=True)
+    assert CONSUMER_PARTITION_LAG.labels(topic="documents", partition="2")._value.get() == 35
+    consumer._consumer.end_offsets.assert_called_once_with([tp])
+
+    PartitionRebalanceListener(consumer).on_partitions_revoked({tp})
+    assert ("documents", "2") not in CONSUMER_PARTITION_LAG._metrics
+    assert consumer.committed_offsets == {}
+
+def test_consumer_exports_throughput_and_rebalances(consumer, db_session):
+    from kafka.structs import TopicPartition
+    from consumer.kafka_consumer import PartitionRebalanceListener
+    from src.app.core.metrics import (
+        CONSUMER_ASSIGNED_PARTITIONS, CONSUMER_DB_WRITE_DURATION, CONSUMER_REBALANCES, CONSUMER_RECORDS
+    )
+    from src.app.models.document import Document
+    db_session.add(Document(id=1, title="One", content="First"))
+    db_session.commit()
+    tp = TopicPartition("documents", 0)
+    records = CONSUMER_RECORDS.labels(topic="documents")._value.get()
+    assigned = CONSUMER_REBALANCES.labels(event="assigned")._value.get()
+    commits = CONSUMER_DB_WRITE_DURATION.labels(operation="commit")._sum.get()
+
+    PartitionRebalanceListener(consumer).on_partitions_assigned({tp, TopicPartition("documents", 1)})
+    consumer.handle_batch({tp: [_record(0, {"document_id": 1, "content": "Changed", "version": 2}),
+                                _record(1, {"document_id": 1, "content": "Again", "version": 3})]})
+
+    assert CONSUMER_REBALANCES.labels(event="assigned")._value.get() == assigned + 1
+    assert CONSUMER_ASSIGNED_PARTITIONS._value.get() == 2
+    assert CONSUMER_RECORDS.labels(topic="documents")._value.get() == records + 2
+    assert CONSUMER_DB_WRITE_DURATION.labels(operation="commit")._sum.get() > commits
+
+def test_process_batch_applies_only_newer_versions(consumer, db_session):
+    from src.app.models.document import Document
+    from src.app.services.text_processor import TextProcessor
+    db_session.add_all([
+        Document(id=1, title="One", content="c", version=4, processed_version=3, short_description="v3"),
+        Document(id=2, title="Two", content="c", version=2, processed_version=1, short_description="v1"),
+    ])
+    db_session.commit()
+
+    updated = consumer.process_batch([
+        _record(0, {"document_id": 1, "content": "old", "version": 2}),
+        _record(1, {"document_id": 2, "content": "newest words", "version": 2}),
+        _record(2, {"document_id": 2, "content": "older", "version": 1}),
+    ])
+
+    assert updated == 1
+    db_session.expire_all()
+    assert db_session.get(Document, 1).short_description == "v3"
+    assert db_session.get(Document, 2).short_description == TextProcessor.generate_description("newest words")
+    assert db_session.get(Document, 2).processed_version == 2
+
+def test_redelivered_event_skipped_by_dedup_window(consumer, db_session):
+    from src.app.models.document import Document
+    from src.app.core.metrics import CONSUMER_MESSAGES_SKIPPED
+    db_session.add(Document(id=1, title="One", content="c"))
+    db_session.commit()
+    event = {"document_id": 1, "content": "text", "version": 1}
+
+    assert consumer.process_batch([_record(0, event)]) == 1
+    with patch.object(consumer, 'Session') as session_factory:
+        assert consumer.process_batch([_record(0, event)]) == 0
+    session_factory.assert_not_called()
+    assert CONSUMER_MESSAGES_SKIPPED.labels(reason="duplicate")._value.get() >= 1
+
+def test_process_batch_skips_already_described_content(consumer, db_session):
+    from src.app.models.document import Document, hash_content
+    from src.app.services.text_processor import TextProcessor
+    db_session.add_all([
+        # As written by DocumentService.create: described inline, version 1 processed
+        Document(id=1, title="One", content="same", version=1, processed_version=1,
+                 content_hash=hash_content("same"), description_hash=hash_content("same"), short_description="inline"),
+        # Content changed back to what was already described
+        Document(id=2, title="Two", content="same", version=3, processed_version=2,
+                 content_hash=hash_content("same"), description_hash=hash_content("same"), short_description="kept"),
+    ])
+    db_session.commit()
+
+    with patch.object(TextProcessor, 'analyze_batch') as generate:
+        updated = consumer.process_batch([
+            _record(0, {"document_id": 1, "content": "same", "content_hash": hash_content("same"), "version": 1}),
+            _record(1, {"document_id": 2, "content": "same", "version": 3}),
+        ])
+
+    assert updated == 0
+    generate.assert_not_called()
+    db_session.expire_all()
+    assert db_session.get(Document, 1).short_description == "inline"
+    assert db_session.get(Document, 2).short_description == "kept"
+    assert db_session.get(Document, 2).processed_version == 3
+
+def test_process_batch_indexes_documents_for_search(consumer, db_session):
+    from src.app.models.document import Document, hash_content
+    from src.app.services.document import DocumentService
+    from src.app.core.metrics import CONSUMER_MESSAGES_SKIPPED
+    db_session.add(Document(id=1, title="Kafka", content="same", version=1, processed_version=1,
+                            content_hash=hash_content("same"), description_hash=hash_content("same"),
+                            short_description="inline"))
+    db_session.commit()
+    search = DocumentService(db_session).search
+    assert search("kafka").items == []
+
+    event = {"document_id": 1, "content": "same", "version": 1}
+    assert consumer.process_batch([_record(0, event)]) == 0
+
+    assert [hit.id for hit in search("kafka").items] == [1]
+    assert db_session.get(Document, 1).indexed_version == 1
+    # Indexed and described: a redelivery is skipped
+    from consumer.kafka_consumer import DedupWindow
+    consumer.dedup = DedupWindow(0)
+    stale = CONSUMER_MESSAGES_SKIPPED.labels(reason="stale")._value.get()
+    consumer.process_batch([_record(1, event)])
+    assert CONSUMER_MESSAGES_SKIPPED.labels(reason="stale")._value.get() == stale + 1
+
+def test_consumer_maintains_inverted_index(consumer, db_session, tmp_path, monkeypatch):
+    from src.app.models.document import Document
+    from src.app.services import inverted_index
+    monkeypatch.setattr(settings, "SEARCH_BACKEND", "inverted_index")
+    monkeypatch.setattr(settings, "INVERTED_INDEX_PATH", str(tmp_path / "documents.idx"))
+    monkeypatch.setattr(inverted_index, "_inverted_index", None)
+    monkeypatch.setattr(inverted_index, "_index_writer", None)
+    db_session.add_all([Document(id=1, title="One", content="kafka consumer"),
+                        Document(id=2, title="Two", content="missed while stopped")])
+    db_session.commit()
+
+    consumer.process_batch([_record(0, {"document_id": 1, "content": "kafka consumer", "version": 1})])
+    consumer.sync_search_index()  # Not due yet
+    assert inverted_index.get_inverted_index().search("kafka") == []
+
+    consumer.sync_search_index(catch_up=True)
+    index = inverted_index.get_inverted_index()
+    assert [doc_id for doc_id, _ in index.search("kafka")] == [1]
+    assert [doc_id for doc_id, _ in index.search("missed")] == [2]
+    assert db_session.get(Document, 1).indexed_version == 1
@@ -0,0 +1,53 @@
+import json
+from unittest.mock import Mock
+
+from consumer.replay import replay
+from tests.conftest import MockProducer
+
+def _dead_letter(offset, document_id, error_type="OperationalError", attempts=b"5"):
+    message = Mock()
+    message.partition = 0
+    message.offset = offset
+    message.key = str(document_id).encode()
+    message.topic = "documents.dlq"
+    message.value = json.dumps({"document_id": document_id, "content": "Text"}).encode()
+    message.headers = [
+        ("x-attempts", attempts),
+        ("x-not-before", b"0"),
+        ("x-original-topic", b"documents"),
+        ("x-error-type", error_type.encode()),
+    ]
+    return message
+
+def test_replay_republishes_to_original_topic_and_commits():
+    consumer = Mock()
+    consumer.__iter__ = Mock(return_value=iter([_dead_letter(0, 1), _dead_letter(1, 2)]))
+    producer = MockProducer()
+
+    assert replay(consumer, producer) == 2
+
+    assert [m["topic"] for m in producer.raw_messages] == ["documents", "documents"]
+    headers = dict(producer.raw_messages[0]["headers"])
+    assert "x-attempts" not in headers and "x-not-before" not in headers
+    assert headers["x-original-topic"] == b"documents"
+    consumer.commit.assert_called_once()
+
+def test_filtered_replay_keeps_replay_position():
+    consumer = Mock()
+    consumer.__iter__ = Mock(return_value=iter([
+        _dead_letter(0, 1), _dead_letter(1, 2, error_type="ValueError"), _dead_letter(2, 1)
+    ]))
+    producer = MockProducer()
+
+    assert replay(consumer, producer, document_id=1, limit=1) == 1
+
+    assert json.loads(producer.raw_messages[0]["value"])["document_id"] == 1
+    consumer.commit.assert_not_called()
+
+def test_dry_run_sends_nothing():
+    consumer = Mock()
+    consumer.__iter__ = Mock(return_value=iter([_dead_letter(0, 1)]))
+    producer = MockProducer()
+
+    assert replay(consumer, producer, error_type="OperationalError", dry_run=True) == 1
+    assert producer.raw_messages == []
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from src.app.services.document import DocumentService
 from src.app.models.document import Document
+from src.app.models.outbox import OutboxEvent
 from src.app.schemas.document import DocumentCreate, DocumentUpdate
 from src.app.core.metrics import DOCUMENTS_PROCESSED, KAFKA_MESSAGES_SENT
 
@@ -24,8 +25,11 @@ def test_create_document_with_metrics(db_session: Session):
     assert result.title == "Test"
     assert result.content == "Test content"
     assert DOCUMENTS_PROCESSED._value.get() == initial_processed + 1
-    assert KAFKA_MESSAGES_SENT._value.get() == initial_sent + 1
-    producer_mock.send_message.assert_called_once()
+    # Sent messages are counted by the producer on broker acknowledgement
+    assert KAFKA_MESSAGES_SENT._value.get() == initial_sent
+    # The event goes to the outbox instead of being sent inside the request
+    producer_mock.send_message.assert_not_called()
+    assert db_session.query(OutboxEvent).filter_by(aggregate_id=result.id).count() == 1
 
 def test_kafka_producer_metrics():
     from src.app.services.kafka_producer import MessageProducer
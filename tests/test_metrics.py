@@ -10,4 +10,105 @@ def test_metrics_endpoint():
     # Just test that metrics endpoint is accessible
     response = client.get("/metrics")
     assert response.status_code == 200
-    assert response.headers["content-type"] == CONTENT_TYPE_LATEST 
\ No newline at end of file
+    assert response.headers["content-type"] == CONTENT_TYPE_LATEST
+
+def test_requests_labelled_by_route_template(db_session):
+    from src.app.core.metrics import REQUEST_COUNT, REQUEST_DURATION, REQUEST_RESPONSE_SIZE, REQUESTS_IN_PROGRESS
+    endpoint = "/api/v1/documents/{doc_id}"
+    count = REQUEST_COUNT.labels(method="GET", endpoint=endpoint, status="404")
+    before = count._value.get()
+
+    for doc_id in (123456, 654321):
+        assert client.get(f"/api/v1/documents/{doc_id}").status_code == 404
+
+    assert count._value.get() == before + 2
+    assert REQUEST_DURATION.labels(method="GET", endpoint=endpoint)._sum.get() > 0
+    assert REQUEST_RESPONSE_SIZE.labels(method="GET", endpoint=endpoint)._sum.get() > 0
+    assert REQUESTS_IN_PROGRESS.labels(method="GET")._value.get() == 0
+    labels = {sample.labels.get("endpoint") for sample in REQUEST_COUNT.collect()[0].samples}
+    assert not any("123456" in label for label in labels if label)
+
+def test_unmatched_paths_share_one_label():
+    from src.app.core.metrics import REQUEST_COUNT
+    count = REQUEST_COUNT.labels(method="OTHER", endpoint="unmatched", status="404")
+    before = count._value.get()
+
+    client.request("BREW", "/no/such/path/1")
+    client.request("BREW", "/no/such/path/2")
+
+    assert count._value.get() == before + 2
+
+def test_slow_requests_carry_trace_id_exemplar(db_session, monkeypatch):
+    from src.app.core.config import settings
+    from src.app.core.metrics import REQUEST_DURATION
+    monkeypatch.setattr(settings, "METRICS_EXEMPLAR_MIN_SECONDS", 0.0)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    client.get("/api/v1/documents/424242", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+
+    samples = REQUEST_DURATION.collect()[0].samples
+    assert any(
+        sample.exemplar is not None and sample.exemplar.labels == {"trace_id": trace_id}
+        for sample in samples if sample.labels.get("endpoint") == "/api/v1/documents/{doc_id}"
+    )
+    response = client.get("/metrics", headers={"Accept": "application/openmetrics-text"})
+    assert response.headers["content-type"].startswith("application/openmetrics-text")
+
+def test_create_records_stage_timings(document_service):
+    from src.app.core.metrics import DOCUMENT_STAGE_DURATION
+    from src.app.schemas.document import DocumentCreate
+    stages = ("describe", "insert", "enqueue", "commit", "refresh")
+    before = {stage: DOCUMENT_STAGE_DURATION.labels(operation="create", stage=stage)._sum.get() for stage in stages}
+
+    document_service.create(DocumentCreate(title="Timed", content="Stage timings"))
+
+    for stage in stages:
+        assert DOCUMENT_STAGE_DURATION.labels(operation="create", stage=stage)._sum.get() > before[stage]
+
+def test_metrics_route_is_not_shadowed_by_a_mount():
+    from starlette.routing import Mount
+    assert [route.path for route in app.routes if getattr(route, "path", None) == "/metrics"] == ["/metrics"]
+    assert not any(isinstance(route, Mount) for route in app.routes)
+
+def test_multiprocess_registry_aggregates_workers(tmp_path, monkeypatch):
+    import os
+    from prometheus_client import Counter, Gauge, generate_latest, values
+    from src.app.core import metrics
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue(lambda: 999999999))
+    Counter("mp_test_requests", "Requests", registry=None).inc(3)
+    Gauge("mp_test_in_flight", "In flight", multiprocess_mode="livesum", registry=None).set(2)
+    monkeypatch.setattr(values, "ValueClass", values.MultiProcessValue(lambda: os.getpid()))
+    Counter("mp_test_requests", "Requests", registry=None).inc(4)
+
+    output = generate_latest(metrics.metrics_registry()).decode()
+
+    # Counters survive their process, gauges of dead pid 999999999 are dropped
+    assert "mp_test_requests_total 7.0" in output
+    assert "mp_test_in_flight" not in output
+    assert not any(name.endswith("_999999999.db") and name.startswith("gauge_live") for name in os.listdir(tmp_path))
+
+def test_multiprocess_metrics_endpoint_reports_app_info(tmp_path):
+    import os
+    import subprocess
+    import sys
+    # Metric values are bound to multiprocess files at import, so the app
+    # has to start in a fresh interpreter with the directory configured
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    scrape = (
+        "from fastapi.testclient import TestClient\n"
+        "from src.app.main import app\n"
+        "print(TestClient(app).get('/metrics').text)\n"
+    )
+    metrics_dir = tmp_path / "metrics"
+    metrics_dir.mkdir()
+    env = dict(
+        os.environ,
+        PROMETHEUS_MULTIPROC_DIR=str(metrics_dir),
+        DATABASE_URL=f"sqlite:///{tmp_path}/app.db",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", scrape], cwd=root, env=env, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert 'document_processor_info{environment="development",version="1.0.0"} 1.0' in output
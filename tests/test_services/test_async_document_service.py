@@ -0,0 +1,57 @@
+import os
+import pytest
+import pytest_asyncio
+
+from src.app.core.database import Base, async_database_url
+from src.app.schemas.document import DocumentCreate, DocumentUpdate
+from src.app.services.document import AsyncDocumentService
+
+pytest.importorskip("aiosqlite")
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test_async.db"
+
+@pytest_asyncio.fixture
+async def async_session():
+    engine = create_async_engine(ASYNC_DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+    await engine.dispose()
+    if os.path.exists("./test_async.db"):
+        os.remove("./test_async.db")
+
+@pytest.fixture
+def async_service(async_session, mock_kafka_producer):
+    return AsyncDocumentService(async_session, mock_kafka_producer)
+
+def test_async_database_url():
+    assert async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+@pytest.mark.asyncio
+async def test_async_create_and_get(async_service, sample_document):
+    created = await async_service.create(DocumentCreate(**sample_document))
+
+    assert created.id is not None
+    assert created.short_description == "Document contains 6 words and 31 characters"
+    fetched = await async_service.get(created.id)
+    assert fetched.title == sample_document["title"]
+
+@pytest.mark.asyncio
+async def test_async_list_update_remove(async_service):
+    first = await async_service.create(DocumentCreate(title="First", content="one"))
+    await async_service.create(DocumentCreate(title="Second", content="two"))
+
+    docs = await async_service.list(0, 10)
+    assert [d.title for d in docs] == ["First", "Second"]
+
+    updated = await async_service.update(first.id, DocumentUpdate(title="Renamed"))
+    assert updated.title == "Renamed"
+
+    assert await async_service.remove(first.id) is True
+    assert await async_service.get(first.id) is None
+    assert await async_service.remove(first.id) is False
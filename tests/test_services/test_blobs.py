@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+from src.app.models.blob import ContentBlob
+from src.app.models.document import Document, hash_content
+from src.app.schemas.document import DocumentCreate, DocumentUpdate
+from src.app.services import blobs
+from src.app.services.search import index_documents
+
+BODY = "Compressible body about kafka partitions. " * 200
+
+def test_large_bodies_are_stored_once_as_blobs(document_service, db_session):
+    first = document_service.create(DocumentCreate(title="One", content=BODY))
+    assert first.content == BODY
+    second_id, = document_service.create_many([DocumentCreate(title="Two", content=BODY)])
+
+    assert db_session.query(ContentBlob).count() == 1
+    blob = db_session.get(ContentBlob, hash_content(BODY))
+    assert blob.encoding != "identity" and len(blob.data) < blob.size == len(BODY)
+    stored = db_session.query(Document.content).filter(Document.id.in_([first.id, second_id])).all()
+    assert stored == [(None,), (None,)]
+
+    document_service.cache.clear()
+    assert document_service.get(second_id).content == BODY
+    assert [doc.content for doc in document_service.list()] == [BODY, BODY]
+    assert [doc.content for doc in document_service.list_page(fields=["title", "content"]).items] == [BODY, BODY]
+
+def test_events_reference_large_bodies(document_service, mock_kafka_producer, monkeypatch):
+    from src.app.core.config import settings
+    monkeypatch.setattr(settings, "OUTBOX_ENABLED", False)
+    small = document_service.create(DocumentCreate(title="Small", content="short body"))
+    large = document_service.create(DocumentCreate(title="Large", content=BODY))
+
+    small_event, large_event = mock_kafka_producer.messages
+    assert small_event["content"] == "short body"
+    assert "content" not in large_event
+    assert large_event["content_hash"] == large.content_hash
+    assert small.content == "short body"
+
+def test_update_moves_body_between_inline_and_blob(document_service, db_session):
+    doc = document_service.create(DocumentCreate(title="Doc", content="short body"))
+
+    updated = document_service.update(doc.id, DocumentUpdate(content=BODY))
+    assert updated.content == BODY
+    assert db_session.query(Document.content).filter(Document.id == doc.id).scalar() is None
+
+    # Same body again: the blob stays the stored copy
+    assert document_service.update(doc.id, DocumentUpdate(content=BODY, title="Renamed")).content == BODY
+    assert db_session.query(Document.content).filter(Document.id == doc.id).scalar() is None
+
+    assert document_service.update(doc.id, DocumentUpdate(content="short again")).content == "short again"
+    assert db_session.query(Document.content).filter(Document.id == doc.id).scalar() == "short again"
+
+def test_zlib_fallback_without_zstandard(monkeypatch):
+    monkeypatch.setattr(blobs, "zstandard", None)
+    encoding, data = blobs.compress(BODY.encode())
+    assert encoding == "zlib"
+    assert blobs.decompress(encoding, data).decode() == BODY
+    # Incompressible input is kept as it is
+    assert blobs.compress(b"x") == ("identity", b"x")
+
+def test_orphaned_blobs_are_collected_after_grace(document_service, db_session):
+    doc = document_service.create(DocumentCreate(title="Doc", content=BODY))
+    document_service.update(doc.id, DocumentUpdate(content="short body"))
+
+    assert blobs.delete_orphaned_blobs(db_session) == 0  # Within the grace period
+    db_session.query(ContentBlob).update(
+        {ContentBlob.referenced_at: datetime.now(timezone.utc) - timedelta(hours=2)}
+    )
+    other = document_service.create(DocumentCreate(title="Other", content=BODY + "!"))
+    db_session.query(ContentBlob).update(
+        {ContentBlob.referenced_at: datetime.now(timezone.utc) - timedelta(hours=2)}
+    )
+
+    assert blobs.delete_orphaned_blobs(db_session) == 1
+    assert [blob.hash for blob in db_session.query(ContentBlob)] == [other.content_hash]
+
+def test_compact_moves_existing_bodies(document_service, db_session):
+    db_session.add(Document(title="Old", content=BODY, content_hash=hash_content(BODY)))
+    db_session.commit()
+
+    assert blobs.externalize_existing(db_session) == 1
+    db_session.expire_all()
+    doc = db_session.query(Document).one()
+    assert doc.content is None
+    document_service.cache.clear()
+    assert document_service.get(doc.id).content == BODY
+
+def test_search_reads_blob_bodies(document_service, db_session):
+    doc = document_service.create(DocumentCreate(title="Large", content=BODY + " needle"))
+    index_documents(db_session, [doc.id])
+    db_session.commit()
+
+    hit, = document_service.search("needle").items
+    assert hit.id == doc.id and "<mark>needle</mark>" in hit.highlight
+
+def test_consumer_describes_referenced_bodies(db_session):
+    from consumer.kafka_consumer import MessageConsumer
+    from src.app.services.text_processor import TextProcessor
+    consumer = MessageConsumer.__new__(MessageConsumer)
+    consumer.Session = lambda: db_session
+    consumer.dedup = Mock(seen=Mock(return_value=False))
+    consumer.failures = Mock()
+    blobs.store_contents(db_session, [BODY])
+    db_session.add(Document(id=1, title="Doc", content=None, content_hash=hash_content(BODY), version=2))
+    db_session.commit()
+
+    message = Mock(value=json.dumps({"document_id": 1, "content_hash": hash_content(BODY), "version": 2}).encode())
+    assert consumer.process_batch([message]) == 1
+    assert db_session.get(Document, 1).short_description == TextProcessor.generate_description(BODY)
+    consumer.failures.dead_letter.assert_not_called()
@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import Mock
+
+from src.app.core.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+from src.app.schemas.document import DocumentCreate, DocumentUpdate
+from src.app.services.cache import InMemorySharedClient, LocalDocumentCache, SharedDocumentCache
+from src.app.services.document import DocumentService
+
+@pytest.fixture
+def local_cache():
+    return LocalDocumentCache(max_entries=100, max_bytes=1024 * 1024, ttl=60)
+
+@pytest.fixture
+def cached_service(db_session, local_cache):
+    return DocumentService(db_session, Mock(), cache=local_cache)
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalDocumentCache(max_entries=2, max_bytes=1024 * 1024, ttl=60)
+    evictions = CACHE_EVICTIONS.labels(cache="local")._value.get()
+    cache.set(1, {"id": 1})
+    cache.set(2, {"id": 2})
+    cache.get(1)
+    cache.set(3, {"id": 3})
+
+    assert cache.get(2) is None
+    assert cache.get(1) == {"id": 1}
+    assert CACHE_EVICTIONS.labels(cache="local")._value.get() == evictions + 1
+
+def test_local_cache_respects_byte_limit():
+    cache = LocalDocumentCache(max_entries=100, max_bytes=300, ttl=60)
+    cache.set(1, {"content": "a" * 100})
+    cache.set(2, {"content": "b" * 100})
+
+    assert cache.get(1) is None
+    assert cache.get(2) is not None
+
+def test_local_cache_expires_entries():
+    cache = LocalDocumentCache(max_entries=100, max_bytes=1024, ttl=-1)
+    cache.set(1, {"id": 1})
+    assert cache.get(1) is None
+
+def test_shared_cache_round_trips_json():
+    cache = SharedDocumentCache(InMemorySharedClient(), ttl=60)
+    cache.set(1, {"id": 1, "title": "T"})
+    assert cache.get(1) == {"id": 1, "title": "T"}
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+def test_get_reads_through_cache(cached_service, local_cache):
+    doc = cached_service.create(DocumentCreate(title="Cached", content="hot document"))
+    hits = CACHE_HITS.labels(cache="local")._value.get()
+    misses = CACHE_MISSES.labels(cache="local")._value.get()
+
+    assert cached_service.get(doc.id).title == "Cached"
+    assert cached_service.get(doc.id).title == "Cached"
+
+    assert CACHE_MISSES.labels(cache="local")._value.get() == misses + 1
+    assert CACHE_HITS.labels(cache="local")._value.get() == hits + 1
+
+def test_update_and_remove_invalidate(cached_service):
+    doc = cached_service.create(DocumentCreate(title="Before", content="text"))
+    cached_service.get(doc.id)
+
+    cached_service.update(doc.id, DocumentUpdate(title="After"))
+    assert cached_service.get(doc.id).title == "After"
+
+    cached_service.remove(doc.id)
+    assert cached_service.get(doc.id) is None
+
+def test_shared_cache_hit_restores_datetimes(db_session):
+    service = DocumentService(db_session, Mock(), cache=SharedDocumentCache(InMemorySharedClient(), ttl=60))
+    doc = service.create(DocumentCreate(title="Shared", content="text"))
+    service.get(doc.id)
+
+    cached = service.get(doc.id)
+    assert cached.created_at == doc.created_at
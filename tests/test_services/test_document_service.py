@@ -1,5 +1,8 @@
+import json
 import pytest
 from unittest.mock import Mock, patch
+from src.app.models.document import hash_content
+from src.app.models.outbox import OutboxEvent
 from src.app.services.document import DocumentService
 from src.app.schemas.document import DocumentCreate, DocumentUpdate
 from src.app.core.metrics import DOCUMENTS_PROCESSED, KAFKA_MESSAGES_SENT
@@ -24,11 +27,27 @@ def test_create_document(document_service, sample_document):
     # Test with actual word and character counts
     assert db_doc.short_description == "Document contains 6 words and 31 characters"
     
-    # Verify Kafka message was sent
-    assert len(document_service.producer.messages) == 1
-    message = document_service.producer.messages[0]
+    # Verify the Kafka message was written to the outbox
+    events = document_service.db.query(OutboxEvent).all()
+    assert len(events) == 1
+    message = json.loads(events[0].payload)
     assert message["document_id"] == db_doc.id
     assert message["content"] == db_doc.content
+    assert document_service.producer.messages == []
+
+def test_create_document_without_outbox(document_service, sample_document, monkeypatch):
+    monkeypatch.setattr("src.app.services.document.settings.OUTBOX_ENABLED", False)
+    db_doc = document_service.create(DocumentCreate(**sample_document))
+
+    assert document_service.producer.messages == [
+        {"document_id": db_doc.id, "content": db_doc.content, "content_hash": db_doc.content_hash, "version": 1}
+    ]
+    assert document_service.db.query(OutboxEvent).count() == 0
+
+def test_create_document_with_precomputed_description(document_service, sample_document):
+    db_doc = document_service.create(DocumentCreate(**sample_document), description="Precomputed")
+
+    assert db_doc.short_description == "Precomputed"
 
 def test_get_document(document_service, sample_document):
     # Create document
@@ -148,4 +167,93 @@ def test_create_document_with_metrics(db_session, mock_producer):
     result = service.create(doc_data)
     
     assert result.title == "Test"
-    mock_producer.send_message.assert_called_once() 
\ No newline at end of file
+    mock_producer.send_message.assert_not_called()
+    assert db_session.query(OutboxEvent).count() == 1
+
+def test_list_page_walks_forward_and_back(document_service, clean_db):
+    for i in range(5):
+        document_service.create(DocumentCreate(title=f"Document {i}", content=f"Content {i}"))
+
+    first = document_service.list_page(limit=2)
+    assert [d.title for d in first.items] == ["Document 0", "Document 1"]
+    assert first.prev_cursor is None
+
+    second = document_service.list_page(first.next_cursor, limit=2)
+    assert [d.title for d in second.items] == ["Document 2", "Document 3"]
+
+    last = document_service.list_page(second.next_cursor, limit=2)
+    assert [d.title for d in last.items] == ["Document 4"]
+    assert last.next_cursor is None
+
+    back = document_service.list_page(last.prev_cursor, limit=2)
+    assert [d.title for d in back.items] == ["Document 2", "Document 3"]
+    assert back.next_cursor is not None
+
+def test_list_page_is_stable_under_inserts(document_service, clean_db):
+    for i in range(3):
+        document_service.create(DocumentCreate(title=f"Document {i}", content="x"))
+    first = document_service.list_page(limit=2)
+
+    document_service.create(DocumentCreate(title="Late", content="x"))
+
+    second = document_service.list_page(first.next_cursor, limit=2)
+    assert [d.title for d in second.items] == ["Document 2", "Late"]
+
+def test_list_page_rejects_garbage_cursor(document_service):
+    from src.app.services.pagination import InvalidCursorError
+    with pytest.raises(InvalidCursorError):
+        document_service.list_page("not-a-cursor")
+
+def test_list_page_with_fields_defers_content(document_service, db_session, clean_db):
+    document_service.create(DocumentCreate(title="Projected", content="large body"))
+    db_session.expunge_all()
+
+    page = document_service.list_page(limit=10, fields=["title"])
+
+    assert page.items[0].title == "Projected"
+    assert "content" not in page.items[0].__dict__
+
+def test_create_many_returns_ids_in_order(document_service, clean_db):
+    docs = [DocumentCreate(title=f"Bulk {i}", content="x " * i) for i in range(4)]
+
+    ids = document_service.create_many(docs)
+
+    assert len(ids) == 4
+    assert [document_service.get(i).title for i in ids] == [d.title for d in docs]
+    events = document_service.db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert [e.aggregate_id for e in events] == ids
+
+def test_create_many_without_outbox_sends_batch(db_session, mock_producer, monkeypatch):
+    monkeypatch.setattr("src.app.services.document.settings.OUTBOX_ENABLED", False)
+    service = DocumentService(db_session, mock_producer)
+
+    ids = service.create_many([DocumentCreate(title="A", content="a"), DocumentCreate(title="B", content="b")])
+
+    mock_producer.send_many.assert_called_once_with([
+        {"document_id": ids[0], "content": "a", "content_hash": hash_content("a"), "version": 1},
+        {"document_id": ids[1], "content": "b", "content_hash": hash_content("b"), "version": 1},
+    ])
+
+def test_update_bumps_version_and_publishes_content_changes(document_service, sample_document):
+    created = document_service.create(DocumentCreate(**sample_document))
+    assert created.version == 1
+
+    renamed = document_service.update(created.id, DocumentUpdate(title="Renamed"))
+    assert renamed.version == 2
+    # Renaming is published too, so the search index picks up the title
+    assert document_service.db.query(OutboxEvent).count() == 2
+
+    edited = document_service.update(created.id, DocumentUpdate(content="New body"))
+    assert edited.version == 3
+    events = document_service.db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert json.loads(events[-1].payload) == {
+        "document_id": created.id, "content": "New body", "content_hash": hash_content("New body"), "version": 3
+    }
+
+def test_update_with_same_content_publishes_nothing(document_service, sample_document):
+    created = document_service.create(DocumentCreate(**sample_document))
+    assert created.content_hash == created.description_hash == hash_content(sample_document["content"])
+
+    document_service.update(created.id, DocumentUpdate(content=sample_document["content"]))
+
+    assert document_service.db.query(OutboxEvent).count() == 1
@@ -32,4 +32,100 @@ def test_send_message_failure(mock_kafka_producer):
     producer = MessageProducer()
     
     with pytest.raises(Exception):
-        producer.send_message({"test": "data"})
\ No newline at end of file
+        producer.send_message({"test": "data"})
+
+def test_producer_manager_creates_single_instance(mock_kafka_producer):
+    from src.app.services.kafka_producer import ProducerManager
+    manager = ProducerManager()
+
+    first = manager.get()
+    second = manager.get()
+
+    assert first is second
+    mock_kafka_producer.assert_called_once()
+
+def test_producer_manager_close_flushes_and_resets(mock_kafka_producer):
+    from src.app.services.kafka_producer import ProducerManager
+    manager = ProducerManager()
+    manager.start()
+
+    manager.close(timeout=1)
+
+    instance = mock_kafka_producer.return_value
+    instance.flush.assert_called_once_with(timeout=1)
+    instance.close.assert_called_once_with(timeout=1)
+    assert manager.started is False
+
+def test_producer_manager_start_tolerates_unavailable_broker():
+    from src.app.services.kafka_producer import ProducerManager
+    manager = ProducerManager(factory=Mock(side_effect=Exception("No brokers")))
+
+    assert manager.start() is None
+    assert manager.started is False
+    assert manager.is_healthy() is False
+
+def test_lifespan_reuses_shared_producer(monkeypatch, db_session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.services.kafka_producer import producer_manager
+    from tests.conftest import MockProducer
+
+    factory = Mock(return_value=MockProducer())
+    monkeypatch.setattr(producer_manager, "_producer", None)
+    monkeypatch.setattr(producer_manager, "factory", factory)
+
+    monkeypatch.setattr("src.app.lifespan.settings.OUTBOX_RELAY_ENABLED", False)
+
+    with TestClient(app) as client:
+        client.get("/api/v1/documents/")
+        client.get("/api/v1/documents/")
+        assert producer_manager.started is True
+
+    factory.assert_called_once()
+    assert producer_manager.started is False
+
+def test_send_message_counts_on_acknowledgement(producer, mock_kafka_producer):
+    from src.app.core.metrics import KAFKA_MESSAGES_SENT, KAFKA_MESSAGES_FAILED
+    future = Mock()
+    mock_kafka_producer.return_value.send.return_value = future
+    initial_sent = KAFKA_MESSAGES_SENT._value.get()
+    initial_failed = KAFKA_MESSAGES_FAILED._value.get()
+
+    assert producer.send_message({"document_id": 7, "content": "x"}) is future
+    # Nothing is counted until the broker answers
+    assert KAFKA_MESSAGES_SENT._value.get() == initial_sent
+    args, kwargs = mock_kafka_producer.return_value.send.call_args
+    assert kwargs["key"] == b"7"
+
+    future.add_callback.call_args[0][0](Mock(partition=0, offset=1))
+    assert KAFKA_MESSAGES_SENT._value.get() == initial_sent + 1
+
+    future.add_errback.call_args[0][0](Exception("broker down"))
+    assert KAFKA_MESSAGES_FAILED._value.get() == initial_failed + 1
+
+def test_send_many_continues_after_enqueue_failure(producer, mock_kafka_producer):
+    mock_kafka_producer.return_value.send.side_effect = [Mock(), Exception("buffer full"), Mock()]
+
+    futures = producer.send_many([{"document_id": i} for i in range(3)], flush=True)
+
+    assert len(futures) == 3
+    assert futures[1] is None
+    mock_kafka_producer.return_value.flush.assert_called_once()
+
+def test_producer_config_profiles(monkeypatch):
+    from src.app.services import kafka_producer
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_PRODUCER_PROFILE", "default")
+    assert kafka_producer.producer_config() == {}
+
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_PRODUCER_PROFILE", "throughput")
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_LINGER_MS", 50)
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_COMPRESSION_TYPE", "gzip")
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_ACKS", "all")
+    config = kafka_producer.producer_config()
+    assert config == {"linger_ms": 50, "batch_size": 65536, "compression_type": "gzip", "acks": "all"}
+
+def test_producer_config_rejects_unknown_compression(monkeypatch):
+    from src.app.services import kafka_producer
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_COMPRESSION_TYPE", "brotli")
+    with pytest.raises(ValueError):
+        kafka_producer.producer_config()
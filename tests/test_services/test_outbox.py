@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import Mock
+from sqlalchemy.orm import sessionmaker
+
+from src.app.core.metrics import OUTBOX_PENDING
+from src.app.models.outbox import OutboxEvent
+from src.app.services.outbox import OutboxRelay, enqueue_event
+from tests.conftest import MockProducer
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+@pytest.fixture
+def add_events(session_factory):
+    def _add(*messages):
+        session = session_factory()
+        for message in messages:
+            enqueue_event(session, message)
+        session.commit()
+        session.close()
+    return _add
+
+def pending_events(session_factory):
+    session = session_factory()
+    try:
+        return session.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    finally:
+        session.close()
+
+def test_relay_publishes_and_removes_events(session_factory, add_events):
+    add_events({"document_id": 1, "content": "a"}, {"document_id": 2, "content": "b"})
+    producer = MockProducer()
+    relay = OutboxRelay(session_factory, lambda: producer)
+
+    assert relay.relay_once() == 2
+    assert producer.messages == [
+        {"document_id": 1, "content": "a"},
+        {"document_id": 2, "content": "b"},
+    ]
+    assert pending_events(session_factory) == []
+    assert OUTBOX_PENDING._value.get() == 0
+
+def test_relay_keeps_per_document_order(session_factory, add_events):
+    add_events({"document_id": 1, "content": "v1"}, {"document_id": 1, "content": "v2"})
+    producer = MockProducer()
+    relay = OutboxRelay(session_factory, lambda: producer)
+
+    # Only the oldest event of a document is sent per round
+    assert relay.relay_once() == 1
+    assert relay.relay_once() == 1
+    assert [m["content"] for m in producer.messages] == ["v1", "v2"]
+
+def test_relay_retries_failed_event_and_blocks_its_document(session_factory, add_events):
+    add_events(
+        {"document_id": 1, "content": "v1"},
+        {"document_id": 1, "content": "v2"},
+        {"document_id": 2, "content": "other"},
+    )
+    producer = MockProducer()
+    failing = {"count": 0}
+    def send_message(message, topic=None):
+        if message["document_id"] == 1:
+            failing["count"] += 1
+            raise Exception("broker down")
+        producer.messages.append(message)
+    producer.send_message = send_message
+    relay = OutboxRelay(session_factory, lambda: producer)
+
+    assert relay.relay_once() == 1
+    assert relay.relay_once() == 0  # Document 1 is backing off
+    assert producer.messages == [{"document_id": 2, "content": "other"}]
+    assert failing["count"] == 1
+
+    events = pending_events(session_factory)
+    assert [e.payload for e in events] == [
+        '{"document_id":1,"content":"v1"}',
+        '{"document_id":1,"content":"v2"}',
+    ]
+    assert events[0].attempts == 1
+    assert events[0].last_error == "broker down"
+    assert events[0].available_at > events[0].created_at
+
+def test_relay_reschedules_unacknowledged_event(session_factory, add_events):
+    add_events({"document_id": 1, "content": "a"})
+    future = Mock()
+    future.get.side_effect = Exception("timed out")
+    producer = Mock()
+    producer.send_message.return_value = future
+    relay = OutboxRelay(session_factory, lambda: producer)
+
+    assert relay.relay_once() == 0
+    producer.flush.assert_called_once()
+    assert pending_events(session_factory)[0].attempts == 1
+
+def test_relay_updates_backlog_metrics_while_kafka_is_down(session_factory, add_events):
+    def unavailable():
+        raise ConnectionError("no brokers available")
+    relay = OutboxRelay(session_factory, unavailable)
+
+    add_events({"document_id": 1, "content": "a"})
+    with pytest.raises(ConnectionError):
+        relay.relay_once()
+    assert OUTBOX_PENDING._value.get() == 1
+
+    add_events({"document_id": 2, "content": "b"})
+    with pytest.raises(ConnectionError):
+        relay.relay_once()
+    assert OUTBOX_PENDING._value.get() == 2
@@ -0,0 +1,128 @@
+import pytest
+
+from src.app.models.document import Document
+from src.app.schemas.document import DocumentCreate, DocumentUpdate
+from src.app.services.pagination import InvalidCursorError
+from src.app.services.search import SqliteSearch, index_documents
+
+def _indexed(service, *docs):
+    ids = [service.create(DocumentCreate(title=title, content=content)).id for title, content in docs]
+    index_documents(service.db, ids)
+    service.db.commit()
+    return ids
+
+def test_search_ranks_and_highlights(document_service):
+    body, title = _indexed(
+        document_service,
+        ("Cooking notes", "Recipes for bread and a short remark about kafka."),
+        ("Kafka in production", "Partitions, consumer groups and offsets."),
+    )
+
+    page = document_service.search("kafka")
+
+    assert [hit.id for hit in page.items] == [title, body]  # Title matches weigh more
+    assert page.items[0].rank > page.items[1].rank
+    assert "<mark>kafka</mark>" in page.items[1].highlight
+    assert page.next_cursor is None
+
+def test_search_requires_every_term_and_stems(document_service):
+    first, _ = _indexed(
+        document_service,
+        ("Dogs", "Running dogs chase cats"),
+        ("Cats", "Sleeping cats"),
+    )
+
+    assert [hit.id for hit in document_service.search("dog run").items] == [first]
+    assert document_service.search("dogs birds").items == []
+    # FTS5 syntax in user input is searched for literally, not parsed
+    assert len(document_service.search('"cats (').items) == 2
+    assert document_service.search("!!!").items == []
+
+def test_search_keyset_pagination(document_service):
+    ids = _indexed(document_service, *[(f"Doc {i}", "shared term " * (i + 1)) for i in range(5)])
+
+    seen = []
+    cursor = None
+    while True:
+        page = document_service.search("shared", cursor=cursor, limit=2)
+        seen.extend(hit.id for hit in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert sorted(seen) == sorted(ids)
+    assert len(seen) == len(set(seen))
+    with pytest.raises(InvalidCursorError):
+        document_service.search("shared", cursor="not-a-cursor")
+
+def test_index_follows_updates_and_deletes(document_service):
+    doc_id, = _indexed(document_service, ("Alpha", "first body"))
+
+    document_service.update(doc_id, DocumentUpdate(title="Beta"))
+    assert [hit.id for hit in document_service.search("alpha").items] == [doc_id]  # Not reindexed yet
+    index_documents(document_service.db, [doc_id])
+    assert document_service.search("alpha").items == []
+    assert [hit.id for hit in document_service.search("beta").items] == [doc_id]
+    doc = document_service.db.get(Document, doc_id)
+    assert doc.indexed_version == doc.version == 2
+
+    document_service.remove(doc_id)
+    assert document_service.search("beta").items == []
+
+def test_match_query_quotes_terms():
+    assert SqliteSearch.match_query('title:"a b" -c') == '"title" "a" "b" "c"'
+    assert SqliteSearch.match_query("  ") is None
+
+def test_search_route(client, db_session):
+    doc = Document(title="Searchable", content="needle in a haystack")
+    db_session.add(doc)
+    db_session.flush()
+    index_documents(db_session, [doc.id])
+    db_session.commit()
+
+    response = client.get("/api/v1/documents/search", params={"q": "needle", "limit": 1})
+    assert response.status_code == 200
+    hit, = response.json()
+    assert hit["id"] == doc.id
+    assert hit["highlight"] == "<mark>needle</mark> in a haystack"
+    assert "X-Next-Cursor" not in response.headers
+
+    assert client.get("/api/v1/documents/search", params={"q": "needle", "cursor": "bad"}).status_code == 400
+    assert client.get("/api/v1/documents/search").status_code == 422
+
+@pytest.fixture
+def inverted_index_backend(tmp_path, monkeypatch):
+    from src.app.core.config import settings
+    from src.app.services import inverted_index
+    monkeypatch.setattr(settings, "SEARCH_BACKEND", "inverted_index")
+    monkeypatch.setattr(settings, "INVERTED_INDEX_PATH", str(tmp_path / "documents.idx"))
+    monkeypatch.setattr(inverted_index, "_inverted_index", None)
+    monkeypatch.setattr(inverted_index, "_index_writer", None)
+
+def test_inverted_index_backend(document_service, inverted_index_backend):
+    from src.app.services import inverted_index
+    from src.app.services.search import catch_up_inverted_index, flush_inverted_index
+    first, second, third = [
+        document_service.create(DocumentCreate(title=f"Doc {i}", content=content)).id
+        for i, content in enumerate(["kafka " * 3 + "streams", "a note on kafka and offsets", "unrelated"])
+    ]
+    index_documents(document_service.db, [first, second])
+    assert document_service.search("kafka").items == []  # Queued, not merged yet
+
+    assert flush_inverted_index(document_service.db) == 2
+    page = document_service.search("kafka", limit=1)
+    assert [hit.id for hit in page.items] == [first]
+    assert page.items[0].highlight == "<mark>kafka</mark> <mark>kafka</mark> <mark>kafka</mark> streams"
+    page = document_service.search("kafka", cursor=page.next_cursor, limit=1)
+    assert [hit.id for hit in page.items] == [second]
+    assert page.items[0].highlight == "a note on <mark>kafka</mark> and offsets"
+    assert document_service.db.get(Document, second).indexed_version == 1
+
+    # Documents never indexed are found by the catch-up; deleted ones are skipped
+    assert catch_up_inverted_index(document_service.db) == 1
+    assert [hit.id for hit in document_service.search("unrelated").items] == [third]
+    document_service.remove(first)
+    assert [hit.id for hit in document_service.search("kafka").items] == [second]
+    # The next catch-up removes them from the index
+    catch_up_inverted_index(document_service.db)
+    assert inverted_index.get_inverted_index().doc_ids() == [second, third]
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.app.core.metrics import TEXT_EXECUTOR_DURATION, TEXT_EXECUTOR_REJECTED
+from src.app.services import text_executor
+from src.app.services.text_executor import TextExecutor, TextExecutorBusy
+
+def _sample(metric, name, **labels):
+    for family in metric.collect():
+        for sample in family.samples:
+            if sample.name == name and sample.labels == labels:
+                return sample.value
+    return 0.0
+
+@pytest.mark.asyncio
+async def test_small_texts_run_inline():
+    executor = TextExecutor(kind="thread", max_workers=1, inline_max_chars=100)
+    try:
+        assert await executor.describe("a b c") == "Document contains 3 words and 5 characters"
+        assert executor._executor is None  # No pool started for small input
+    finally:
+        executor.shutdown()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["thread", "process"])
+async def test_large_texts_run_in_pool(kind):
+    executor = TextExecutor(kind=kind, max_workers=1, inline_max_chars=0)
+    before = _sample(TEXT_EXECUTOR_DURATION, "text_executor_duration_seconds_count", mode=kind)
+    try:
+        descriptions = await executor.describe_many(["one two", "three"])
+    finally:
+        executor.shutdown()
+
+    assert descriptions == [
+        "Document contains 2 words and 7 characters",
+        "Document contains 1 words and 5 characters",
+    ]
+    assert executor.pending == 0
+    assert _sample(TEXT_EXECUTOR_DURATION, "text_executor_duration_seconds_count", mode=kind) == before + 1
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    release = threading.Event()
+    executor = TextExecutor(kind="thread", max_workers=1, max_pending=1, inline_max_chars=0)
+    rejected = _sample(TEXT_EXECUTOR_REJECTED, "text_executor_rejected_total")
+    try:
+        blocked = asyncio.ensure_future(executor.run(release.wait, size=1))
+        while executor.pending == 0:
+            await asyncio.sleep(0.01)
+        with pytest.raises(TextExecutorBusy):
+            await executor.describe("a b c")
+        release.set()
+        assert await blocked is True
+    finally:
+        release.set()
+        executor.shutdown()
+
+    assert executor.pending == 0
+    assert _sample(TEXT_EXECUTOR_REJECTED, "text_executor_rejected_total") == rejected + 1
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_slot_until_work_finishes():
+    release = threading.Event()
+    executor = TextExecutor(kind="thread", max_workers=1, max_pending=1, inline_max_chars=0)
+    try:
+        blocked = asyncio.ensure_future(executor.run(release.wait, size=1))
+        while executor.pending == 0:
+            await asyncio.sleep(0.01)
+        blocked.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+
+        # The analysis is still running, so the queue is still full
+        assert executor.pending == 1
+        with pytest.raises(TextExecutorBusy):
+            await executor.describe("a b c")
+        release.set()
+        while executor.pending:
+            await asyncio.sleep(0.01)
+        assert await executor.describe("a b c") == "Document contains 3 words and 5 characters"
+    finally:
+        release.set()
+        executor.shutdown()
+
+def test_create_returns_503_when_busy(client, sample_document, monkeypatch):
+    async def busy(self, text):
+        raise TextExecutorBusy("full")
+    monkeypatch.setattr(TextExecutor, "describe", busy)
+
+    response = client.post("/api/v1/documents/", json=sample_document)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_bulk_marks_chunk_busy(client, sample_document, monkeypatch):
+    async def busy(self, texts):
+        raise TextExecutorBusy("full")
+    monkeypatch.setattr(TextExecutor, "describe_many", busy)
+
+    response = client.post("/api/v1/documents/bulk", json=[sample_document])
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["error"] == "Text analysis queue is full, retry later"
+
+def test_executor_configured_from_settings(monkeypatch):
+    monkeypatch.setattr(text_executor, "_text_executor", None)
+    executor = text_executor.get_text_executor()
+    assert executor is text_executor.get_text_executor()
+    assert executor.max_pending == text_executor.settings.TEXT_EXECUTOR_MAX_PENDING
+
+def test_start_warms_up_process_workers():
+    executor = TextExecutor(kind="process", max_workers=2)
+    try:
+        pool = executor.start()
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert len(pool._processes) == 2
+    finally:
+        executor.shutdown()
@@ -0,0 +1,39 @@
+from sqlalchemy import text
+
+from src.app.core.database import InstrumentedQueuePool, create_db_engine, engine_options
+from src.app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_WAIT
+
+def test_engine_options_postgres_profile():
+    options = engine_options("postgresql://postgres:postgres@db/app_db")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=30000"}
+
+def test_engine_options_async_postgres_timeout():
+    options = engine_options("postgresql+asyncpg://postgres:postgres@db/app_db", is_async=True)
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "30000"}}
+
+def test_engine_options_memory_sqlite_skips_pool_sizing():
+    options = engine_options("sqlite://")
+    assert "pool_size" not in options
+    assert options["connect_args"] == {"check_same_thread": False}
+
+def test_sqlite_pragmas_applied(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pragmas.db")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    engine.dispose()
+
+def test_pool_metrics_track_checkouts(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db")
+    gauge = DB_POOL_CHECKED_OUT.labels(engine="sync")
+    waits = DB_POOL_WAIT.labels(engine="sync")
+    initial = gauge._value.get()
+    initial_waits = sum(b.get() for b in waits._buckets)
+
+    with engine.connect():
+        assert gauge._value.get() == initial + 1
+    assert gauge._value.get() == initial
+    assert sum(b.get() for b in waits._buckets) == initial_waits + 1
+    engine.dispose()
@@ -0,0 +1,138 @@
+import math
+
+import pytest
+
+from src.app.services.inverted_index import (
+    BM25_B,
+    BM25_K1,
+    IndexSnapshot,
+    IndexWriter,
+    InvertedIndex,
+)
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "documents.idx")
+
+def _build(path, docs):
+    writer = IndexWriter(path)
+    for doc_id, content in docs.items():
+        writer.update(doc_id, 1, content)
+    writer.flush()
+    return writer
+
+def test_search_ranks_with_bm25(index_path):
+    _build(index_path, {
+        1: "kafka kafka kafka streams",
+        2: "kafka",
+        3: "postgres tables and kafka topics and more words here",
+        4: "nothing relevant",
+    })
+
+    hits = InvertedIndex(index_path).search("Kafka")
+
+    assert [doc_id for doc_id, _ in hits] == [1, 2, 3]
+    # Document 2: tf=1, length 1; average length (4 + 1 + 9 + 2) / 4
+    idf = math.log(1 + (4 - 3 + 0.5) / (3 + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * 1 / 4)
+    assert hits[1][1] == pytest.approx(idf * (BM25_K1 + 1) / (1 + norm))
+
+def test_search_requires_every_term(index_path):
+    _build(index_path, {1: "red apple", 2: "green apple", 3: "red car"})
+    index = InvertedIndex(index_path)
+
+    assert [doc_id for doc_id, _ in index.search("red apple")] == [1]
+    assert index.search("red bicycle") == []
+    assert index.search("!!!") == []
+
+def test_search_pages_with_after(index_path):
+    _build(index_path, {doc_id: "word " * doc_id for doc_id in range(1, 8)})
+    index = InvertedIndex(index_path)
+
+    everything = index.search("word", limit=10)
+    first = index.search("word", limit=3)
+    rest = index.search("word", limit=10, after=(first[-1][1], first[-1][0]))
+
+    assert first + rest == everything
+    assert len(everything) == 7
+
+def test_updates_replace_postings_and_ignore_older_versions(index_path):
+    writer = _build(index_path, {1: "old words", 2: "old too"})
+    index = InvertedIndex(index_path)
+    assert sorted(doc_id for doc_id, _ in index.search("old")) == [1, 2]
+
+    writer.update(1, 2, "new words")
+    writer.update(2, 1, "stale redelivery")
+    assert writer.flush() == {1: 2, 2: 1}
+
+    assert [doc_id for doc_id, _ in index.search("old")] == [2]  # Reader picked up the new file
+    assert [doc_id for doc_id, _ in index.search("new")] == [1]
+    assert index.search("stale") == []
+
+def test_writers_merge_into_the_same_file(index_path):
+    first, second = IndexWriter(index_path), IndexWriter(index_path)
+    first.update(1, 1, "shared alpha")
+    second.update(2, 1, "shared beta")
+    first.flush()
+    second.flush()
+
+    assert sorted(doc_id for doc_id, _ in InvertedIndex(index_path).search("shared")) == [1, 2]
+
+def test_postings_are_delta_encoded_in_narrow_arrays(index_path):
+    _build(index_path, {doc_id: "common" for doc_id in range(1000, 1300)})
+
+    snapshot = IndexSnapshot(index_path)
+    try:
+        index = snapshot.find("common")
+        ids, frequencies = snapshot.postings_of(index)
+        assert list(ids) == list(range(1000, 1300))
+        assert list(frequencies) == [1] * 300
+        # One byte per gap and per frequency
+        assert snapshot.first_ids[index] == 1000
+        assert snapshot.postings_offsets[index + 1] - snapshot.postings_offsets[index] == 299 + 300
+        assert snapshot.find("missing") == -1
+    finally:
+        snapshot.close()
+
+def test_missing_or_foreign_file(index_path, tmp_path):
+    assert InvertedIndex(index_path).search("anything") == []
+    other = tmp_path / "other.idx"
+    other.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        IndexSnapshot(str(other))
+
+def test_deletes_drop_postings_and_statistics(index_path):
+    writer = _build(index_path, {1: "kafka streams", 2: "kafka", 3: "other words here"})
+    writer.delete(1)
+    writer.delete(9)  # Never indexed
+    assert writer.flush() == {}
+
+    snapshot = IndexSnapshot(index_path)
+    try:
+        assert list(snapshot.doc_ids) == [2, 3]
+        assert snapshot.total_length == 4
+        assert snapshot.find("streams") == -1
+    finally:
+        snapshot.close()
+    assert [doc_id for doc_id, _ in InvertedIndex(index_path).search("kafka")] == [2]
+
+def test_merge_decodes_only_lists_of_changed_documents(index_path, monkeypatch):
+    writer = _build(index_path, {1: "alpha shared", 2: "beta shared", 3: "gamma"})
+    decoded = []
+    postings_of = IndexSnapshot.postings_of
+
+    def recording(snapshot, index):
+        decoded.append(snapshot.term(index))
+        return postings_of(snapshot, index)
+
+    monkeypatch.setattr(IndexSnapshot, "postings_of", recording)
+    writer.update(1, 2, "delta shared")
+    writer.flush()
+    monkeypatch.undo()
+
+    # Old and new terms of document 1; beta and gamma are copied as they are
+    assert sorted(decoded) == [b"alpha", b"shared"]
+    index = InvertedIndex(index_path)
+    assert index.search("alpha") == []
+    assert [doc_id for doc_id, _ in index.search("delta shared")] == [1]
+    assert [doc_id for doc_id, _ in index.search("beta")] == [2]
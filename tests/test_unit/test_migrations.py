@@ -0,0 +1,26 @@
+import os
+import sqlite3
+
+from alembic import command
+from alembic.config import Config
+
+from src.app.core.config import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _triggers(path):
+    with sqlite3.connect(path) as connection:
+        return [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+
+def test_migrations_keep_search_trigger_on_sqlite(tmp_path, monkeypatch):
+    path = tmp_path / "migrations.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{path}")
+    # No ini file, so env.py leaves the logging configuration alone
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+
+    command.upgrade(config, "head")
+    assert _triggers(path) == ["documents_fts_delete"]
+
+    command.downgrade(config, "document_search")
+    assert _triggers(path) == ["documents_fts_delete"]
@@ -0,0 +1,55 @@
+import asyncio
+import gc
+
+from src.app.core.metrics import CPU_USAGE, EVENT_LOOP_LAG, GC_PAUSE, MEMORY_USAGE, OPEN_FDS, THREADS
+from src.app.core.system_metrics import GCPauseRecorder, SystemMetricsCollector, monitor_event_loop
+
+def test_collect_reports_process_metrics():
+    collector = SystemMetricsCollector(interval=60)
+    sum(i * i for i in range(200000))  # Some CPU time to report
+
+    collector.collect()
+
+    assert MEMORY_USAGE._value.get() > 1024 * 1024
+    assert CPU_USAGE._value.get() >= 0
+    assert OPEN_FDS._value.get() > 0
+    assert THREADS._value.get() >= 1
+
+def test_gc_pauses_are_recorded_per_generation():
+    recorder = GCPauseRecorder()
+    count = sum(sample.value for sample in GC_PAUSE.collect()[0].samples
+                if sample.name.endswith("_count") and sample.labels["generation"] == "2")
+    recorder.install()
+    try:
+        gc.collect()
+    finally:
+        recorder.uninstall()
+
+    assert recorder.drain() >= 1
+    assert GC_PAUSE.labels(generation="2")._sum.get() > 0
+    assert sum(sample.value for sample in GC_PAUSE.collect()[0].samples
+               if sample.name.endswith("_count") and sample.labels["generation"] == "2") > count
+    assert recorder not in gc.callbacks
+
+def test_start_and_stop_collector_thread():
+    collector = SystemMetricsCollector(interval=0.01)
+    collector.start()
+    collector.stop()
+    assert collector._thread is None
+    assert collector.gc_pauses not in gc.callbacks
+
+def test_event_loop_lag_shows_blocking_calls():
+    import time
+
+    async def run():
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(monitor_event_loop(stop, interval=0.01))
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)  # Blocks the loop
+        await asyncio.sleep(0.02)
+        stop.set()
+        await monitor
+
+    before = EVENT_LOOP_LAG._sum.get()
+    asyncio.run(run())
+    assert EVENT_LOOP_LAG._sum.get() - before >= 0.03
@@ -1,5 +1,5 @@
 import pytest
-from src.app.services.text_processor import TextProcessor
+from src.app.services.text_processor import BatchStats, TextProcessor
 
 @pytest.fixture
 def processor():
@@ -27,4 +27,63 @@ def test_process_text(processor):
     text = "Hello world! This is a test."
     result = processor.process_text(text)
     assert result["words"] == 6
-    assert result["chars"] == 28
\ No newline at end of file
+    assert result["chars"] == 28
+
+def test_analyze_statistics():
+    stats = TextProcessor.analyze("The cat sat.\nThe cat ran!  Did it stop?\nNo")
+    assert stats.words == 10
+    assert stats.chars == 42
+    assert stats.lines == 3
+    assert stats.sentences == 4
+    assert stats.unique_terms == 8
+    assert stats.top_terms[:2] == [("the", 2), ("cat", 2)]
+
+def test_analyze_empty_text():
+    stats = TextProcessor.analyze("")
+    assert (stats.words, stats.chars, stats.lines, stats.sentences, stats.unique_terms) == (0, 0, 0, 0, 0)
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_analyze_is_independent_of_chunking(chunk_size):
+    text = "Wait... what?! Ünïcode wörds_and snake_case\n\nsplit acrossboundaries. end"
+    whole = TextProcessor.analyze(text, chunk_size=len(text))
+    chunked = TextProcessor.analyze(text, chunk_size=chunk_size)
+    assert chunked == whole
+    assert whole.words == len(text.split())
+    assert whole.sentences == 4
+
+def test_analyze_accepts_chunk_iterables():
+    chunks = iter(["Hello wo", "rld. Hello", " again"])
+    stats = TextProcessor.analyze(chunks)
+    assert stats.words == 4
+    assert stats.top_terms[0] == ("hello", 2)
+
+def test_process_text_on_large_text_matches_split(processor):
+    text = "word " * 50000 + "tail"
+    assert processor.process_text(text) == {"words": len(text.split()), "chars": len(text)}
+
+BATCH = ["", "One sentence. Two!", "no ending\nsecond line\n", "Wait...what?? ok", "   "]
+
+def test_analyze_batch_matches_analyze():
+    stats = TextProcessor.analyze_batch(BATCH, columns=BatchStats.COLUMNS)
+    assert len(stats) == len(BATCH)
+    for i, text in enumerate(BATCH):
+        expected = TextProcessor.analyze(text)
+        assert (stats.words[i], stats.chars[i], stats.lines[i], stats.sentences[i], stats.unique_terms[i]) == (
+            expected.words, expected.chars, expected.lines, expected.sentences, expected.unique_terms
+        )
+    assert stats.descriptions() == [TextProcessor.generate_description(text) for text in BATCH]
+
+def test_analyze_batch_splits_large_batches_across_executor(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr("src.app.services.text_processor.PARALLEL_MIN_BATCH", 2)
+    texts = BATCH * 10
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        parallel = TextProcessor.analyze_batch(texts, executor=executor)
+    assert parallel == TextProcessor.analyze_batch(texts)
+
+def test_analyze_batch_computes_only_requested_columns():
+    stats = TextProcessor.analyze_batch(BATCH, columns=BatchStats.DESCRIPTION_COLUMNS)
+    assert len(stats.words) == len(BATCH)
+    assert len(stats.sentences) == 0
+    with pytest.raises(ValueError):
+        TextProcessor.analyze_batch(BATCH, columns=("syllables",))